@@ -0,0 +1,9 @@
+"""
+Benchmarks for Don's Table.
+
+Self-contained scripts that set up a throwaway database, drive the
+project's views and print machine-readable JSON results. Run them from
+the project root, e.g.:
+
+    python -m benchmarks.connection_reuse
+"""
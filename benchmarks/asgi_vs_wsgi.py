@@ -0,0 +1,177 @@
+"""
+Benchmark the read-heavy views under ASGI against the WSGI deployment.
+
+Seeds a throwaway SQLite database, then starts two real servers on it
+in turn:
+
+- wsgi: ``gunicorn dons_table.wsgi`` (the Procfile deployment)
+- asgi: ``gunicorn dons_table.asgi:application -k uvicorn.workers.
+  UvicornWorker``
+
+and drives the menu, availability and dashboard pages (their sync
+views under WSGI, their async ones under ASGI; see settings.SERVER_MODE)
+with concurrent keep-alive clients, reporting requests/sec and
+p50/p95/p99 latency per server and path as JSON. The cache is disabled (CACHE_BACKEND=dummy)
+unless --cache is given, so every request reaches the database.
+
+Usage:
+    python -m benchmarks.asgi_vs_wsgi --concurrency 32 --requests 2000
+"""
+
+import argparse
+import datetime
+import http.client
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from .common import emit, setup_django, summarize
+
+SERVERS = {
+    "wsgi": ["gunicorn", "dons_table.wsgi"],
+    "asgi": ["gunicorn", "dons_table.asgi:application",
+             "-k", "uvicorn.workers.UvicornWorker"],
+}
+
+
+def prepare_database():
+    """Migrate and seed the benchmark database; return a session cookie."""
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.test import Client
+    from menu.models import MenuItem
+    from reservations.models import Reservation
+
+    call_command("migrate", verbosity=0)
+    user = User.objects.create_user(username="bench", password="bench")
+    today = datetime.date.today()
+    Reservation.objects.bulk_create(
+        Reservation(user=user, date=today + datetime.timedelta(days=i % 60),
+                    time=datetime.time(12 + i % 10, 30 * (i % 2)),
+                    end_time=datetime.time(13 + i % 10, 30 * (i % 2)),
+                    guests=1 + i % 4)
+        for i in range(500))
+    call_command("rebuild_slot_ledger", verbosity=0, stdout=open(os.devnull,
+                                                                 "w"))
+    MenuItem.objects.bulk_create(
+        MenuItem(name=f"Dish {i}", price=10, category=category)
+        for i, category in enumerate(
+            ["starter", "main", "dessert", "drink"] * 10))
+    client = Client()
+    client.force_login(user)
+    return {"sessionid": client.cookies["sessionid"].value}
+
+
+def start_server(kind, port, workers):
+    command = SERVERS[kind] + ["-b", f"127.0.0.1:{port}",
+                               "-w", str(workers), "--log-level", "warning"]
+    process = subprocess.Popen(command, env=os.environ.copy())
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/menu/")
+            conn.getresponse().read()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"{kind} server did not start")
+
+
+def load(port, path, cookies, concurrency, requests):
+    """Fire ``requests`` GETs at ``path`` from ``concurrency`` clients."""
+    headers = {"Host": "127.0.0.1", "Cookie": "; ".join(
+        f"{name}={value}" for name, value in (cookies or {}).items())}
+    per_client = requests // concurrency
+
+    def client(_):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        latencies, errors = [], 0
+        for _ in range(per_client):
+            started = time.perf_counter()
+            try:
+                conn.request("GET", path, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    errors += 1
+            except (OSError, http.client.HTTPException):
+                errors += 1
+                conn.close()
+            latencies.append(time.perf_counter() - started)
+        conn.close()
+        return latencies, errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(client, range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies = [value for lat, _ in results for value in lat]
+    summary = summarize(latencies, elapsed)
+    summary["errors"] = sum(errors for _, errors in results)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000,
+                        help="Requests per server and path.")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--cache", action="store_true",
+                        help="Keep the default cache instead of dummy.")
+    parser.add_argument("--output", help="Write JSON here, not stdout.")
+    args = parser.parse_args()
+
+    if not args.cache:
+        os.environ["CACHE_BACKEND"] = "dummy"
+    setup_django()
+    cookies = prepare_database()
+    today = datetime.date.today()
+    paths = {
+        "/menu/": None,
+        f"/reservation/availability/?start={today}"
+        f"&end={today + datetime.timedelta(days=13)}&guests=2": None,
+        "/reservation/dashboard/": cookies,
+    }
+
+    results = {}
+    for kind in SERVERS:
+        process = start_server(kind, args.port, args.workers)
+        try:
+            results[kind] = {
+                path: load(args.port, path, path_cookies,
+                           args.concurrency, args.requests)
+                for path, path_cookies in paths.items()
+            }
+        finally:
+            process.terminate()
+            process.wait()
+
+    comparison = {
+        path: {
+            "throughput_ratio": round(
+                results["asgi"][path]["throughput_rps"]
+                / results["wsgi"][path]["throughput_rps"], 2),
+            "p99_ratio": round(
+                results["asgi"][path]["p99_ms"]
+                / results["wsgi"][path]["p99_ms"], 2),
+        }
+        for path in paths
+    }
+    emit({
+        "benchmark": "asgi_vs_wsgi",
+        "python": sys.version.split()[0],
+        "concurrency": args.concurrency,
+        "workers": args.workers,
+        "cache": args.cache,
+        "results": results,
+        "asgi_vs_wsgi": comparison,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Sets Django up against a throwaway database (a temporary SQLite file
+unless BENCHMARK_DATABASE_URL points at a real server), drives requests
+through the real WSGI handler so request_started/request_finished fire
+exactly as under gunicorn, and summarises latencies.
+"""
+
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+
+def setup_django():
+    """Configure and set up Django for a benchmark run."""
+    workdir = tempfile.mkdtemp(prefix="dons_table_bench_")
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "dons_table.settings")
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ["DATABASE_URL"] = os.environ.get(
+        "BENCHMARK_DATABASE_URL",
+        f"sqlite:///{os.path.join(workdir, 'bench.sqlite3')}")
+    import django
+    django.setup()
+    from django.conf import settings
+    settings.STATICFILES_STORAGE = (
+        "django.contrib.staticfiles.storage.StaticFilesStorage")
+    settings.ALLOWED_HOSTS = ["*"]
+
+
+def create_database():
+    """
+    Create and migrate a fresh database for the run.
+
+    Returns:
+        callable: Tears the database down again.
+    """
+    from django.db import connection
+    from django.test.utils import setup_databases, teardown_databases
+    if connection.vendor == "sqlite":
+        # A file, not :memory:, so closed connections can reconnect
+        connection.settings_dict["TEST"]["NAME"] = (
+            connection.settings_dict["NAME"] + ".test")
+    old_config = setup_databases(verbosity=0, interactive=False)
+    return lambda: teardown_databases(old_config, verbosity=0)
+
+
+def wsgi_request(handler, path, method="GET", cookies=None, body=b"",
+                 content_type="application/x-www-form-urlencoded",
+                 headers=None):
+    """
+    Send one request through a WSGI handler.
+
+    ``headers`` are extra WSGI environ entries, e.g. HTTP_X_CSRFTOKEN.
+
+    Returns:
+        tuple: (status code, response headers, body bytes)
+    """
+    path, _, query = path.partition("?")
+    environ = {
+        "REQUEST_METHOD": method,
+        "PATH_INFO": path,
+        "QUERY_STRING": query,
+        "SERVER_NAME": "127.0.0.1",
+        "SERVER_PORT": "80",
+        "HTTP_HOST": "127.0.0.1",
+        "REMOTE_ADDR": "127.0.0.1",
+        "CONTENT_TYPE": content_type,
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.url_scheme": "http",
+        "wsgi.version": (1, 0),
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    environ.update(headers or {})
+    if cookies:
+        environ["HTTP_COOKIE"] = "; ".join(
+            f"{name}={value}" for name, value in cookies.items())
+    captured = {}
+
+    def start_response(status, headers, exc_info=None):
+        captured["status"] = int(status.split(" ", 1)[0])
+        captured["headers"] = headers
+
+    result = handler(environ, start_response)
+    try:
+        content = b"".join(result)
+    finally:
+        # Fires request_finished, which is when Django closes or keeps
+        # the database connection.
+        if hasattr(result, "close"):
+            result.close()
+    return captured["status"], captured["headers"], content
+
+
+def timed(func, *args, **kwargs):
+    """Return (result, elapsed seconds) for one call."""
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def percentile(values, pct):
+    """Return the pct-th percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1,
+                max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies, elapsed=None):
+    """Summarise request latencies (seconds) in milliseconds."""
+    summary = {
+        "requests": len(latencies),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3)
+        if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+    if elapsed:
+        summary["throughput_rps"] = round(len(latencies) / elapsed, 1)
+    return summary
+
+
+def emit(result, output=None):
+    """Write a result as JSON to ``output`` (a path) or stdout."""
+    text = json.dumps(result, indent=2, default=str)
+    if output:
+        with open(output, "w") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
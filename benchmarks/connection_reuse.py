@@ -0,0 +1,109 @@
+"""
+Benchmark per-request latency with and without persistent connections.
+
+Drives the public menu page (an aggregate plus the item list, with the
+cache disabled so every request reaches the database) through the WSGI
+handler with CONN_MAX_AGE=0, which opens a fresh connection for every
+request, and again with connection reuse and health checks enabled.
+
+Against SQLite, opening a connection is nearly free, so a simulated
+handshake cost (--connect-delay-ms) stands in for the TCP/TLS/auth round
+trips of a real Postgres connection. Point BENCHMARK_DATABASE_URL at a
+local Postgres to measure the real thing (and pass --connect-delay-ms 0).
+
+Usage:
+    python -m benchmarks.connection_reuse --requests 500
+    BENCHMARK_DATABASE_URL=postgres://localhost/bench \\
+        python -m benchmarks.connection_reuse --connect-delay-ms 0
+"""
+
+import argparse
+import time
+from .common import (create_database, emit, setup_django, summarize, timed,
+                     wsgi_request)
+
+
+def run(handler, path, requests, max_age):
+    """Time ``requests`` GETs of ``path`` with the given CONN_MAX_AGE."""
+    from django.db import connection
+    from django.db.backends.signals import connection_created
+
+    opened = []
+
+    def count(sender, connection, **kwargs):
+        opened.append(1)
+
+    connection.close()
+    connection.settings_dict["CONN_MAX_AGE"] = max_age
+    connection.settings_dict["CONN_HEALTH_CHECKS"] = bool(max_age)
+    for _ in range(10):  # warm up templates and URL resolver
+        wsgi_request(handler, path)
+
+    connection_created.connect(count)
+    latencies = []
+    started = time.perf_counter()
+    try:
+        for _ in range(requests):
+            (status, _, _), elapsed = timed(wsgi_request, handler, path)
+            assert status == 200, status
+            latencies.append(elapsed)
+    finally:
+        connection_created.disconnect(count)
+    result = summarize(latencies, time.perf_counter() - started)
+    result.update(conn_max_age=max_age, connections_opened=len(opened))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--max-age", type=int, default=600,
+                        help="CONN_MAX_AGE for the persistent run.")
+    parser.add_argument("--connect-delay-ms", type=float, default=None,
+                        help="Simulated connection handshake cost "
+                             "(default: 3ms on SQLite, 0 otherwise).")
+    parser.add_argument("--output", help="Write JSON here, not stdout.")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    settings.CACHES = {"default": {
+        "BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.db import connection
+    from django.db.backends.signals import connection_created
+
+    teardown = create_database()
+    try:
+        delay = args.connect_delay_ms
+        if delay is None:
+            delay = 3.0 if connection.vendor == "sqlite" else 0.0
+        if delay:
+            def handshake(sender, **kwargs):
+                time.sleep(delay / 1000)
+            connection_created.connect(handshake, weak=False)
+
+        from menu.models import MenuItem
+        MenuItem.objects.bulk_create(
+            MenuItem(name=f"Dish {i}", price=10, category=category)
+            for i, category in enumerate(
+                ["starter", "main", "dessert", "drink"] * 10))
+
+        handler = WSGIHandler()
+        fresh = run(handler, "/menu/", args.requests, 0)
+        persistent = run(handler, "/menu/", args.requests, args.max_age)
+        emit({
+            "benchmark": "connection_reuse",
+            "vendor": connection.vendor,
+            "connect_delay_ms": delay,
+            "results": [fresh, persistent],
+            "p50_speedup": round(fresh["p50_ms"] / persistent["p50_ms"], 2)
+            if persistent["p50_ms"] else None,
+        }, args.output)
+    finally:
+        connection.close()
+        teardown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""
+Load-test the booking and menu paths at Friday-peak concurrency.
+
+Seeds a throwaway database with a 10k, 1M or 5M reservation dataset
+(the seed_data command with a fixed seed: mostly history, with the
+next FUTURE_DAYS days booked up to peak-hour capacity), then drives
+these views through the WSGI handler from concurrent worker threads,
+each logged in as its own diner:
+
+- make_reservation: POST a party of two at a random upcoming slot
+- edit_reservation: POST the worker's own booking with a new party size
+- reservation_dashboard: GET the worker's upcoming reservations
+- superuser_reservations: GET the staff list as a superuser
+- my_menu: GET the public menu anonymously
+
+For every view and concurrency level it reports throughput, p50/p95/p99
+latency and queries per request as JSON. With --baseline it compares
+against an earlier result file (written with --output) and exits with
+status 1 if any view got slower than --tolerance allows or ran more
+queries.
+
+Requests go through Django's WSGI handler in-process, which measures
+the deployed stack (gunicorn on dons_table.wsgi, see the Procfile) minus
+the HTTP server; benchmarks/asgi_vs_wsgi.py compares real servers.
+
+SQLite takes one writer at a time, and a transaction that has to wait
+to write fails with "database is locked" instead of queueing. On SQLite
+the write views (WRITE_SCENARIOS) therefore only run at concurrency 1,
+and the levels skipped are listed under "skipped"; run them at
+concurrency against PostgreSQL.
+
+Needs no services beyond Python: SQLite by default, or the server in
+BENCHMARK_DATABASE_URL. The cache is disabled (CACHE_BACKEND=dummy)
+unless --cache is given, so every request reaches the database.
+
+Usage:
+    python -m benchmarks.load --dataset 10k
+    python -m benchmarks.load --dataset 1m --concurrency 1 8 32 \\
+        --output baseline.json
+    python -m benchmarks.load --dataset 1m --concurrency 1 8 32 \\
+        --baseline baseline.json
+"""
+
+import argparse
+import datetime
+import io
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+from .common import (create_database, emit, setup_django, summarize, timed,
+                     wsgi_request)
+
+DATASETS = {"10k": 10_000, "1m": 1_000_000, "5m": 5_000_000}
+SCENARIOS = ("make_reservation", "edit_reservation",
+             "reservation_dashboard", "superuser_reservations", "my_menu")
+WRITE_SCENARIOS = ("make_reservation", "edit_reservation")
+FUTURE_DAYS = 30
+RESERVATIONS_PER_USER = 50
+# CsrfViewMiddleware accepts the unmasked cookie secret as the token
+CSRF_SECRET = "benchmarkbenchmarkbenchmarkbench"
+
+
+def seed(total, seed_value):
+    """
+    Seed ``total`` reservations with the seed_data command.
+
+    Returns:
+        list: The ids of the users who made them, in creation order.
+    """
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from reservations.management.commands.seed_data import USERNAME_PREFIX
+
+    call_command("seed_data", "--reservations", str(total),
+                 "--users", str(max(200, total // RESERVATIONS_PER_USER)),
+                 "--seed", str(seed_value),
+                 "--future-days", str(FUTURE_DAYS),
+                 "--menu-items", "40", stdout=io.StringIO())
+    return list(User.objects.filter(username__startswith=USERNAME_PREFIX)
+                .order_by("id").values_list("id", flat=True))
+
+
+def session_cookies(user):
+    """Log ``user`` in and return the cookies of the session."""
+    from django.test import Client
+    client = Client()
+    client.force_login(user)
+    return {"sessionid": client.cookies["sessionid"].value,
+            "csrftoken": CSRF_SECRET}
+
+
+class Worker:
+    """
+    One simulated visitor, logged in as its own diner with a booking of
+    its own (beyond the seeded days) to edit.
+    """
+
+    def __init__(self, index, user, staff_cookies, seed_value):
+        from reservations.models import OpeningHours, Reservation
+
+        self.rng = random.Random(seed_value * 1000 + index)
+        self.cookies = session_cookies(user)
+        self.staff_cookies = staff_cookies
+        self.times = OpeningHours.slot_grid().all_slots()
+        self.today = datetime.date.today()
+        day = self.today + datetime.timedelta(
+            days=FUTURE_DAYS + 1 + index // len(self.times))
+        self.reservation = Reservation.objects.create(
+            user=user, date=day, guests=2,
+            time=self.times[index % len(self.times)])
+
+    def request(self, scenario):
+        """Return (method, path, body, cookies) for one request."""
+        if scenario == "make_reservation":
+            day = self.today + datetime.timedelta(
+                days=self.rng.randrange(1, FUTURE_DAYS))
+            body = {"date": day, "time": self.rng.choice(self.times),
+                    "guests": 2}
+            return "POST", "/reservation/form/", body, self.cookies
+        if scenario == "edit_reservation":
+            reservation = self.reservation
+            reservation.guests = 5 - reservation.guests  # 2 <-> 3
+            body = {"date": reservation.date, "time": reservation.time,
+                    "guests": reservation.guests}
+            return ("POST", f"/reservation/{reservation.id}/edit/", body,
+                    self.cookies)
+        if scenario == "reservation_dashboard":
+            return "GET", "/reservation/dashboard/", None, self.cookies
+        if scenario == "superuser_reservations":
+            return ("GET", "/reservation/superuser/", None,
+                    self.staff_cookies)
+        return "GET", "/menu/", None, None
+
+
+def run(handler, scenario, workers, requests):
+    """
+    Send ``requests`` requests for one scenario, spread over the
+    workers, which run concurrently.
+    """
+    from django.db import connections
+    from dons_table.querystats import record_queries
+
+    per_worker = max(1, requests // len(workers))
+
+    def drive(worker):
+        latencies, queries, statuses = [], [], Counter()
+        try:
+            for _ in range(per_worker):
+                method, path, body, cookies = worker.request(scenario)
+                headers = None
+                if body is not None:
+                    body = urlencode(body).encode()
+                    headers = {"HTTP_X_CSRFTOKEN": CSRF_SECRET}
+                with record_queries() as recorder:
+                    (status, _, _), elapsed = timed(
+                        wsgi_request, handler, path, method, cookies,
+                        body or b"", headers=headers)
+                latencies.append(elapsed)
+                queries.append(recorder.count)
+                statuses[status] += 1
+        finally:
+            connections.close_all()  # this thread's connections
+        return latencies, queries, statuses
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(workers)) as pool:
+        results = list(pool.map(drive, workers))
+    elapsed = time.perf_counter() - started
+
+    latencies = [value for lat, _, _ in results for value in lat]
+    queries = [value for _, qs, _ in results for value in qs]
+    statuses = sum((counts for _, _, counts in results), Counter())
+    summary = summarize(latencies, elapsed)
+    summary["queries_mean"] = round(sum(queries) / len(queries), 2)
+    summary["queries_max"] = max(queries)
+    summary["statuses"] = {str(code): count
+                           for code, count in sorted(statuses.items())}
+    summary["errors"] = sum(count for code, count in statuses.items()
+                            if code >= 400)
+    return summary
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare results with a baseline run of the same dataset.
+
+    A view regresses at a concurrency level when its throughput drops,
+    or its p95 latency rises, by more than ``tolerance`` (a fraction),
+    or when it runs more queries per request. p99 is reported but not
+    judged: a few hundred requests give it too few samples.
+
+    Returns:
+        tuple: (comparison dict, list of "view@concurrency" regressions)
+    """
+    def ratio(new, old):
+        return round(new / old, 3) if old else None
+
+    comparison, regressions = {}, []
+    for scenario, levels in results.items():
+        for level, new in levels.items():
+            old = baseline["results"].get(scenario, {}).get(level)
+            if old is None:
+                continue
+            change = {
+                "throughput_ratio": ratio(new["throughput_rps"],
+                                          old["throughput_rps"]),
+                "p95_ratio": ratio(new["p95_ms"], old["p95_ms"]),
+                "p99_ratio": ratio(new["p99_ms"], old["p99_ms"]),
+                "queries_delta": round(new["queries_mean"]
+                                       - old["queries_mean"], 2),
+            }
+            change["regressed"] = (
+                (change["throughput_ratio"] or 1) < 1 - tolerance
+                or (change["p95_ratio"] or 1) > 1 + tolerance
+                or new["queries_max"] > old["queries_max"])
+            if change["regressed"]:
+                regressions.append(f"{scenario}@{level}")
+            comparison.setdefault(scenario, {})[level] = change
+    return comparison, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--dataset", choices=DATASETS, default="10k",
+                        help="Reservations seeded before the run.")
+    parser.add_argument("--concurrency", type=int, nargs="+",
+                        default=[1, 8, 32],
+                        help="Concurrent workers; each level is run.")
+    parser.add_argument("--requests", type=int, default=400,
+                        help="Requests per view and concurrency level.")
+    parser.add_argument("--scenario", choices=SCENARIOS, nargs="+",
+                        default=list(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--cache", action="store_true",
+                        help="Keep the default cache instead of dummy.")
+    parser.add_argument("--baseline",
+                        help="Earlier --output file to compare with.")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="Slowdown allowed against the baseline "
+                             "(default 0.1, i.e. 10%%).")
+    parser.add_argument("--output", help="Write JSON here, not stdout.")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+        if baseline.get("dataset") != args.dataset:
+            parser.error(f"{args.baseline} was run on the "
+                         f"{baseline.get('dataset')} dataset.")
+
+    if not args.cache:
+        os.environ["CACHE_BACKEND"] = "dummy"
+    setup_django()
+    from django.contrib.auth.models import User
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.db import connection
+
+    teardown = create_database()
+    try:
+        user_ids, seed_seconds = timed(seed, DATASETS[args.dataset],
+                                       args.seed)
+        admin = User.objects.create_superuser(username="bench-admin")
+        staff_cookies = session_cookies(admin)
+        users = User.objects.in_bulk(user_ids[:max(args.concurrency)])
+        workers = [Worker(index, users[user_id], staff_cookies, args.seed)
+                   for index, user_id in enumerate(
+                       user_ids[:max(args.concurrency)])]
+        handler = WSGIHandler()
+        for scenario in args.scenario:  # warm templates and URL resolver
+            run(handler, scenario, workers[:1], 5)
+
+        results, skipped = {}, {}
+        for scenario in args.scenario:
+            levels = args.concurrency
+            if connection.vendor == "sqlite" and scenario in WRITE_SCENARIOS:
+                levels = [level for level in levels if level == 1]
+                if len(levels) < len(args.concurrency):
+                    skipped[scenario] = [level for level in args.concurrency
+                                         if level != 1]
+            results[scenario] = {
+                str(level): run(handler, scenario, workers[:level],
+                                args.requests)
+                for level in levels
+            }
+        output = {
+            "benchmark": "load",
+            "vendor": connection.vendor,
+            "python": sys.version.split()[0],
+            "dataset": args.dataset,
+            "reservations": DATASETS[args.dataset],
+            "seed_seconds": round(seed_seconds, 1),
+            "cache": args.cache,
+            "requests": args.requests,
+            "results": results,
+        }
+        if skipped:
+            output["skipped"] = skipped
+        regressions = []
+        if baseline is not None:
+            output["baseline"], regressions = compare(
+                results, baseline, args.tolerance)
+            output["regressions"] = regressions
+        emit(output, args.output)
+    finally:
+        connection.close()
+        teardown()
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Benchmark the table check in ReservationForm.clean on a full Saturday.
+
+Sets up a 50-seat dining room of 2-, 4- and 6-tops (some of them
+combinable) and books random parties into one Saturday through
+ReservationForm and Reservation.save, lunch and dinner weighted the way
+a real day is, until --covers guests are seated or the day is full.
+Reports the latency of form validation (ledger and table checks) and
+of the save (which seats the party), then the cost of a full-day
+re-plan on the finished day, as JSON.
+
+Usage:
+    python -m benchmarks.table_assignment --covers 400
+    python -m benchmarks.table_assignment --seed 7 --output tables.json
+"""
+
+import argparse
+import datetime
+import random
+from .common import create_database, emit, setup_django, summarize, timed
+
+# name, seats, combine group
+LAYOUT = (
+    [(f"B{i}", 2, "banquette") for i in range(1, 7)]
+    + [(f"W{i}", 4, "window") for i in range(1, 4)]
+    + [(f"C{i}", 4, "centre") for i in range(1, 4)]
+    + [("R1", 6, ""), ("R2", 6, ""), ("Bar", 2, "")]
+)
+# party size -> relative frequency
+PARTY_SIZES = {1: 4, 2: 40, 3: 12, 4: 25, 5: 6, 6: 7, 7: 3, 8: 3}
+# hour -> relative demand for start times in that hour
+HOURS = {11: 2, 12: 6, 13: 6, 14: 2, 15: 1, 16: 1, 17: 3, 18: 8, 19: 10,
+         20: 8, 21: 4, 22: 1}
+
+
+def next_saturday():
+    day = datetime.date.today() + datetime.timedelta(days=7)
+    return day + datetime.timedelta(days=(5 - day.weekday()) % 7)
+
+
+def book_day(user, day, covers, rng):
+    """
+    Book random parties through the form until ``covers`` are seated.
+
+    Gives up after fifty rejections in a row, when the day is as full as
+    random demand can make it.
+    """
+    from reservations.forms import (NO_TABLE_MESSAGE, SLOT_FULL_MESSAGE,
+                                    ReservationForm)
+    from reservations.models import Reservation
+
+    sizes, size_weights = zip(*PARTY_SIZES.items())
+    hours, hour_weights = zip(*HOURS.items())
+    clean_latencies, save_latencies = [], []
+    seated = parties = 0
+    rejected = {"slot_full": 0, "no_table": 0}
+    misses = 0
+    while seated < covers and misses < 50:
+        guests = rng.choices(sizes, size_weights)[0]
+        hour = rng.choices(hours, hour_weights)[0]
+        start = datetime.time(hour, rng.choice([0, 30]))
+        form = ReservationForm(
+            data={"date": day, "time": start.strftime("%H:%M:%S"),
+                  "guests": guests},
+            instance=Reservation(user=user))
+        valid, elapsed = timed(form.is_valid)
+        clean_latencies.append(elapsed)
+        if not valid:
+            errors = form.non_field_errors()
+            if NO_TABLE_MESSAGE in errors:
+                rejected["no_table"] += 1
+            elif SLOT_FULL_MESSAGE in errors:
+                rejected["slot_full"] += 1
+            else:
+                raise AssertionError(form.errors)
+            misses += 1
+            continue
+        _, elapsed = timed(form.save)
+        save_latencies.append(elapsed)
+        seated += guests
+        parties += 1
+        misses = 0
+    return {
+        "covers": seated,
+        "parties": parties,
+        "rejected": rejected,
+        "clean": summarize(clean_latencies),
+        "save": summarize(save_latencies),
+    }
+
+
+def time_replans(day, runs):
+    """Time the validation query plus a forced re-plan of the whole day."""
+    from reservations.models import Reservation, Table
+    from reservations.tables import assign_day, slot_mask
+
+    options = Table.seating_options()
+    latencies, unseated = [], 0
+    for _ in range(runs):
+        def replan():
+            parties = [(pk, slot_mask(start, end), guests)
+                       for pk, start, end, guests in
+                       Reservation.objects.filter(date=day)
+                       .exclude(status="cancelled")
+                       .values_list("pk", "time", "end_time", "guests")]
+            return assign_day(options, parties)
+        (_, missed), elapsed = timed(replan)
+        latencies.append(elapsed)
+        unseated = len(missed)
+    result = summarize(latencies)
+    result["unseated"] = unseated
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--covers", type=int, default=400)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--replans", type=int, default=200,
+                        help="Full-day re-plans to time afterwards.")
+    parser.add_argument("--output", help="Write JSON here, not stdout.")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from reservations.models import Table
+
+    teardown = create_database()
+    try:
+        Table.objects.bulk_create(
+            Table(name=name, seats=seats, combine_group=group)
+            for name, seats, group in LAYOUT)
+        user = User.objects.create_user(username="bench")
+        day = next_saturday()
+        booked = book_day(user, day, args.covers, random.Random(args.seed))
+        emit({
+            "benchmark": "table_assignment",
+            "vendor": connection.vendor,
+            "date": day,
+            "tables": len(LAYOUT),
+            "seats": sum(seats for _, seats, _ in LAYOUT),
+            "target_covers": args.covers,
+            **booked,
+            "full_day_replan": time_replans(day, args.replans),
+        }, args.output)
+    finally:
+        connection.close()
+        teardown()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,16 @@ ASGI config for dons_table project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Not used in production yet: the Procfile serves dons_table.wsgi. Part
+of the middleware stack (WhiteNoise 5, allauth's AccountMiddleware and
+AnonymousPageCacheMiddleware) is sync-only, so under ASGI Django runs
+every request in a thread and the async views (menu, reservation
+dashboard, availability) gain little.
+
+SERVER_MODE defaults to asgi here, which selects those async views and
+turns persistent database connections off unless DB_CONN_MAX_AGE is
+set (see settings.SERVER_MODE).
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
@@ -12,5 +22,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'dons_table.settings')
+os.environ.setdefault('SERVER_MODE', 'asgi')
 
 application = get_asgi_application()
@@ -0,0 +1,68 @@
+"""
+Helpers for async views.
+
+Django 4.2's login_required, condition and vary_on_cookie decorators
+only wrap synchronous views, and touching request.user from async code
+would run the session and user queries on the event loop. These
+helpers resolve the user in a worker thread once, up front, so the rest
+of an async view can read it (and render templates that use it)
+without blocking the loop.
+"""
+
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.utils.cache import (get_conditional_response, patch_vary_headers,
+                                quote_etag)
+from django.utils.http import http_date
+
+
+def _load_user(request):
+    # Evaluates the lazy request.user, loading the session on the way
+    request.user.is_authenticated
+    return request.user
+
+
+async def aget_user(request):
+    """Return request.user, resolving it off the event loop."""
+    return await sync_to_async(_load_user)(request)
+
+
+def async_login_required(view_func):
+    """
+    Async counterpart of login_required: redirect anonymous users to
+    the login page, otherwise call the view with the user resolved.
+    """
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        user = await aget_user(request)
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view_func(request, *args, **kwargs)
+    return wrapper
+
+
+def not_modified_response(request, etag, last_modified):
+    """
+    Return a 304/412 response if the request's validators match, or
+    None if the page has to be rendered. Mirrors the condition
+    decorator for async views, and for sync views that share their
+    validators with an async twin.
+    """
+    return get_conditional_response(
+        request,
+        etag=quote_etag(etag) if etag else None,
+        last_modified=int(last_modified.timestamp())
+        if last_modified else None,
+    )
+
+
+def set_validators(response, etag, last_modified):
+    """Add ETag, Last-Modified and Vary: Cookie to a rendered response."""
+    if etag:
+        response.headers.setdefault("ETag", quote_etag(etag))
+    if last_modified:
+        response.headers.setdefault(
+            "Last-Modified", http_date(last_modified.timestamp()))
+    patch_vary_headers(response, ("Cookie",))
+    return response
@@ -0,0 +1,25 @@
+"""
+Cache lifetimes for Don's Table.
+
+Cached values such as the menu, the slot grid and the table layout are
+cleared by signal handlers as soon as their rows change. Those clears
+only reach other workers through a shared cache (settings.CACHE_SHARED);
+a process-local one keeps serving its own copy until it expires, so
+such values are kept for at most LOCAL_CACHE_SECONDS there.
+"""
+
+from django.conf import settings
+
+LOCAL_CACHE_SECONDS = 10
+
+
+def cache_seconds(seconds):
+    """
+    Return how long to cache a value that signal handlers clear when
+    its rows change: ``seconds`` with a shared cache, at most
+    LOCAL_CACHE_SECONDS with a process-local one, whose clears never
+    reach the other workers.
+    """
+    if settings.CACHE_SHARED:
+        return seconds
+    return min(seconds, LOCAL_CACHE_SECONDS)
@@ -0,0 +1,68 @@
+"""
+Conditional GET helpers for Don's Table pages.
+
+Builds ETag and Last-Modified validators for pages whose content only
+changes when their data or templates change, so returning visitors and
+upstream proxies get a 304 Not Modified without the page being
+rendered.
+
+The pages also show who is logged in, so the ETag includes the viewer.
+No validators are produced while flash messages are waiting to be
+shown, because a 304 would leave them undelivered.
+"""
+
+import datetime
+import hashlib
+import os
+from functools import lru_cache
+from django.contrib.messages import get_messages
+from django.template.loader import get_template
+
+
+def viewer_key(request):
+    """Return a string identifying who the page is being rendered for."""
+    user = request.user
+    if not user.is_authenticated:
+        return "anonymous"
+    return f"user:{user.pk}:{user.is_superuser}"
+
+
+def has_pending_messages(request):
+    """Return True if flash messages are queued for this request."""
+    return len(get_messages(request)) > 0
+
+
+@lru_cache(maxsize=None)
+def template_modified(*template_names):
+    """
+    Return when the newest of the given templates (and the base layout)
+    last changed on disk, as an aware datetime.
+
+    Cached for the life of the process; templates only change on deploy.
+    """
+    names = set(template_names) | {"base.html"}
+    mtime = max(os.path.getmtime(get_template(name).origin.name)
+                for name in names)
+    return datetime.datetime.fromtimestamp(int(mtime),
+                                           tz=datetime.timezone.utc)
+
+
+def page_etag(request, *parts):
+    """
+    Return an ETag for a page built from ``parts`` and the viewer, or
+    None when the response must be rendered (messages are pending).
+    """
+    if has_pending_messages(request):
+        return None
+    raw = "|".join(str(part) for part in parts + (viewer_key(request),))
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def page_last_modified(request, *timestamps):
+    """
+    Return the newest of ``timestamps``, or None when the response must
+    be rendered (messages are pending).
+    """
+    if has_pending_messages(request):
+        return None
+    return max((t for t in timestamps if t), default=None)
@@ -0,0 +1,149 @@
+"""
+Middleware for the Don's Table project.
+
+AnonymousPageCacheMiddleware serves whole cached pages to anonymous
+visitors for the public pages listed in PAGE_CACHE_URL_NAMES.
+
+QueryInstrumentationMiddleware (opt-in with SQL_INSTRUMENTATION) records
+the SQL queries of every request, logs slow or query-heavy requests and
+shows staff the numbers in response headers.
+"""
+
+import logging
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import Resolver404, resolve
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import parse_http_date_safe
+from .querystats import record_queries
+
+logger = logging.getLogger(__name__)
+
+PAGE_CACHE_GENERATION_KEY = "pagecache:generation"
+
+
+def clear_page_cache():
+    """
+    Invalidate every cached page.
+
+    Bumps a generation number that is part of every page cache key, so
+    old entries are never read again and simply expire.
+    """
+    try:
+        cache.incr(PAGE_CACHE_GENERATION_KEY)
+    except ValueError:
+        cache.set(PAGE_CACHE_GENERATION_KEY, 1, None)
+
+
+class AnonymousPageCacheMiddleware:
+    """
+    Full-page cache for anonymous visitors.
+
+    Only GET/HEAD requests for the URL names in PAGE_CACHE_URL_NAMES are
+    considered, and only when the request carries no session or
+    messages cookie. Without those cookies the visitor is anonymous and
+    has nothing personal to see, so the response can be shared and a
+    cache hit is answered without touching the session or the database.
+    Logged-in and staff users always carry a session cookie and bypass
+    the cache.
+
+    Responses that set cookies (e.g. a page rendering {% csrf_token %}
+    issues a CSRF cookie) or are not plain 200s are never stored.
+    Stored pages keep their ETag/Last-Modified headers, so conditional
+    requests on a hit still get 304 Not Modified.
+
+    Must sit above SessionMiddleware in MIDDLEWARE.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.url_names = set(getattr(settings, 'PAGE_CACHE_URL_NAMES', []))
+        self.timeout = getattr(settings, 'PAGE_CACHE_SECONDS', 300)
+        self.bypass_cookies = {settings.SESSION_COOKIE_NAME,
+                               getattr(settings, 'MESSAGE_COOKIE_NAME',
+                                       'messages')}
+
+    def _is_cacheable_request(self, request):
+        if request.method not in ("GET", "HEAD"):
+            return False
+        if self.bypass_cookies & request.COOKIES.keys():
+            return False
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return False
+        return match.url_name in self.url_names
+
+    @staticmethod
+    def _is_cacheable_response(response):
+        return (response.status_code == 200
+                and not response.streaming
+                and not response.cookies
+                and "private" not in response.get("Cache-Control", ""))
+
+    def _cache_key(self, request):
+        generation = cache.get(PAGE_CACHE_GENERATION_KEY, 0)
+        return f"pagecache:{generation}:{request.get_full_path()}"
+
+    def __call__(self, request):
+        if not self._is_cacheable_request(request):
+            return self.get_response(request)
+
+        key = self._cache_key(request)
+        response = cache.get(key)
+        if response is not None:
+            return get_conditional_response(
+                request,
+                etag=response.get("ETag"),
+                last_modified=parse_http_date_safe(
+                    response.get("Last-Modified", "")),
+                response=response,
+            )
+
+        response = self.get_response(request)
+        patch_vary_headers(response, ("Cookie",))
+        if self._is_cacheable_response(response):
+            cache.set(key, response, self.timeout)
+        return response
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Per-request SQL statistics, to catch N+1 queries before production.
+
+    Counts the queries of each request, the time spent in the database
+    and the queries that repeat an earlier query's shape (see
+    querystats.fingerprint). A request over SQL_LOG_QUERIES queries or
+    SQL_LOG_MS milliseconds of database time is logged as a warning on
+    the ``dons_table.middleware`` logger with its most repeated
+    queries. Staff get the numbers in X-DB-Queries, X-DB-Time-Ms and
+    X-DB-Duplicate-Queries response headers.
+
+    Enabled by SQL_INSTRUMENTATION=true, which adds it to the top of
+    MIDDLEWARE so it also counts the session and page cache work.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.max_queries = getattr(settings, 'SQL_LOG_QUERIES', 30)
+        self.max_ms = getattr(settings, 'SQL_LOG_MS', 200)
+
+    def __call__(self, request):
+        with record_queries() as recorder:
+            response = self.get_response(request)
+        milliseconds = recorder.duration * 1000
+
+        if recorder.count > self.max_queries or milliseconds > self.max_ms:
+            logger.warning(
+                "%s %s: %d queries, %.1f ms, %d duplicates%s",
+                request.method, request.get_full_path(), recorder.count,
+                milliseconds, recorder.duplicates,
+                "".join(f"\n  {times}x {sql}"
+                        for sql, times in recorder.repeated()))
+
+        user = getattr(request, "user", None)
+        if user is not None and user.is_staff:
+            response["X-DB-Queries"] = str(recorder.count)
+            response["X-DB-Time-Ms"] = f"{milliseconds:.1f}"
+            response["X-DB-Duplicate-Queries"] = str(recorder.duplicates)
+        return response
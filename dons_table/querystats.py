@@ -0,0 +1,79 @@
+"""
+SQL query statistics for Don's Table.
+
+record_queries() counts the queries run inside a block, their total
+database time and how often each query shape repeats. A query shape
+(fingerprint) is the SQL with its literals and IN lists collapsed, so
+the same lookup run once per row of a list (an N+1) shows up as one
+fingerprint with a high count.
+
+Used by QueryInstrumentationMiddleware and by the query budget tests.
+"""
+
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from django.db import connections
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_LIST = re.compile(r"\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)")
+
+
+def fingerprint(sql):
+    """Return the shape of a query, without its literal values."""
+    sql = _NUMBER.sub("?", _STRING.sub("?", sql))
+    return _LIST.sub("(...)", sql)
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper that keeps statistics on the queries run.
+
+    Attributes:
+        count (int): Queries run.
+        duration (float): Seconds spent in the database.
+        fingerprints (Counter): Query fingerprint -> times run.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    @property
+    def duplicates(self):
+        """Queries that repeated an earlier query's fingerprint."""
+        return sum(times - 1 for times in self.fingerprints.values())
+
+    def repeated(self, limit=3):
+        """Return the most repeated (fingerprint, times) pairs."""
+        return [(sql, times)
+                for sql, times in self.fingerprints.most_common(limit)
+                if times > 1]
+
+
+@contextmanager
+def record_queries():
+    """
+    Record the queries run on every database connection of this thread
+    inside the block.
+
+    Yields:
+        QueryRecorder
+    """
+    recorder = QueryRecorder()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield recorder
@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 from pathlib import Path
 import os
 import dj_database_url
+from django.core.exceptions import ImproperlyConfigured
 if os.path.isfile('env.py'):
     import env
 
@@ -58,6 +59,7 @@ LOGOUT_REDIRECT_URL = '/'
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'dons_table.middleware.AnonymousPageCacheMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -87,11 +89,94 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'dons_table.wsgi.application'
 
-
+# How the site is served, set with SERVER_MODE: wsgi (default, as in the
+# Procfile) or asgi (dons_table.asgi sets it unless it is given). Under
+# ASGI the menu, reservation dashboard and availability lookup are
+# served by their async versions; under WSGI those would only run
+# through async_to_sync on every request, so the sync ones are used.
+SERVER_MODES = ('wsgi', 'asgi')
+SERVER_MODE = os.environ.get("SERVER_MODE", "wsgi").lower()
+if SERVER_MODE not in SERVER_MODES:
+    raise ImproperlyConfigured(
+        f"SERVER_MODE must be one of {', '.join(SERVER_MODES)}, "
+        f"not {SERVER_MODE!r}.")
+ASYNC_VIEWS = SERVER_MODE == 'asgi'
+
+
+# Persistent connections: each worker keeps its connection open for
+# DB_CONN_MAX_AGE seconds (0 closes it after every request) and checks
+# it is still alive before reusing it on a new request. Defaults to 0
+# under ASGI, where each request runs its queries in a fresh thread
+# with a connection of its own that would never be reused or closed.
 DATABASES = {
-    'default': dj_database_url.parse(os.environ.get("DATABASE_URL"))
+    'default': dj_database_url.parse(
+        os.environ.get("DATABASE_URL"),
+        conn_max_age=int(os.environ.get(
+            "DB_CONN_MAX_AGE", 0 if SERVER_MODE == 'asgi' else 600)),
+    )
+}
+DATABASES['default']['CONN_HEALTH_CHECKS'] = (
+    os.environ.get("DB_CONN_HEALTH_CHECKS", "true").lower() == "true")
+
+# Behind a transaction-pooling proxy such as PgBouncer, set DB_POOLER=true:
+# a server-side cursor would not survive the pooler handing the server
+# connection to another client between transactions.
+if os.environ.get("DB_POOLER", "").lower() == "true":
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+
+# Cache backend, selected with CACHE_BACKEND: locmem (default), file,
+# redis, memcached or dummy (no caching, for benchmarks and debugging).
+# CACHE_LOCATION overrides the directory or server. redis and memcached
+# use the redis and pymemcache client packages.
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache',
+               'dons-table'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache',
+             os.path.join(BASE_DIR, '.cache')),
+    'redis': ('django.core.cache.backends.redis.RedisCache',
+              os.environ.get("REDIS_URL", 'redis://127.0.0.1:6379/1')),
+    'memcached': ('django.core.cache.backends.memcached.PyMemcacheCache',
+                  '127.0.0.1:11211'),
+    'dummy': ('django.core.cache.backends.dummy.DummyCache', ''),
+}
+CACHE_BACKEND_NAME = os.environ.get("CACHE_BACKEND", "locmem")
+try:
+    CACHE_BACKEND, CACHE_DEFAULT_LOCATION = CACHE_BACKENDS[
+        CACHE_BACKEND_NAME]
+except KeyError:
+    raise ImproperlyConfigured(
+        f"CACHE_BACKEND must be one of {', '.join(CACHE_BACKENDS)}, "
+        f"not {CACHE_BACKEND_NAME!r}.") from None
+# Whether every worker (and dyno) sees the same cache, so that deleting
+# a key reaches all of them; values that other workers' edits must
+# reach are only kept long when it does.
+CACHE_SHARED = CACHE_BACKEND_NAME in ('redis', 'memcached')
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.environ.get("CACHE_LOCATION", CACHE_DEFAULT_LOCATION),
+        'KEY_PREFIX': 'dons_table',
+    }
 }
 
+# Full-page cache for anonymous visitors
+# (see dons_table.middleware.AnonymousPageCacheMiddleware)
+PAGE_CACHE_URL_NAMES = ['home', 'contact', 'menu']
+PAGE_CACHE_SECONDS = int(os.environ.get("PAGE_CACHE_SECONDS", 300))
+
+# Per-request SQL statistics, off unless SQL_INSTRUMENTATION=true
+# (see dons_table.middleware.QueryInstrumentationMiddleware). Requests
+# over SQL_LOG_QUERIES queries or SQL_LOG_MS ms of database time are
+# logged.
+SQL_INSTRUMENTATION = (
+    os.environ.get("SQL_INSTRUMENTATION", "").lower() == "true")
+SQL_LOG_QUERIES = int(os.environ.get("SQL_LOG_QUERIES", 30))
+SQL_LOG_MS = float(os.environ.get("SQL_LOG_MS", 200))
+if SQL_INSTRUMENTATION:
+    MIDDLEWARE.insert(
+        0, 'dons_table.middleware.QueryInstrumentationMiddleware')
+
 CSRF_TRUSTED_ORIGINS = [
     "http://127.0.0.1:8000",
     "http://localhost:8000",
@@ -124,6 +209,12 @@ AUTH_PASSWORD_VALIDATORS = [
 
 ACCOUNT_EMAIL_VERIFICATION = 'none'
 
+# How long a party keeps its table, by party size:
+# (largest party size, minutes at the table), checked in order
+RESERVATION_DURATIONS = [
+    (14, 60),
+]
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
 
@@ -0,0 +1,87 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, modify_settings, override_settings
+from django.urls import reverse
+from menu.models import MenuItem, MENU_CACHE_KEY, MENU_STATE_KEY
+
+
+class TestAnonymousPageCache(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.item = MenuItem.objects.create(name='Bruschetta', price=6.50,
+                                            category='starter')
+
+    def test_anonymous_hits_do_not_touch_database(self):
+        for name in ('home', 'contact', 'menu'):
+            self.client.get(reverse(name))
+            with self.assertNumQueries(0):
+                response = self.client.get(reverse(name))
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('Cookie', response['Vary'])
+
+    def test_cached_page_is_served_without_the_view(self):
+        self.client.get(reverse('menu'))
+        # A queryset update sends no signals, so only a cache hit can
+        # still show the old name.
+        MenuItem.objects.update(name='Garlic Bread')
+        cache.delete_many([MENU_CACHE_KEY, MENU_STATE_KEY])
+        self.assertContains(self.client.get(reverse('menu')), 'Bruschetta')
+
+    def test_menu_change_invalidates_cached_pages(self):
+        self.client.get(reverse('menu'))
+        self.item.name = 'Garlic Bread'
+        self.item.save()
+        self.assertContains(self.client.get(reverse('menu')), 'Garlic Bread')
+
+    def test_logged_in_users_bypass_cache(self):
+        self.client.get(reverse('home'))
+        User.objects.create_user(username='guest', password='guestpass')
+        self.client.login(username='guest', password='guestpass')
+        self.assertContains(self.client.get(reverse('home')),
+                            'You are logged in as guest')
+
+    def test_cache_hit_answers_conditional_request(self):
+        etag = self.client.get(reverse('contact'))['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('contact'),
+                                       HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_other_pages_are_not_cached(self):
+        response = self.client.get(reverse('account_login'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(cache.get(
+            f"pagecache:0:{reverse('account_login')}"))
+
+
+@modify_settings(MIDDLEWARE={
+    'prepend': 'dons_table.middleware.QueryInstrumentationMiddleware'})
+class TestQueryInstrumentation(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.staff = User.objects.create_user(username='staff',
+                                              is_staff=True)
+
+    def test_staff_see_query_headers(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('reservation_dashboard'))
+        self.assertGreater(int(response['X-DB-Queries']), 0)
+        self.assertIn('X-DB-Time-Ms', response)
+        self.assertIn('X-DB-Duplicate-Queries', response)
+
+    def test_other_visitors_do_not(self):
+        response = self.client.get(reverse('menu'))
+        self.assertNotIn('X-DB-Queries', response)
+        self.client.force_login(User.objects.create_user(username='diner'))
+        response = self.client.get(reverse('reservation_dashboard'))
+        self.assertNotIn('X-DB-Queries', response)
+
+    @override_settings(SQL_LOG_QUERIES=1)
+    def test_requests_over_the_threshold_are_logged(self):
+        self.client.force_login(self.staff)
+        with self.assertLogs('dons_table.middleware', 'WARNING') as logs:
+            self.client.get(reverse('reservation_dashboard'))
+        self.assertIn('GET /reservation/dashboard/', logs.output[0])
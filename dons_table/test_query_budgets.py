@@ -0,0 +1,184 @@
+from datetime import date, time, timedelta
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from menu import urls as menu_urls
+from menu.models import MenuItem
+from reservations import urls as reservation_urls
+from reservations.models import Reservation, WaitlistEntry
+from .querystats import fingerprint, record_queries
+
+# Most queries each view may run on the test data below: a dozen
+# reservations from several users, a waitlist and a full menu, so a
+# query per row pushes a view over. Every view in menu/urls.py and
+# reservations/urls.py needs a budget.
+QUERY_BUDGETS = {
+    'menu': 2,
+    'superuser_menu': 3,
+    'add_menu_item': 3,
+    'edit_menu_item': 3,
+    'delete_menu_item': 4,
+    'reservation_dashboard': 4,
+    'make_reservation': 17,
+    'edit_reservation': 14,
+    'cancel_reservation': 11,
+    'join_waitlist': 8,
+    'leave_waitlist': 4,
+    'superuser_reservations': 8,
+    'export_reservations': 3,
+    'occupancy_heatmap': 5,
+    'availability': 2,
+}
+
+
+class QueryBudgetTestCase(TestCase):
+    """
+    TestCase with assertQueryBudget, which fails when a request runs
+    more queries than its view's budget in QUERY_BUDGETS.
+    """
+
+    def assertQueryBudget(self, url_name, request, *args, **kwargs):
+        """
+        Run ``request(*args, **kwargs)`` and check its query count.
+
+        Returns:
+            The response.
+        """
+        budget = QUERY_BUDGETS[url_name]
+        with record_queries() as recorder:
+            response = request(*args, **kwargs)
+            if response.streaming:  # the queries run as it is read
+                response.streaming_content = [
+                    b"".join(response.streaming_content)]
+        if recorder.count > budget:
+            repeated = "".join(f"\n  {times}x {sql}"
+                               for sql, times in recorder.repeated())
+            self.fail(f"{url_name} ran {recorder.count} queries, over its "
+                      f"budget of {budget}{repeated}")
+        return response
+
+
+class TestQueryBudgets(QueryBudgetTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.admin = User.objects.create_superuser(username="admin")
+        self.user = User.objects.create_user(username="diner")
+        self.day = date.today() + timedelta(days=3)
+        guests = [User.objects.create_user(username=f"guest{i}")
+                  for i in range(6)]
+        for i, guest in enumerate(guests * 2):
+            Reservation.objects.create(
+                user=guest, date=self.day + timedelta(days=i % 2),
+                time=time(12 + i % 8, 0), guests=2 + i % 4,
+                status=("pending", "confirmed")[i % 2])
+        self.reservation = Reservation.objects.create(
+            user=self.user, date=self.day, time=time(19, 0), guests=2)
+        self.entry = WaitlistEntry.objects.create(
+            user=self.user, date=self.day, slot=time(20, 0), guests=2)
+        for guest in guests:
+            WaitlistEntry.objects.create(user=guest, date=self.day,
+                                         slot=time(21, 0), guests=3)
+        for i, category in enumerate(["starter", "main", "dessert"] * 4):
+            self.item = MenuItem.objects.create(
+                name=f"Dish {i}", price=5 + i, category=category)
+
+    def test_every_view_has_a_budget(self):
+        names = {pattern.name for urls in (menu_urls, reservation_urls)
+                 for pattern in urls.urlpatterns}
+        self.assertEqual(names, set(QUERY_BUDGETS))
+
+    def test_menu_views(self):
+        self.assertQueryBudget('menu', self.client.get, reverse('menu'))
+        self.client.force_login(self.admin)
+        for name, args in [('superuser_menu', ()), ('add_menu_item', ()),
+                           ('edit_menu_item', (self.item.id,))]:
+            response = self.assertQueryBudget(
+                name, self.client.get, reverse(name, args=args))
+            self.assertEqual(response.status_code, 200)
+        response = self.assertQueryBudget(
+            'add_menu_item', self.client.post, reverse('add_menu_item'),
+            {'name': 'Tiramisu', 'price': '7.00', 'category': 'dessert',
+             'available': 'on'})
+        self.assertEqual(response.status_code, 302)
+        response = self.assertQueryBudget(
+            'delete_menu_item', self.client.post,
+            reverse('delete_menu_item', args=[self.item.id]))
+        self.assertEqual(response.status_code, 302)
+
+    def test_diner_views(self):
+        self.client.force_login(self.user)
+        for name, args in [('reservation_dashboard', ()),
+                           ('make_reservation', ()),
+                           ('edit_reservation', (self.reservation.id,))]:
+            response = self.assertQueryBudget(
+                name, self.client.get, reverse(name, args=args))
+            self.assertEqual(response.status_code, 200)
+        response = self.assertQueryBudget(
+            'make_reservation', self.client.post,
+            reverse('make_reservation'),
+            {'date': self.day, 'time': '13:30:00', 'guests': 4,
+             'submission_token': '6f1d3c1e-8a52-4c1b-9f0e-2b7a4d9c5e10'})
+        self.assertEqual(response.status_code, 302)
+        response = self.assertQueryBudget(
+            'edit_reservation', self.client.post,
+            reverse('edit_reservation', args=[self.reservation.id]),
+            {'date': self.day, 'time': '19:30:00', 'guests': 3})
+        self.assertEqual(response.status_code, 302)
+        response = self.assertQueryBudget(
+            'join_waitlist', self.client.post, reverse('join_waitlist'),
+            {'date': self.day, 'slot': '18:00:00', 'guests': 2})
+        self.assertEqual(response.status_code, 302)
+        response = self.assertQueryBudget(
+            'leave_waitlist', self.client.post,
+            reverse('leave_waitlist', args=[self.entry.id]))
+        self.assertEqual(response.status_code, 302)
+        response = self.assertQueryBudget(
+            'cancel_reservation', self.client.post,
+            reverse('cancel_reservation', args=[self.reservation.id]))
+        self.assertEqual(response.status_code, 302)
+        response = self.assertQueryBudget(
+            'availability', self.client.get, reverse('availability'),
+            {'start': self.day, 'end': self.day + timedelta(days=6)})
+        self.assertEqual(response.status_code, 200)
+
+    def test_staff_views(self):
+        self.client.force_login(self.admin)
+        for name in ('superuser_reservations', 'occupancy_heatmap'):
+            response = self.assertQueryBudget(
+                name, self.client.get, reverse(name),
+                {'archived': '1'} if name == 'superuser_reservations'
+                else {})
+            self.assertEqual(response.status_code, 200)
+        response = self.assertQueryBudget(
+            'export_reservations', self.client.get,
+            reverse('export_reservations'))
+        self.assertEqual(response.status_code, 200)
+        ids = Reservation.objects.filter(
+            status="pending").values_list("id", flat=True)
+        response = self.assertQueryBudget(
+            'superuser_reservations', self.client.post,
+            reverse('superuser_reservations'),
+            {'reservation_ids': list(ids), 'status': 'confirmed'})
+        self.assertEqual(response.status_code, 302)
+
+
+class TestQueryFingerprints(TestCase):
+
+    def test_literals_and_in_lists_are_collapsed(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id IN (%s, %s, %s) "
+                        "AND name = 'x' LIMIT 21"),
+            fingerprint("SELECT * FROM t WHERE id IN (%s) "
+                        "AND name = 'y' LIMIT 5"))
+
+    def test_recorder_counts_repeated_queries(self):
+        with record_queries() as recorder:
+            for _ in range(3):
+                list(User.objects.filter(username="nobody"))
+            User.objects.count()
+        self.assertEqual(recorder.count, 4)
+        self.assertEqual(recorder.duplicates, 2)
+        self.assertEqual(recorder.repeated()[0][1], 3)
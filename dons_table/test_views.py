@@ -0,0 +1,29 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+
+class TestPublicPagesConditionalGet(TestCase):
+
+    def test_home_and_contact_return_304_when_unchanged(self):
+        for name in ('home', 'contact'):
+            response = self.client.get(reverse(name))
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.has_header('Last-Modified'))
+            response = self.client.get(
+                reverse(name), HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(response.status_code, 304)
+
+    def test_if_modified_since_returns_304(self):
+        response = self.client.get(reverse('contact'))
+        response = self.client.get(
+            reverse('contact'),
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_login_changes_etag(self):
+        etag = self.client.get(reverse('home'))['ETag']
+        User.objects.create_user(username='guest', password='guestpass')
+        self.client.login(username='guest', password='guestpass')
+        response = self.client.get(reverse('home'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
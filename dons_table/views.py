@@ -1,18 +1,53 @@
 from django.shortcuts import render
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_cookie
+from .conditional import page_etag, page_last_modified, template_modified
 
 
+def _static_page_validators(template_name):
+    """
+    Return (etag_func, last_modified_func) for a page that only changes
+    when its template does.
+    """
+    def etag(request):
+        return page_etag(request, template_modified(template_name))
+
+    def last_modified(request):
+        return page_last_modified(request, template_modified(template_name))
+
+    return etag, last_modified
+
+
+_home_etag, _home_last_modified = _static_page_validators("base.html")
+_contact_etag, _contact_last_modified = (
+    _static_page_validators("contact.html"))
+
+
+@vary_on_cookie
+@condition(etag_func=_home_etag, last_modified_func=_home_last_modified)
 def home(request):
     """
     Render the home page of Don's Table.
+
+    Answers conditional requests with 304 Not Modified until the
+    template changes.
+
     Template:
         base.html
     """
     return render(request, 'base.html')
 
 
+@vary_on_cookie
+@condition(etag_func=_contact_etag,
+           last_modified_func=_contact_last_modified)
 def contact(request):
     """
     Render the contact page of Don's Table.
+
+    Answers conditional requests with 304 Not Modified until the
+    template changes.
+
     Template:
         contact.html
     """
@@ -7,11 +7,19 @@ in the restaurant.
 
 from django.db import models
 
+# Cache keys for the rendered public menu and its last-modified state,
+# both cleared by menu.signals
+MENU_CACHE_KEY = "menu:items_html"
+MENU_STATE_KEY = "menu:state"
+
 
 class MenuItem(models.Model):
     """
     Represents a single item on the restaurant menu.
 
+    updated_at is bumped on every save and drives the ETag and
+    Last-Modified headers of the public menu page.
+
     Meta:
         ordering: Items are ordered by category, then by name.
     """
@@ -27,6 +35,7 @@ class MenuItem(models.Model):
     price = models.DecimalField(max_digits=6, decimal_places=2)
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES)
     available = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         """
@@ -0,0 +1,21 @@
+"""
+Signal handlers for the Menu app.
+
+Clears the cached public menu (and the anonymous full-page cache)
+whenever a MenuItem is saved or deleted, whether from the superuser
+menu views or the Django admin.
+"""
+
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from dons_table.middleware import clear_page_cache
+from .models import MenuItem, MENU_CACHE_KEY, MENU_STATE_KEY
+
+
+@receiver(post_save, sender=MenuItem)
+@receiver(post_delete, sender=MenuItem)
+def clear_menu_cache(sender, **kwargs):
+    """Drop the cached menu so the next request renders it afresh."""
+    cache.delete_many([MENU_CACHE_KEY, MENU_STATE_KEY])
+    clear_page_cache()
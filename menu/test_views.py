@@ -1,8 +1,12 @@
+from unittest import mock
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.urls import reverse
-from django.test import TestCase
-from .models import MenuItem
+from django.test import TestCase, override_settings
+from dons_table.caching import LOCAL_CACHE_SECONDS
+from .models import MenuItem, MENU_CACHE_KEY, MENU_STATE_KEY
 from .forms import MenuItemForm
+from .views import MENU_CACHE_SECONDS
 
 
 class TestMenuCRUDViews(TestCase):
@@ -73,3 +77,94 @@ class TestMenuCRUDViews(TestCase):
                                             args=[self.item.id]))
         self.assertEqual(response.status_code, 302)
         self.assertFalse(MenuItem.objects.filter(id=self.item.id).exists())
+
+
+class TestMenuPageCache(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.item = MenuItem.objects.create(
+            name='Bruschetta',
+            description='Tasty bread with tomato',
+            price=6.50,
+            category='starter',
+            available=True
+        )
+        MenuItem.objects.create(name='Tiramisu', price=7.00,
+                                category='dessert', available=False)
+
+    def test_menu_lists_available_items_in_one_query(self):
+        # One aggregate for the ETag, one query for every item
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('menu'))
+        self.assertContains(response, 'Bruschetta')
+        self.assertNotContains(response, 'Tiramisu')
+
+    def test_cache_hit_makes_no_queries(self):
+        self.client.get(reverse('menu'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('menu'))
+        self.assertContains(response, 'Bruschetta')
+
+    def test_save_and_delete_invalidate_cache(self):
+        self.client.get(reverse('menu'))
+        self.item.name = 'Garlic Bread'
+        self.item.save()
+        self.assertContains(self.client.get(reverse('menu')), 'Garlic Bread')
+        self.item.delete()
+        self.assertNotContains(self.client.get(reverse('menu')),
+                               'Garlic Bread')
+
+
+    def test_menu_is_kept_briefly_without_a_shared_cache(self):
+        for shared, seconds in [(False, LOCAL_CACHE_SECONDS),
+                                (True, MENU_CACHE_SECONDS)]:
+            cache.clear()
+            with override_settings(CACHE_SHARED=shared), \
+                    mock.patch.object(cache, "set") as cache_set:
+                self.client.get(reverse('menu'))
+            timeouts = {call.args[0]: call.args[2]
+                        for call in cache_set.call_args_list}
+            self.assertEqual(timeouts[MENU_STATE_KEY], seconds)
+            self.assertEqual(timeouts[MENU_CACHE_KEY], seconds)
+
+
+class TestMenuConditionalGet(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.item = MenuItem.objects.create(name='Bruschetta', price=6.50,
+                                            category='starter')
+
+    def test_unchanged_menu_returns_304(self):
+        response = self.client.get(reverse('menu'))
+        self.assertTrue(response.has_header('ETag'))
+        self.assertTrue(response.has_header('Last-Modified'))
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                reverse('menu'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_changed_menu_returns_200(self):
+        etag = self.client.get(reverse('menu'))['ETag']
+        self.item.price = 7.00
+        self.item.save()
+        response = self.client.get(reverse('menu'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_deleted_item_changes_etag(self):
+        other = MenuItem.objects.create(name='Cannoli', price=5.00,
+                                        category='dessert')
+        etag = self.client.get(reverse('menu'))['ETag']
+        other.delete()
+        response = self.client.get(reverse('menu'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_differs_per_viewer(self):
+        User.objects.create_user(username='guest', password='guestpass')
+        anonymous = self.client.get(reverse('menu'))['ETag']
+        self.client.login(username='guest', password='guestpass')
+        response = self.client.get(reverse('menu'),
+                                   HTTP_IF_NONE_MATCH=anonymous)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], anonymous)
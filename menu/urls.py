@@ -7,11 +7,13 @@ Defines the URL patterns for menu-related views:
 - Superuser menu management: list, add, edit, delete
 """
 
+from django.conf import settings
 from django.urls import path
 from . import views
 
 urlpatterns = [
-    path("", views.my_menu, name="menu"),
+    path("", views.amy_menu if settings.ASYNC_VIEWS else views.my_menu,
+         name="menu"),
     path('manage/', views.superuser_menu, name='superuser_menu'),
     path('manage/add/', views.add_menu_item, name='add_menu_item'),
     path('manage/<int:item_id>/edit/',
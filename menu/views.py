@@ -4,27 +4,142 @@ Views for the Menu app.
 Contains view functions for displaying the restaurant menu.
 """
 
+from django.core.cache import cache
+from django.db.models import Count, Max
 from django.shortcuts import render, get_object_or_404, redirect
 from django.http import HttpResponse
-from .models import MenuItem
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from dons_table.asyncviews import (aget_user, not_modified_response,
+                                   set_validators)
+from dons_table.caching import cache_seconds
+from dons_table.conditional import (page_etag, page_last_modified,
+                                    template_modified)
+from .models import MenuItem, MENU_CACHE_KEY, MENU_STATE_KEY
 from .forms import MenuItemForm
 from django.contrib import messages
 from django.contrib.auth.decorators import user_passes_test
 
 
+MENU_CATEGORIES = ["starter", "main", "dessert", "drink"]
+
+# Safety net only: changes clear the cache straight away through
+# menu.signals, but a per-process cache can't be cleared in other
+# workers, so it keeps the menu for less (see cache_seconds).
+MENU_CACHE_SECONDS = 60 * 15
+
+
+def menu_items_by_category():
+    """
+    Return the available menu items grouped by category.
+
+    Fetches every available item in one query (already ordered by
+    category and name) and groups them in Python.
+
+    Returns:
+        dict: category -> list of MenuItem, in MENU_CATEGORIES order
+    """
+    grouped = {category: [] for category in MENU_CATEGORIES}
+    for item in MenuItem.objects.filter(available=True,
+                                        category__in=MENU_CATEGORIES):
+        grouped[item.category].append(item)
+    return grouped
+
+
+async def amenu_items_by_category():
+    """Async version of menu_items_by_category, for amy_menu."""
+    grouped = {category: [] for category in MENU_CATEGORIES}
+    async for item in MenuItem.objects.filter(available=True,
+                                              category__in=MENU_CATEGORIES):
+        grouped[item.category].append(item)
+    return grouped
+
+
+def menu_state():
+    """
+    Return when the menu last changed and how many items it has.
+
+    One aggregate over MenuItem, cached alongside the rendered menu and
+    cleared by the same signals. The item count catches deletions,
+    which don't move the latest updated_at.
+
+    Returns:
+        dict: {"updated": datetime or None, "count": int}
+    """
+    state = cache.get(MENU_STATE_KEY)
+    if state is None:
+        state = MenuItem.objects.aggregate(updated=Max('updated_at'),
+                                           count=Count('id'))
+        cache.set(MENU_STATE_KEY, state, cache_seconds(MENU_CACHE_SECONDS))
+    return state
+
+
+async def amenu_state():
+    """Async version of menu_state, for amy_menu."""
+    state = await cache.aget(MENU_STATE_KEY)
+    if state is None:
+        state = await MenuItem.objects.aaggregate(updated=Max('updated_at'),
+                                                  count=Count('id'))
+        await cache.aset(MENU_STATE_KEY, state,
+                        cache_seconds(MENU_CACHE_SECONDS))
+    return state
+
+
+def _menu_validators(request, state):
+    """Return the (ETag, Last-Modified) of the menu page."""
+    templates = template_modified("menu.html", "menu_items.html")
+    return (page_etag(request, state["updated"], state["count"], templates),
+            page_last_modified(request, state["updated"], templates))
+
+
 def my_menu(request):
     """
     Display the menu page with available items grouped by category.
 
     Categories considered: Starter, Main Course, Dessert, Drink.
 
+    The rendered list of items is cached and cleared whenever a
+    MenuItem is saved or deleted, so a cache hit touches no database
+    table for menu data. Conditional requests get 304 Not Modified
+    without rendering while the menu is unchanged. Served as amy_menu
+    instead when settings.ASYNC_VIEWS is on.
+
     Template:
-        menu.html
+        menu.html (items rendered by menu_items.html)
+    """
+    etag, last_modified = _menu_validators(request, menu_state())
+    response = not_modified_response(request, etag, last_modified)
+    if response is None:
+        menu_html = cache.get(MENU_CACHE_KEY)
+        if menu_html is None:
+            menu_html = render_to_string(
+                "menu_items.html", {"menu_items": menu_items_by_category()})
+            cache.set(MENU_CACHE_KEY, menu_html,
+                      cache_seconds(MENU_CACHE_SECONDS))
+        response = render(request, "menu.html",
+                          {"menu_html": mark_safe(menu_html)})
+    return set_validators(response, etag, last_modified)
+
+
+async def amy_menu(request):
+    """
+    Async version of my_menu, served under ASGI (settings.ASYNC_VIEWS):
+    the menu data is read with the async ORM and cache API.
     """
-    categories = ["starter", "main", "dessert", "drink"]
-    menu_items = {cat: MenuItem.objects.filter(category=cat, available=True)
-                  for cat in categories}
-    return render(request, "menu.html", {"menu_items": menu_items})
+    await aget_user(request)
+    etag, last_modified = _menu_validators(request, await amenu_state())
+    response = not_modified_response(request, etag, last_modified)
+    if response is None:
+        menu_html = await cache.aget(MENU_CACHE_KEY)
+        if menu_html is None:
+            menu_html = render_to_string(
+                "menu_items.html",
+                {"menu_items": await amenu_items_by_category()})
+            await cache.aset(MENU_CACHE_KEY, menu_html,
+                             cache_seconds(MENU_CACHE_SECONDS))
+        response = render(request, "menu.html",
+                          {"menu_html": mark_safe(menu_html)})
+    return set_validators(response, etag, last_modified)
 
 
 def superuser_required(view_func):
@@ -6,16 +6,113 @@ Registers the Reservation model with custom admin options including:
 - Filters
 - Search fields
 - Ordering
+- A form that checks the party still fits its slots and tables
+
+a read-only view of archived reservations, the dining room's tables
+(with the tables each reservation is seated at), the waitlist and
+the opening hours.
 """
 
-from django.contrib import admin
-from .models import Reservation
+from django import forms
+from django.contrib import admin, messages
+from django.http import HttpResponseRedirect
+from .forms import SLOT_FULL_MESSAGE, check_room
+from .models import (ArchivedReservation, OpeningHours, Reservation,
+                     SlotFullError, SpecialDate, Table, TableAssignment,
+                     WaitlistEntry)
+
+
+class TableAssignmentInline(admin.TabularInline):
+    model = TableAssignment
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+class ReservationAdminForm(forms.ModelForm):
+    """
+    Admin form for a Reservation that checks the party still fits its
+    slots and tables (see forms.check_room) unless it is cancelled.
+    Staff may book past dates and outside the opening hours.
+    """
+
+    def clean(self):
+        cleaned = super().clean()
+        day, start, guests = (cleaned.get('date'), cleaned.get('time'),
+                              cleaned.get('guests'))
+        if day and start and guests and cleaned.get('status') != "cancelled":
+            check_room(self.instance, day, start, guests)
+        return cleaned
 
 
 @admin.register(Reservation)
 class ReservationAdmin(admin.ModelAdmin):
+    form = ReservationAdminForm
     list_display = ('user', 'date', 'time', 'end_time',
                     'guests', 'status', 'created_on')
     list_filter = ('status', 'date', 'guests')
     search_fields = ('user__username', 'special_requests')
     ordering = ('date', 'time')
+    inlines = [TableAssignmentInline]
+
+    def changeform_view(self, request, *args, **kwargs):
+        # Another booking can take the seats between the form's check
+        # and the save; the save is rolled back, so send staff back to
+        # the form instead of a server error.
+        try:
+            return super().changeform_view(request, *args, **kwargs)
+        except SlotFullError:
+            self.message_user(request, SLOT_FULL_MESSAGE, messages.ERROR)
+            return HttpResponseRedirect(request.get_full_path())
+
+
+@admin.register(ArchivedReservation)
+class ArchivedReservationAdmin(admin.ModelAdmin):
+    list_display = ('user', 'date', 'time', 'guests', 'status',
+                    'archived_on')
+    list_filter = ('status', 'date')
+    search_fields = ('user__username', 'special_requests')
+    ordering = ('date', 'time')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Table)
+class TableAdmin(admin.ModelAdmin):
+    list_display = ('name', 'seats', 'combine_group', 'is_active')
+    list_filter = ('is_active', 'combine_group')
+    list_editable = ('seats', 'combine_group', 'is_active')
+    ordering = ('name',)
+
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ('user', 'date', 'slot', 'guests', 'created')
+    list_filter = ('date',)
+    search_fields = ('user__username', 'special_requests')
+    ordering = ('date', 'slot', 'created')
+
+
+@admin.register(OpeningHours)
+class OpeningHoursAdmin(admin.ModelAdmin):
+    list_display = ('weekday', 'first_seating', 'last_seating')
+    list_filter = ('weekday',)
+    ordering = ('weekday', 'first_seating')
+
+
+@admin.register(SpecialDate)
+class SpecialDateAdmin(admin.ModelAdmin):
+    list_display = ('date', 'closed', 'first_seating', 'last_seating',
+                    'note')
+    list_filter = ('closed',)
+    search_fields = ('note',)
+    ordering = ('-date',)
@@ -0,0 +1,171 @@
+"""
+Availability lookups for the Reservations app.
+
+Works out how many seats are left for every bookable time slot over a
+range of dates from the SlotLedger, using one query for the whole
+range. The bookable slots of each date come from the opening hours
+(OpeningHours.slot_grid), so closed times are left out. Results are
+cached briefly so the reservation form can fetch availability once
+and grey out full slots without hammering the database.
+
+nearest_slots() suggests the closest slots that can take a party when
+the one it asked for is full, from the same kind of single query.
+"""
+
+import datetime
+from django.core.cache import cache
+from django.utils import timezone
+from .capacity import covered_slots, end_time_for
+from .models import (OpeningHours, SlotLedger, Table, TableAssignment,
+                     TOTAL_CAPACITY_PER_SLOT)
+from .tables import find_seating, slot_mask
+
+AVAILABILITY_CACHE_SECONDS = 30
+MAX_AVAILABILITY_DAYS = 31
+# Slots suggested when the requested one is full, and how many days
+# either side of the requested date they are looked for
+SUGGESTION_COUNT = 5
+SUGGESTION_DAYS = 3
+
+
+def remaining_seats(occupancy, day, start, guests):
+    """
+    Return the seats left for a party starting at ``start``.
+
+    Args:
+        occupancy (dict): Slot start time -> seats in use for ``day``.
+        day (date): Date of the reservation.
+        start (time): Start time of the reservation.
+        guests (int): Party size, which decides the duration.
+    """
+    slots = covered_slots(start, end_time_for(day, start, guests))
+    busiest = max((occupancy.get(slot, 0) for slot in slots), default=0)
+    return max(TOTAL_CAPACITY_PER_SLOT - busiest, 0)
+
+
+def _occupancy_rows(start, end):
+    return (SlotLedger.objects
+            .filter(date__range=(start, end), booked_guests__gt=0)
+            .values_list('date', 'slot', 'booked_guests'))
+
+
+def _build_availability(rows, grid, start, end, guests):
+    occupancy = {}
+    for day, slot, booked in rows:
+        occupancy.setdefault(day, {})[slot] = booked
+
+    now = timezone.localtime().replace(tzinfo=None)
+    availability = {}
+    for day, day_slots in grid.days(start, end).items():
+        day_occupancy = occupancy.get(day, {})
+        slots = {}
+        for slot in day_slots:
+            if datetime.datetime.combine(day, slot) < now:
+                slots[slot] = 0  # past slots can't be booked
+            else:
+                slots[slot] = remaining_seats(day_occupancy, day, slot,
+                                              guests)
+        availability[day] = slots
+    return availability
+
+
+def _cache_key(start, end, guests):
+    return f"availability:{start.isoformat()}:{end.isoformat()}:{guests}"
+
+
+def slot_availability(start, end, guests=1):
+    """
+    Return the remaining seats for every slot between two dates.
+
+    Args:
+        start (date): First date, inclusive.
+        end (date): Last date, inclusive.
+        guests (int): Party size used to work out the duration.
+
+    Returns:
+        dict: date -> {slot time -> remaining seats}, with only the
+        slots bookable under that date's opening hours
+    """
+    return cache.get_or_set(
+        _cache_key(start, end, guests),
+        lambda: _build_availability(_occupancy_rows(start, end),
+                                    OpeningHours.slot_grid(),
+                                    start, end, guests),
+        AVAILABILITY_CACHE_SECONDS)
+
+
+async def aslot_availability(start, end, guests=1):
+    """Async version of slot_availability, for async views."""
+    key = _cache_key(start, end, guests)
+    availability = await cache.aget(key)
+    if availability is None:
+        rows = [row async for row in _occupancy_rows(start, end)]
+        grid = await OpeningHours.aslot_grid()
+        availability = _build_availability(rows, grid, start, end, guests)
+        await cache.aset(key, availability, AVAILABILITY_CACHE_SECONDS)
+    return availability
+
+
+def nearest_slots(day, start, guests, ignore=None, count=SUGGESTION_COUNT,
+                  days=SUGGESTION_DAYS):
+    """
+    Return the bookable slots closest to one that is full.
+
+    Looks at the requested date and up to ``days`` days either side
+    (never in the past), within the opening hours. Seats come from one
+    SlotLedger query for the whole window and, when tables are set up,
+    tables from one TableAssignment query, so the cost does not depend
+    on how many slots are checked.
+
+    Args:
+        day (date): Date asked for.
+        start (time): Start time asked for.
+        guests (int): Party size.
+        ignore (Reservation): Reservation being edited, whose own seats
+            and tables count as free; or None.
+        count (int): Most slots returned.
+        days (int): Days searched either side of ``day``.
+
+    Returns:
+        list: (date, time) tuples, same day first and then nearer days,
+        nearest time first within a day.
+    """
+    first = max(day - datetime.timedelta(days=days), timezone.localdate())
+    last = day + datetime.timedelta(
+        days=min(days, (datetime.date.max - day).days))
+    occupancy = {}
+    for row_day, slot, booked in _occupancy_rows(first, last):
+        occupancy.setdefault(row_day, {})[slot] = booked
+    if ignore is not None and ignore.pk and ignore.status != "cancelled":
+        own = occupancy.get(ignore.date, {})
+        for slot in covered_slots(ignore.time, ignore.end_time):
+            if slot in own:
+                own[slot] -= ignore.guests
+
+    options = Table.seating_options()
+    busy = (TableAssignment.busy_by_day(
+        first, last, exclude=ignore.pk if ignore is not None else None)
+        if options else {})
+
+    now = timezone.localtime().replace(tzinfo=None)
+    wanted = start.hour * 60 + start.minute
+    found = []
+    for candidate, day_slots in OpeningHours.slot_grid().days(
+            first, last).items():
+        for slot in day_slots:
+            if ((candidate, slot) == (day, start)
+                    or datetime.datetime.combine(candidate, slot) < now):
+                continue
+            if remaining_seats(occupancy.get(candidate, {}), candidate,
+                               slot, guests) < guests:
+                continue
+            if options and find_seating(
+                    options, busy.get(candidate, {}),
+                    slot_mask(slot, end_time_for(candidate, slot, guests)),
+                    guests) is None:
+                continue
+            found.append((abs((candidate - day).days),
+                          abs(slot.hour * 60 + slot.minute - wanted),
+                          candidate, slot))
+    found.sort()
+    return [(found_day, slot) for _, _, found_day, slot in found[:count]]
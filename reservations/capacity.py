@@ -0,0 +1,128 @@
+"""
+Capacity engine for the Reservations app.
+
+Treats every reservation as an interval from its start time to its
+end time and works out how many seats are in use during each
+half-hour slot of a day. The duration of a reservation depends on the
+party size and is configured with the RESERVATION_DURATIONS setting.
+
+The SlotLedger stores the per-slot occupancy computed here, so form
+validation, the race-free booking and availability lookups all use
+the same slot arithmetic.
+"""
+
+import datetime
+from django.conf import settings
+
+SLOT_MINUTES = 30
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+
+# (largest party size, minutes at the table), checked in order
+DEFAULT_DURATIONS = [(14, 60)]
+
+
+def duration_for(guests):
+    """
+    Return how long a party of ``guests`` keeps its table.
+
+    Returns:
+        datetime.timedelta: Duration from the RESERVATION_DURATIONS
+        setting; the last entry applies to larger parties.
+    """
+    durations = getattr(settings, 'RESERVATION_DURATIONS',
+                        DEFAULT_DURATIONS)
+    for max_guests, minutes in durations:
+        if guests <= max_guests:
+            break
+    return datetime.timedelta(minutes=minutes)
+
+
+def longest_duration():
+    """Return the longest time any party keeps its table."""
+    durations = getattr(settings, 'RESERVATION_DURATIONS',
+                        DEFAULT_DURATIONS)
+    return datetime.timedelta(minutes=max(minutes
+                                          for _, minutes in durations))
+
+
+def end_time_for(day, start, guests):
+    """Return the end time of a reservation starting at ``start``."""
+    return (datetime.datetime.combine(day, start)
+            + duration_for(guests or 0)).time()
+
+
+def slots_between(first, last):
+    """Return the slot start times from ``first`` to ``last``, inclusive."""
+    return [slot_time(index) for index in
+            range(_minutes(first) // SLOT_MINUTES,
+                  _minutes(last) // SLOT_MINUTES + 1)]
+
+
+def _minutes(t):
+    return t.hour * 60 + t.minute
+
+
+def slot_range(start, end):
+    """
+    Return the first and last slot index covered by an interval.
+
+    Slots are numbered from midnight. An end time at or before the
+    start (a reservation running past midnight) is clipped to the end
+    of the day.
+    """
+    first = _minutes(start) // SLOT_MINUTES
+    end_minutes = _minutes(end)
+    if end_minutes <= _minutes(start):
+        end_minutes = 24 * 60
+    last = (end_minutes - 1) // SLOT_MINUTES
+    return first, last
+
+
+def slot_time(index):
+    """Return the start time of the slot with the given index."""
+    minutes = index * SLOT_MINUTES
+    return datetime.time(minutes // 60, minutes % 60)
+
+
+def covered_slots(start, end):
+    """Return the start times of every slot an interval overlaps."""
+    first, last = slot_range(start, end)
+    return [slot_time(i) for i in range(first, last + 1)]
+
+
+def slot_occupancy(intervals):
+    """
+    Compute the seats in use during each slot of a single day.
+
+    Runs one sweep over the day instead of a query per slot: every
+    interval adds its guests where it starts and removes them after
+    its last slot, and a running total over the sorted slot indices
+    gives the occupancy.
+
+    Args:
+        intervals: Iterable of (start, end, guests) tuples.
+
+    Returns:
+        dict: Slot start time -> seats in use, for occupied slots only.
+    """
+    deltas = {}
+    for start, end, guests in intervals:
+        first, last = slot_range(start, end)
+        deltas[first] = deltas.get(first, 0) + guests
+        deltas[last + 1] = deltas.get(last + 1, 0) - guests
+
+    occupancy = {}
+    running = 0
+    boundaries = sorted(deltas)
+    for index, boundary in enumerate(boundaries):
+        running += deltas[boundary]
+        if running and boundary < SLOTS_PER_DAY:
+            stop = min(boundaries[index + 1], SLOTS_PER_DAY)
+            for slot in range(boundary, stop):
+                occupancy[slot_time(slot)] = running
+    return occupancy
+
+
+def peak_occupancy(intervals):
+    """Return the peak number of seats in use at once during a day."""
+    return max(slot_occupancy(intervals).values(), default=0)
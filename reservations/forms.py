@@ -3,34 +3,80 @@ Forms for the Reservations app.
 
 Includes:
 - ReservationForm: Handles validation and input for making a reservation.
-- generate_time_choices: Generates half-hourly time slots for reservations.
+- WaitlistForm: Joins the waitlist for a slot that is full.
+- check_room: Checks a party fits the slots and tables at a time.
+- generate_time_choices: Generates the bookable time slots for reservations.
 """
 
 from django import forms
 from django.utils import timezone
-from django.db.models import Sum
 import datetime
-from .models import Reservation
+from .models import (OpeningHours, Reservation, SlotLedger,
+                     TableAssignment, TOTAL_CAPACITY_PER_SLOT, WaitlistEntry)
+from .availability import nearest_slots
+from .capacity import covered_slots, end_time_for
 
-TOTAL_CAPACITY_PER_SLOT = 50
+SLOT_FULL_MESSAGE = "Not enough availability for that time slot."
+NO_TABLE_MESSAGE = "No table is free for a party of that size at that time."
+CLOSED_MESSAGE = "We are not taking bookings at that time on that date."
 
 
 def generate_time_choices():
     """
     Generate a list of time slots for reservations.
 
-    Time slots are half-hourly from 11:00 AM to 10:30 PM.
+    Time slots are every start time that can be booked on some day
+    under the opening hours (see OpeningHours.slot_grid).
 
     Returns:
         list of tuples: Each tuple contains (datetime.time, formatted string)
     """
-    times = []
-    for hour in range(11, 23):
-        for minute in (0, 30):
-            t = datetime.time(hour, minute)
-            label = t.strftime("%I:%M %p")
-            times.append((t, label))
-    return times
+    return [(t, t.strftime("%I:%M %p"))
+            for t in OpeningHours.slot_grid().all_slots()]
+
+
+def _coerce_time(value):
+    if isinstance(value, str):
+        return datetime.datetime.strptime(value, "%H:%M:%S").time()
+    return value
+
+
+def _check_bookable(day, start):
+    chosen_dt = timezone.make_aware(datetime.datetime.combine(day, start),
+                                    timezone.get_current_timezone())
+    if chosen_dt < timezone.now():
+        raise forms.ValidationError("Reservation cannot be in the past.")
+    if start not in OpeningHours.slot_grid().slots_for(day):
+        raise forms.ValidationError(CLOSED_MESSAGE)
+
+
+def check_room(instance, day, start, guests):
+    """
+    Check a party fits every slot it would overlap and, when tables are
+    set up, can be seated.
+
+    Args:
+        instance (Reservation): The reservation being edited, as stored
+            (its guests are not counted against itself), or an unsaved
+            one.
+        day (date): Date wanted.
+        start (time): Start time wanted.
+        guests (int): Party size.
+
+    Raises:
+        forms.ValidationError: SLOT_FULL_MESSAGE or NO_TABLE_MESSAGE.
+    """
+    end = end_time_for(day, start, guests)
+    booked = SlotLedger.occupancy(day, covered_slots(start, end))
+    if (instance.pk and instance.status != "cancelled"
+            and instance.date == day):
+        for slot in covered_slots(instance.time, instance.end_time):
+            if slot in booked:
+                booked[slot] -= instance.guests
+    if max(booked.values(), default=0) + guests > TOTAL_CAPACITY_PER_SLOT:
+        raise forms.ValidationError(SLOT_FULL_MESSAGE)
+    if TableAssignment.plan(day, [(instance.pk, start, end, guests)]) is None:
+        raise forms.ValidationError(NO_TABLE_MESSAGE)
 
 
 class ReservationForm(forms.ModelForm):
@@ -39,19 +85,30 @@ class ReservationForm(forms.ModelForm):
 
     Fields:
         date: Date of the reservation.
-        time: Time of the reservation (half-hour slots).
+        time: Time of the reservation (half-hour slots within the
+            opening hours).
         guests: Number of guests (1–14).
         special_requests: Optional text for special requests.
 
     Validation:
         - Ensures reservation is not in the past.
-        - Checks that the total number of guests in a time slot
-          does not exceed TOTAL_CAPACITY_PER_SLOT.
+        - Ensures the time is bookable on that date under the opening
+          hours, before any capacity query.
+        - Checks that the seats in use during every slot the reservation
+          overlaps do not exceed TOTAL_CAPACITY_PER_SLOT, using the
+          SlotLedger.
+        - Checks that the party can be seated at a table (or tables
+          pushed together), when tables are set up.
+
+    Attributes:
+        suggestions (list): When the slot is full, the nearest
+        (date, time) slots that can take the party (see
+        availability.nearest_slots); empty otherwise.
     """
+    suggestions = ()
+
     time = forms.TypedChoiceField(
-        choices=[("", "-- : --")] + generate_time_choices(),
-        coerce=lambda v: datetime.datetime.strptime(v, "%H:%M:%S").time()
-        if isinstance(v, str) else v,
+        coerce=_coerce_time,
         widget=forms.Select(attrs={'class': 'form-control'})
     )
 
@@ -67,13 +124,21 @@ class ReservationForm(forms.ModelForm):
             (attrs={'rows': 3, 'class': 'form-control'}),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # built per form so changes to the opening hours show at once
+        self.fields['time'].choices = ([("", "-- : --")]
+                                       + generate_time_choices())
+
     def clean(self):
         """
         Validate reservation data.
 
         Checks:
         - Reservation datetime is not in the past.
-        - Total guests for the selected time slot do not exceed capacity.
+        - The time is within the opening hours of that date.
+        - Seats in use during the reservation do not exceed capacity.
+        - A table is free for the party (see TableAssignment.plan).
 
         Returns:
             dict: Cleaned data
@@ -92,23 +157,55 @@ class ReservationForm(forms.ModelForm):
                 except ValueError:
                     t = datetime.datetime.strptime(t, "%H:%M").time()
 
-            chosen_dt = datetime.datetime.combine(d, t)
-            chosen_dt = timezone.make_aware(chosen_dt,
-                                            timezone.get_current_timezone())
+            _check_bookable(d, t)
 
-            if chosen_dt < timezone.now():
-                raise forms.ValidationError(
-                    "Reservation cannot be in the past."
-                    )
-
-        # capacity check
+        # capacity check over every slot the reservation would overlap
         if d and t and g:
-            existing = (Reservation.objects
-                        .filter(date=d, time=t)
-                        .aggregate(total=Sum('guests'))['total'] or 0)
-            if existing + g > TOTAL_CAPACITY_PER_SLOT:
-                raise forms.ValidationError(
-                    "Not enough availability for that time slot."
-                    )
+            try:
+                check_room(self.instance, d, t, g)
+            except forms.ValidationError:
+                self._suggest(d, t, g)
+                raise
+
+        return cleaned
+
+    def _suggest(self, day, start, guests):
+        """Find the nearest slots that can take a party that did not fit."""
+        self.suggestions = nearest_slots(
+            day, start, guests,
+            ignore=self.instance if self.instance.pk else None)
+
 
+class WaitlistForm(forms.ModelForm):
+    """
+    Form for joining the waitlist of a full slot.
+
+    Posted from the reservation form, with the details of the booking
+    that did not fit in hidden fields.
+
+    Validation:
+        - Ensures the slot is not in the past and is within the opening
+          hours of the date.
+    """
+    slot = forms.TypedChoiceField(coerce=_coerce_time)
+
+    class Meta:
+        model = WaitlistEntry
+        fields = ['date', 'slot', 'guests', 'special_requests']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['slot'].choices = generate_time_choices()
+
+    def clean(self):
+        """
+        Validate the waitlist entry.
+
+        Raises:
+            forms.ValidationError: If the slot is in the past or the
+            restaurant is not taking bookings then.
+        """
+        cleaned = super().clean()
+        if cleaned.get('date') and cleaned.get('slot'):
+            _check_bookable(cleaned['date'], cleaned['slot'])
         return cleaned
@@ -0,0 +1,92 @@
+"""
+Slot grid for the Reservations app.
+
+Turns the opening hours (weekly sittings plus special dates such as
+holidays) into the start times that can be booked on each date. The
+grid is worked out once for the seven weekdays and every special date,
+so finding the slots of any date is a dictionary lookup.
+
+Works on plain tuples and makes no queries; OpeningHours.slot_grid
+loads the hours and caches the grid until they change (or briefly,
+without a shared cache).
+"""
+
+import datetime
+from typing import NamedTuple
+from .capacity import slots_between
+
+# Sittings used for every weekday until opening hours are entered
+DEFAULT_SITTINGS = [(datetime.time(11, 0), datetime.time(22, 30))]
+
+
+def _sitting_slots(sittings):
+    slots = set()
+    for first, last in sittings:
+        slots.update(slots_between(first, last))
+    return tuple(sorted(slots))
+
+
+class SlotGrid(NamedTuple):
+    """
+    Bookable start times per date.
+
+    Attributes:
+        weekdays (tuple): Seven tuples of start times, Monday first.
+        special (dict): date -> tuple of start times, for dates whose
+        hours differ from their weekday's (an empty tuple when closed).
+    """
+    weekdays: tuple
+    special: dict
+
+    def slots_for(self, day):
+        """Return the start times that can be booked on ``day``."""
+        slots = self.special.get(day)
+        return self.weekdays[day.weekday()] if slots is None else slots
+
+    def days(self, first, last):
+        """Return date -> start times for every date in a range."""
+        grid = {}
+        # offsets from ``first``, so a range ending on date.max does not
+        # step past it
+        for offset in range((last - first).days + 1):
+            day = first + datetime.timedelta(days=offset)
+            grid[day] = self.slots_for(day)
+        return grid
+
+    def all_slots(self):
+        """Return every start time bookable on some day, sorted."""
+        slots = set()
+        for day_slots in self.weekdays:
+            slots.update(day_slots)
+        for day_slots in self.special.values():
+            slots.update(day_slots)
+        return sorted(slots)
+
+
+def build_grid(weekly, special):
+    """
+    Work out the slot grid from the opening hours.
+
+    Args:
+        weekly: Iterable of (weekday, first seating, last seating)
+            tuples, weekday 0 being Monday. A weekday can have several
+            sittings (lunch and dinner) and one without any is closed.
+            With no sittings at all, every day uses DEFAULT_SITTINGS.
+        special: Iterable of (date, closed, first seating, last seating)
+            tuples overriding the weekly hours of single dates.
+
+    Returns:
+        SlotGrid
+    """
+    sittings = {weekday: [] for weekday in range(7)}
+    weekly = list(weekly)
+    for weekday, first, last in weekly:
+        sittings[weekday].append((first, last))
+    if not weekly:
+        sittings = {weekday: DEFAULT_SITTINGS for weekday in range(7)}
+    return SlotGrid(
+        weekdays=tuple(_sitting_slots(sittings[weekday])
+                       for weekday in range(7)),
+        special={day: () if closed else _sitting_slots([(first, last)])
+                 for day, closed, first, last in special},
+    )
@@ -0,0 +1,90 @@
+"""
+Management command to move past reservations into ArchivedReservation.
+
+Rows dated before --before are copied to the archive and deleted from
+Reservation in batches, each batch in its own short transaction, so
+locks are only held for one batch at a time. The command is resumable:
+an interrupted run leaves every batch either fully moved or untouched,
+and running it again carries on with the rows that are left.
+
+Once every reservation before the cut-off is archived, the SlotLedger
+rows, BookingDay locks and waitlist entries for those dates are
+deleted too; past slots have no capacity to protect and no seats to
+wait for.
+
+Usage:
+    python manage.py archive_reservations --before 2025-01-01
+    python manage.py archive_reservations --before 2025-01-01 \\
+        --batch-size 500 --pause 0.1
+"""
+
+import datetime
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.timezone import localdate
+from reservations.models import (ArchivedReservation, BookingDay,
+                                 Reservation, SlotLedger, WaitlistEntry)
+from reservations.signals import ledger_release_disabled
+
+
+class Command(BaseCommand):
+    help = "Move reservations before a date into the archive table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--before', required=True, type=datetime.date.fromisoformat,
+            help="Archive reservations dated before this day (YYYY-MM-DD); "
+                 "at most today.")
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help="Reservations moved per transaction (default 1000).")
+        parser.add_argument(
+            '--pause', type=float, default=0,
+            help="Seconds to sleep between batches, to leave room for "
+                 "live traffic.")
+
+    def handle(self, *args, **options):
+        before = options['before']
+        if before > localdate():
+            raise CommandError("--before cannot be later than today.")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        moved = 0
+        while True:
+            count = self._move_batch(before, options['batch_size'])
+            if not count:
+                break
+            moved += count
+            self.stdout.write(f"Archived {moved} reservation(s)...")
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        SlotLedger.objects.filter(date__lt=before).delete()
+        BookingDay.objects.filter(date__lt=before).delete()
+        WaitlistEntry.objects.filter(date__lt=before).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {moved} reservation(s) dated before {before}."))
+
+    @staticmethod
+    def _move_batch(before, size):
+        """Archive the next batch of old reservations; return its size."""
+        with transaction.atomic():
+            batch = list(
+                Reservation.objects
+                .select_for_update()
+                .filter(date__lt=before)
+                .order_by('pk')[:size]
+            )
+            if not batch:
+                return 0
+            ArchivedReservation.objects.bulk_create(
+                [ArchivedReservation.from_reservation(r) for r in batch],
+                ignore_conflicts=True,
+            )
+            # Past slots are cleared in one go once the run completes
+            with ledger_release_disabled():
+                Reservation.objects.filter(
+                    pk__in=[r.pk for r in batch]).delete()
+        return len(batch)
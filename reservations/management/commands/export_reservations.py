@@ -0,0 +1,58 @@
+"""
+Management command to export reservations as CSV or JSONL.
+
+Streams rows from the database in chunks (see reservations.export), so
+memory use stays flat for any number of reservations.
+
+Usage:
+    python manage.py export_reservations > reservations.csv
+    python manage.py export_reservations --format jsonl \\
+        --from 2025-09-01 --to 2025-09-30 --status confirmed \\
+        --output september.jsonl
+    python manage.py export_reservations --include-archived \
+        --from 2024-01-01 --to 2024-12-31
+"""
+
+import datetime
+from django.core.management.base import BaseCommand
+from reservations.export import EXPORT_FORMATS, export_lines, export_rows
+from reservations.models import STATUS_CHOICES
+
+
+class Command(BaseCommand):
+    help = "Export reservations as CSV or JSONL."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format', choices=list(EXPORT_FORMATS), default='csv',
+            help="Output format (default csv).")
+        parser.add_argument(
+            '--from', dest='date_from', type=datetime.date.fromisoformat,
+            help="First date to export (YYYY-MM-DD).")
+        parser.add_argument(
+            '--to', dest='date_to', type=datetime.date.fromisoformat,
+            help="Last date to export (YYYY-MM-DD).")
+        parser.add_argument(
+            '--status', action='append', choices=dict(STATUS_CHOICES),
+            help="Status to export; repeat for several. All by default.")
+        parser.add_argument(
+            '--include-archived', action='store_true',
+            help="Also export archived reservations.")
+        parser.add_argument(
+            '--output',
+            help="File to write; standard output if omitted.")
+
+    def handle(self, *args, **options):
+        rows = export_rows(options['date_from'], options['date_to'],
+                           options['status'],
+                           include_archived=options['include_archived'])
+        lines = export_lines(rows, options['format'])
+        if not options['output']:
+            for text in lines:
+                self.stdout.write(text, ending='')
+            return
+        with open(options['output'], 'w', newline='',
+                  encoding='utf-8') as output:
+            output.writelines(lines)
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported reservations to {options['output']}."))
@@ -0,0 +1,326 @@
+"""
+Management command to import reservations in bulk from CSV or JSONL.
+
+Rows are read as a stream and handled in chunks. Each row is validated
+in memory (user, date, time within that date's opening hours, party
+size, status, not in the past) and
+checked against running per-slot totals preloaded from the SlotLedger,
+so no capacity query is made per row. Accepted rows are written with
+one bulk_create per chunk (end times computed up front) and their
+guests added to the ledger with batched conditional UPDATEs
+(SlotLedger.reserve_many); the DailyOccupancy of their dates is
+refreshed once per chunk. Rejected rows are written to a report with
+the reason.
+
+Accepted rows are seated at tables day by day, around the tables
+already assigned, while their dates are locked (see
+TableAssignment.plan_many); a row that cannot be seated is rejected
+like one over capacity.
+
+Columns (CSV header or JSONL keys):
+    user, date, time, guests, special_requests, status
+
+``user`` is a username and may be left out when --user is given;
+``status`` defaults to pending.
+
+Usage:
+    python manage.py import_reservations bookings.csv
+    python manage.py import_reservations partners.jsonl --user phone
+    python manage.py import_reservations bookings.csv \\
+        --rejects rejected.csv --chunk-size 5000
+"""
+
+import csv
+import datetime
+import json
+import os
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from reservations.capacity import covered_slots, end_time_for
+from reservations.forms import NO_TABLE_MESSAGE, SLOT_FULL_MESSAGE
+from reservations.models import (BookingDay, DailyOccupancy, OpeningHours,
+                                 Reservation, SlotFullError, SlotLedger,
+                                 STATUS_CHOICES, TableAssignment,
+                                 TOTAL_CAPACITY_PER_SLOT)
+
+FORMATS = ('csv', 'jsonl')
+# Attempts at a chunk whose slots filled up while it was being validated
+MAX_CHUNK_ATTEMPTS = 3
+
+
+class RowError(Exception):
+    """Raised when an imported row is rejected."""
+
+
+class Command(BaseCommand):
+    help = "Import reservations from a CSV or JSONL file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or JSONL file to import.")
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help="Input format; guessed from the file extension if omitted.")
+        parser.add_argument(
+            '--user',
+            help="Username for rows without a user column.")
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help="Rows validated and written per batch (default 2000).")
+        parser.add_argument(
+            '--rejects',
+            help="Where to write rejected rows (default <path>.rejects.csv "
+                 "or .jsonl).")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or os.path.splitext(path)[1].lstrip('.')
+        if fmt not in FORMATS:
+            raise CommandError(
+                f"Cannot tell the format of {path}; pass --format.")
+        if not os.path.exists(path):
+            raise CommandError(f"{path} does not exist.")
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be at least 1.")
+        rejects_path = (options['rejects']
+                        or f"{os.path.splitext(path)[0]}.rejects.{fmt}")
+
+        self.default_user = options['user']
+        self.users = {}
+        self.slot_totals = {}
+        self.grid = OpeningHours.slot_grid()
+        self.statuses = dict(STATUS_CHOICES)
+        self.guest_field = Reservation._meta.get_field('guests')
+        now = timezone.localtime()
+        self.today, self.now_time = now.date(), now.time()
+
+        imported = rejected = 0
+        with open(path, newline='', encoding='utf-8-sig') as source, \
+                RejectWriter(rejects_path, fmt) as rejects:
+            for chunk in self._chunks(self._read(source, fmt),
+                                      options['chunk_size']):
+                accepted, failures = self._import_chunk(chunk)
+                imported += accepted
+                rejected += len(failures)
+                for line, row, error in failures:
+                    rejects.write(line, row, error)
+
+        if rejected:
+            self.stdout.write(self.style.WARNING(
+                f"Imported {imported} reservation(s); {rejected} rejected, "
+                f"see {rejects_path}."))
+        else:
+            os.remove(rejects_path)
+            self.stdout.write(self.style.SUCCESS(
+                f"Imported {imported} reservation(s)."))
+
+    def _read(self, source, fmt):
+        """Yield (line number, row dict, parse error) for every row."""
+        if fmt == 'csv':
+            for line, row in enumerate(csv.DictReader(source), start=2):
+                yield line, row, None
+            return
+        for line, text in enumerate(source, start=1):
+            if not text.strip():
+                continue
+            try:
+                row = json.loads(text)
+            except ValueError:
+                yield line, {'raw': text.rstrip('\n')}, "Invalid JSON."
+                continue
+            if not isinstance(row, dict):
+                yield line, {'raw': text.rstrip('\n')}, "Expected an object."
+            else:
+                yield line, row, None
+
+    @staticmethod
+    def _chunks(rows, size):
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _import_chunk(self, chunk):
+        """
+        Validate and write one chunk.
+
+        Returns:
+            tuple: (number imported, list of (line, row, error))
+        """
+        for _ in range(MAX_CHUNK_ATTEMPTS):
+            self._load_users(chunk)
+            self._load_slot_totals(chunk)
+            sources, accepted, failures = self._validate(chunk)
+            days = {r.date for r in accepted}
+            try:
+                with transaction.atomic():
+                    BookingDay.lock(days)
+                    seating, unseated = TableAssignment.plan_many(accepted)
+                    for index in unseated:
+                        self._release_seats(accepted[index])
+                        failures.append((*sources[index], NO_TABLE_MESSAGE))
+                    left_out = set(unseated)
+                    kept = [index for index in range(len(accepted))
+                            if index not in left_out]
+                    accepted = [accepted[index] for index in kept]
+                    SlotLedger.reserve_many(
+                        (r.date, r.time, r.end_time, r.guests)
+                        for r in accepted if r.status != "cancelled")
+                    Reservation.objects.bulk_create(accepted)
+                    TableAssignment.objects.bulk_create(
+                        TableAssignment(reservation=accepted[new],
+                                        table_id=table_id)
+                        for new, index in enumerate(kept)
+                        for table_id in seating.get(index, ()))
+                    DailyOccupancy.schedule_refresh(days)
+            except SlotFullError:
+                # Live bookings took seats since the totals were loaded
+                for day in days:
+                    self.slot_totals.pop(day, None)
+                continue
+            failures.sort(key=lambda failure: failure[0])
+            return len(accepted), failures
+        raise CommandError(
+            "Slots kept filling up during the import; try again later.")
+
+    def _load_users(self, chunk):
+        names = {self._username(row) for _, row, _ in chunk} - {None}
+        missing = names - self.users.keys()
+        if missing:
+            self.users.update(
+                User.objects.filter(username__in=missing)
+                .values_list('username', 'pk'))
+
+    def _load_slot_totals(self, chunk):
+        """Preload the ledger totals of every date the chunk touches."""
+        days = set()
+        for _, row, _ in chunk:
+            try:
+                days.add(datetime.date.fromisoformat(
+                    str(row.get('date', '')).strip()))
+            except ValueError:
+                pass
+        missing = days - self.slot_totals.keys()
+        for day in missing:
+            self.slot_totals[day] = {}
+        for day, slot, booked in (SlotLedger.objects
+                                  .filter(date__in=missing)
+                                  .values_list('date', 'slot',
+                                               'booked_guests')):
+            self.slot_totals[day][slot] = booked
+
+    def _username(self, row):
+        return (str(row.get('user') or '').strip()
+                or self.default_user or None)
+
+    def _validate(self, chunk):
+        """
+        Check every row of a chunk against the running slot totals.
+
+        Returns:
+            tuple: ((line, row) of each accepted row, unsaved
+            Reservations for them, list of (line, row, error))
+        """
+        sources, accepted, failures = [], [], []
+        for line, row, error in chunk:
+            try:
+                if error:
+                    raise RowError(error)
+                reservation = self._build(row)
+                if reservation.status != "cancelled":
+                    self._take_seats(reservation)
+            except RowError as exc:
+                failures.append((line, row, str(exc)))
+            else:
+                sources.append((line, row))
+                accepted.append(reservation)
+        return sources, accepted, failures
+
+    def _build(self, row):
+        """Return an unsaved Reservation for a row, or raise RowError."""
+        username = self._username(row)
+        if not username:
+            raise RowError("Missing user.")
+        if username not in self.users:
+            raise RowError(f"Unknown user {username!r}.")
+        try:
+            day = datetime.date.fromisoformat(str(row.get('date', '')).strip())
+        except ValueError:
+            raise RowError("Invalid date, expected YYYY-MM-DD.")
+        try:
+            start = datetime.time.fromisoformat(
+                str(row.get('time', '')).strip())
+        except ValueError:
+            raise RowError("Invalid time, expected HH:MM.")
+        if start not in self.grid.slots_for(day):
+            raise RowError("Time is not a bookable slot on that date.")
+        try:
+            guests = int(row.get('guests'))
+            self.guest_field.run_validators(guests)
+        except (TypeError, ValueError, ValidationError):
+            raise RowError("Guests must be a whole number from 1 to 14.")
+        status = str(row.get('status') or 'pending').strip().lower()
+        if status not in self.statuses:
+            raise RowError(f"Unknown status {status!r}.")
+        if day < self.today or (day == self.today
+                                and start < self.now_time):
+            raise RowError("Reservation cannot be in the past.")
+
+        return Reservation(
+            user_id=self.users[username],
+            date=day,
+            time=start,
+            end_time=end_time_for(day, start, guests),
+            guests=guests,
+            special_requests=row.get('special_requests') or None,
+            status=status,
+        )
+
+    def _take_seats(self, reservation):
+        """Add a reservation to the running totals if every slot has room."""
+        totals = self.slot_totals[reservation.date]
+        slots = covered_slots(reservation.time, reservation.end_time)
+        if any(totals.get(slot, 0) + reservation.guests
+               > TOTAL_CAPACITY_PER_SLOT for slot in slots):
+            raise RowError(SLOT_FULL_MESSAGE)
+        for slot in slots:
+            totals[slot] = totals.get(slot, 0) + reservation.guests
+
+    def _release_seats(self, reservation):
+        """Take a reservation left out of the chunk off the totals."""
+        totals = self.slot_totals[reservation.date]
+        for slot in covered_slots(reservation.time, reservation.end_time):
+            totals[slot] -= reservation.guests
+
+
+class RejectWriter:
+    """Write rejected rows, with line number and reason, as CSV or JSONL."""
+
+    def __init__(self, path, fmt):
+        self.path = path
+        self.fmt = fmt
+        self.writer = None
+
+    def __enter__(self):
+        self.file = open(self.path, 'w', newline='', encoding='utf-8')
+        return self
+
+    def __exit__(self, *exc_info):
+        self.file.close()
+
+    def write(self, line, row, error):
+        record = {'line': line, 'error': error, **row}
+        if self.fmt == 'jsonl':
+            self.file.write(json.dumps(record, default=str) + '\n')
+            return
+        if self.writer is None:
+            self.writer = csv.DictWriter(self.file, fieldnames=list(record),
+                                         extrasaction='ignore')
+            self.writer.writeheader()
+        self.writer.writerow(record)
@@ -0,0 +1,34 @@
+"""
+Management command to delete old reservation form submission tokens.
+
+make_reservation keeps the token of every submitted form so that a
+form sent twice books only once (see ReservationSubmission). A retry
+comes within seconds or minutes, so tokens older than --hours are no
+longer needed; run the command from a nightly job to keep the table
+small.
+
+Usage:
+    python manage.py purge_submissions
+    python manage.py purge_submissions --hours 48
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from reservations.models import (ReservationSubmission,
+                                 SUBMISSION_TOKEN_HOURS)
+
+
+class Command(BaseCommand):
+    help = "Delete reservation form submission tokens past their expiry."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours', type=int, default=SUBMISSION_TOKEN_HOURS,
+            help="Keep tokens claimed within this many hours "
+                 f"(default {SUBMISSION_TOKEN_HOURS}).")
+
+    def handle(self, *args, **options):
+        if options['hours'] < 1:
+            raise CommandError("--hours must be at least 1.")
+        deleted = ReservationSubmission.purge(options['hours'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {deleted} submission token(s)."))
@@ -0,0 +1,77 @@
+"""
+Management command to check or rebuild the SlotLedger.
+
+Recomputes the seats in use during every slot from the raw reservations
+(cancelled reservations excluded), one sweep per day, and either
+reports any slots where the ledger has drifted (--check) or replaces
+the ledger rows.
+
+Usage:
+    python manage.py rebuild_slot_ledger
+    python manage.py rebuild_slot_ledger --check
+    python manage.py rebuild_slot_ledger --from 2025-09-01
+"""
+
+import datetime
+from itertools import groupby
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from reservations.capacity import slot_occupancy
+from reservations.models import Reservation, SlotLedger
+
+
+class Command(BaseCommand):
+    help = "Check or rebuild the per-slot capacity ledger from reservations."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Only report drifted slots; exit with an error if any.")
+        parser.add_argument(
+            '--from', dest='date_from', type=datetime.date.fromisoformat,
+            help="Only consider slots on or after this date (YYYY-MM-DD).")
+
+    def handle(self, *args, **options):
+        reservations = Reservation.objects.exclude(status="cancelled")
+        ledger = SlotLedger.objects.all()
+        if options['date_from']:
+            reservations = reservations.filter(date__gte=options['date_from'])
+            ledger = ledger.filter(date__gte=options['date_from'])
+
+        rows = (reservations
+                .order_by('date')
+                .values_list('date', 'time', 'end_time', 'guests')
+                .iterator(chunk_size=2000))
+        expected = {}
+        for day, day_rows in groupby(rows, key=lambda row: row[0]):
+            occupancy = slot_occupancy(row[1:] for row in day_rows)
+            for slot, seats in occupancy.items():
+                expected[(day, slot)] = seats
+
+        if options['check']:
+            actual = {
+                (d, s): booked
+                for d, s, booked in ledger.values_list(
+                    'date', 'slot', 'booked_guests')
+            }
+            drifted = sorted(
+                key for key in expected.keys() | actual.keys()
+                if expected.get(key, 0) != actual.get(key, 0)
+            )
+            for d, s in drifted:
+                self.stdout.write(
+                    f"{d} {s}: ledger={actual.get((d, s), 0)} "
+                    f"expected={expected.get((d, s), 0)}")
+            if drifted:
+                raise CommandError(f"{len(drifted)} slot(s) out of sync.")
+            self.stdout.write(self.style.SUCCESS("Slot ledger is in sync."))
+            return
+
+        with transaction.atomic():
+            ledger.delete()
+            SlotLedger.objects.bulk_create(
+                SlotLedger(date=d, slot=s, booked_guests=total)
+                for (d, s), total in expected.items()
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt slot ledger for {len(expected)} slot(s)."))
@@ -0,0 +1,66 @@
+"""
+Management command to fill the DailyOccupancy summary table.
+
+By default only days that have reservations (live or archived) but no
+summary rows yet are computed, so the command can be run repeatedly
+(e.g. once after deploying, or from a nightly job) and only does new
+work. --rebuild recomputes every day in the range instead. Days are
+processed in batches, each with one reservation query and one upsert.
+
+Reservation writes keep already-summarised days up to date on their
+own; --rebuild also repairs days whose refresh after a write failed.
+
+Usage:
+    python manage.py refresh_daily_occupancy
+    python manage.py refresh_daily_occupancy --from 2024-01-01 --rebuild
+"""
+
+import datetime
+from django.core.management.base import BaseCommand
+from django.utils.timezone import localdate
+from reservations.models import (ArchivedReservation, DailyOccupancy,
+                                 Reservation)
+
+
+class Command(BaseCommand):
+    help = "Backfill or rebuild the daily occupancy summary table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from', dest='date_from', type=datetime.date.fromisoformat,
+            help="First date to summarise (default: one year ago).")
+        parser.add_argument(
+            '--to', dest='date_to', type=datetime.date.fromisoformat,
+            help="Last date to summarise (default: the last booked date).")
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help="Recompute days that already have summary rows too.")
+        parser.add_argument(
+            '--batch-days', type=int, default=31,
+            help="Days computed per batch (default 31).")
+
+    def handle(self, *args, **options):
+        window = {'date__gte': options['date_from']
+                  or localdate() - datetime.timedelta(days=365)}
+        if options['date_to']:
+            window['date__lte'] = options['date_to']
+
+        days = set(
+            Reservation.objects.filter(**window).order_by()
+            .values_list('date', flat=True).distinct()
+            .union(ArchivedReservation.objects.filter(**window).order_by()
+                   .values_list('date', flat=True).distinct())
+        )
+        if options['rebuild']:
+            days |= set(DailyOccupancy.objects.filter(**window)
+                        .values_list('date', flat=True).distinct())
+        else:
+            days -= set(DailyOccupancy.objects.filter(**window)
+                        .values_list('date', flat=True).distinct())
+
+        days = sorted(days)
+        size = max(options['batch_days'], 1)
+        for start in range(0, len(days), size):
+            DailyOccupancy.refresh_days(days[start:start + size])
+        self.stdout.write(self.style.SUCCESS(
+            f"Summarised occupancy for {len(days)} day(s)."))
@@ -0,0 +1,317 @@
+"""
+Management command to seed synthetic data at production scale.
+
+Creates users, a menu catalogue and reservations whose start times,
+party sizes and busy days follow a restaurant's peaks (lunch, and
+dinner from 18:30; Fridays and Saturdays busiest). Days are filled
+backwards from --future-days ahead of --anchor-date (default today),
+on the dates and times the opening hours allow, and a booking that
+would take a slot past TOTAL_CAPACITY_PER_SLOT, or finds no free table
+once tables are set up, is skipped, so the data passes the same checks
+as real bookings. Seats and tables already booked on those dates (the
+SlotLedger and TableAssignment rows) count too, so seeding a database
+that has reservations does not overbook it.
+
+Everything comes from one random generator seeded with --seed, so runs
+with the same options, --anchor-date included, give the same rows. End
+times come from a table of (start, party size) worked out once. Rows
+are written in chunks: with COPY on PostgreSQL and one prepared INSERT
+per chunk elsewhere (bulk_create is limited to 999 parameters per
+statement on SQLite, about 120 rows). The slot ledger and the last
+year of DailyOccupancy are rebuilt afterwards, the new rows are given
+the tables they were checked against (TableAssignment.seat_unassigned
+seats them in the same order), and the cached menu is cleared (bulk
+inserts send no post_save signals).
+
+Usage:
+    python manage.py seed_data --reservations 1000000 --users 20000
+    python manage.py seed_data --reservations 50000 --seed 7 \\
+        --menu-items 0 --anchor-date 2026-01-01
+"""
+
+import csv
+import datetime
+import io
+import random
+import time
+from decimal import Decimal
+from itertools import islice
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from menu.models import MenuItem
+from menu.signals import clear_menu_cache
+from reservations.capacity import (SLOT_MINUTES, SLOTS_PER_DAY,
+                                   end_time_for, slot_range)
+from reservations.models import (OpeningHours, Reservation, SlotLedger,
+                                 Table, TableAssignment,
+                                 TOTAL_CAPACITY_PER_SLOT)
+from reservations.tables import find_seating, occupy, slot_mask
+
+USERNAME_PREFIX = "seed-user-"
+# start hour -> relative demand for start times in that hour
+HOUR_WEIGHTS = {11: 2, 12: 6, 13: 6, 14: 2, 15: 1, 16: 1, 17: 3, 18: 8,
+                19: 10, 20: 8, 21: 4, 22: 1}
+# party size -> relative frequency
+PARTY_SIZES = {1: 4, 2: 40, 3: 12, 4: 25, 5: 6, 6: 7, 7: 3, 8: 3, 10: 1,
+               12: 1}
+# weekday (Monday first) -> relative number of bookings
+DAY_WEIGHTS = (6, 6, 7, 8, 12, 14, 9)
+PAST_STATUSES = {"confirmed": 88, "cancelled": 10, "pending": 2}
+FUTURE_STATUSES = {"pending": 45, "confirmed": 45, "cancelled": 10}
+SPECIAL_REQUESTS = ["Window seat, please.", "Birthday celebration.",
+                    "High chair needed.", "Gluten-free guest.",
+                    "Quiet table if possible."]
+# Draws per booking wanted before a day is given up as full
+ATTEMPTS_PER_BOOKING = 3
+# Days of existing bookings read per query
+PRELOAD_DAYS = 90
+COLUMNS = ("user", "date", "time", "end_time", "guests",
+           "special_requests", "created_on", "status")
+
+MENU_DISHES = {
+    "starter": ["Bruschetta", "Soup", "Salad", "Carpaccio", "Calamari",
+                "Arancini"],
+    "main": ["Risotto", "Lasagne", "Sea Bass", "Ribeye", "Gnocchi",
+             "Chicken", "Ravioli", "Pizza"],
+    "dessert": ["Tiramisu", "Panna Cotta", "Cheesecake", "Gelato",
+                "Cannoli"],
+    "drink": ["Lemonade", "Espresso", "Spritz", "Red Wine", "White Wine",
+              "Iced Tea"],
+}
+MENU_STYLES = ["Classic", "House", "Rustic", "Truffle", "Seasonal",
+               "Spicy", "Garden", "Smoked"]
+MENU_PRICES = {"starter": (5, 12), "main": (12, 32), "dessert": (5, 10),
+               "drink": (2, 9)}
+
+
+class Command(BaseCommand):
+    help = "Seed users, menu items and reservations with synthetic data."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reservations', type=int, default=100_000,
+            help="Reservations to create (default 100000).")
+        parser.add_argument(
+            '--users', type=int, default=1000,
+            help="Users making them (default 1000).")
+        parser.add_argument(
+            '--seed', type=int, default=1,
+            help="Random seed; the same seed gives the same data.")
+        parser.add_argument(
+            '--per-day', type=int, default=120,
+            help="Average bookings per open day (default 120).")
+        parser.add_argument(
+            '--future-days', type=int, default=60,
+            help="Days ahead of today that are booked (default 60).")
+        parser.add_argument(
+            '--menu-items', type=int, default=120,
+            help="Menu items to create (default 120, 0 for none).")
+        parser.add_argument(
+            '--chunk-size', type=int, default=50_000,
+            help="Rows written per statement (default 50000).")
+        parser.add_argument(
+            '--anchor-date', type=datetime.date.fromisoformat,
+            help="Day treated as today (YYYY-MM-DD); fix it to get the "
+                 "same rows on another day.")
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['per_day'] < 1:
+            raise CommandError("--users and --per-day must be at least 1.")
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be at least 1.")
+        rng = random.Random(options['seed'])
+        started = time.perf_counter()
+
+        user_ids = self._seed_users(options['users'])
+        items = self._seed_menu(options['menu_items'], rng)
+        rows = self._reservations(options['reservations'], user_ids, rng,
+                                  options)
+        written, first_day = 0, None
+        last_day = ((options['anchor_date'] or timezone.localdate())
+                    + datetime.timedelta(days=options['future_days']))
+        write = (self._copy if connection.vendor == 'postgresql'
+                 else self._insert)
+        while chunk := list(islice(rows, options['chunk_size'])):
+            with transaction.atomic():
+                write(chunk)
+            written += len(chunk)
+            first_day = chunk[-1][1]
+        if written < options['reservations']:
+            self.stderr.write(
+                f"Only {written} reservation(s) fit before the first "
+                f"date; raise --per-day for more.")
+
+        if written:
+            with transaction.atomic():
+                unseated = TableAssignment.seat_unassigned(
+                    datetime.date.fromisoformat(str(first_day)), last_day)
+            if unseated:
+                self.stderr.write(
+                    f"{len(unseated)} reservation(s) could not be seated "
+                    f"at a table.")
+        call_command("rebuild_slot_ledger", stdout=io.StringIO())
+        call_command("refresh_daily_occupancy", stdout=io.StringIO())
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {written} reservation(s) from {first_day} for "
+            f"{len(user_ids)} user(s) and {items} menu item(s) in "
+            f"{elapsed:.1f}s ({written / max(elapsed, 1e-9) * 60:,.0f} "
+            f"reservations a minute)."))
+
+    def _seed_users(self, count):
+        """Create the seed users that do not exist yet; return all ids."""
+        password = make_password(None)  # unusable, shared by all
+        User.objects.bulk_create(
+            (User(username=f"{USERNAME_PREFIX}{i}", password=password)
+             for i in range(count)),
+            batch_size=5000, ignore_conflicts=True)
+        return list(User.objects
+                    .filter(username__startswith=USERNAME_PREFIX)
+                    .order_by('id').values_list('id', flat=True)[:count])
+
+    def _seed_menu(self, count, rng):
+        """Create ``count`` menu items spread over the categories."""
+        dishes = [(category, f"{style} {dish}")
+                  for category, names in MENU_DISHES.items()
+                  for dish in names for style in MENU_STYLES]
+        rng.shuffle(dishes)
+        items = []
+        for category, name in dishes[:count]:
+            low, high = MENU_PRICES[category]
+            items.append(MenuItem(
+                name=name, category=category,
+                price=Decimal(rng.randrange(low * 2, high * 2 + 1)) / 2,
+                available=rng.random() > 0.05))
+        MenuItem.objects.bulk_create(items)
+        if items:
+            clear_menu_cache(MenuItem)
+        return len(items)
+
+    def _reservations(self, total, user_ids, rng, options):
+        """
+        Yield up to ``total`` reservation rows (in COLUMNS order, values
+        adapted for the database), newest date first.
+        """
+        ops = connection.ops
+        grid = OpeningHours.slot_grid()
+        if not any(grid.weekdays):
+            raise CommandError("The opening hours have no open days.")
+        today = options['anchor_date'] or timezone.localdate()
+        day = today + datetime.timedelta(days=options['future_days'])
+        mean_weight = sum(DAY_WEIGHTS) / len(DAY_WEIGHTS)
+        sizes, size_weights = zip(*PARTY_SIZES.items())
+        stays, draws = {}, {}
+        tz = timezone.get_current_timezone()
+        seating = Table.seating_options()
+        loaded_from, ledger, busy = None, {}, {}
+
+        while total > 0 and day.year > 1:
+            slots = grid.slots_for(day)
+            if slots:
+                if slots not in draws:
+                    draws[slots] = [HOUR_WEIGHTS.get(slot.hour, 1)
+                                    for slot in slots]
+                statuses, status_weights = zip(*(
+                    FUTURE_STATUSES if day >= today
+                    else PAST_STATUSES).items())
+                wanted = min(total, round(options['per_day']
+                                          * DAY_WEIGHTS[day.weekday()]
+                                          / mean_weight))
+                attempts = wanted * ATTEMPTS_PER_BOOKING
+                starts = rng.choices(slots, draws[slots], k=attempts)
+                guests = rng.choices(sizes, size_weights, k=attempts)
+                status = rng.choices(statuses, status_weights, k=attempts)
+                users = rng.choices(user_ids, k=attempts)
+                if loaded_from is None or day < loaded_from:
+                    loaded_from = datetime.date.fromordinal(
+                        max(day.toordinal() - PRELOAD_DAYS + 1, 1))
+                    ledger = self._booked(loaded_from, day)
+                    busy = (TableAssignment.busy_by_day(loaded_from, day)
+                            if seating else {})
+                booked = ledger.get(day) or [0] * SLOTS_PER_DAY
+                tables = busy.setdefault(day, {})
+                date_value = ops.adapt_datefield_value(day)
+                created = ops.adapt_datetimefield_value(
+                    datetime.datetime.combine(
+                        day - datetime.timedelta(days=rng.randrange(30)),
+                        datetime.time(9, 0), tz))
+                placed = 0
+                for index in range(attempts):
+                    start, party = starts[index], guests[index]
+                    stay = stays.get((start, party))
+                    if stay is None:
+                        end = end_time_for(day, start, party)
+                        first, last = slot_range(start, end)
+                        stay = stays[start, party] = (
+                            range(first, last + 1), slot_mask(start, end),
+                            ops.adapt_timefield_value(start),
+                            ops.adapt_timefield_value(end))
+                    covered, mask, start_value, end_value = stay
+                    if status[index] != "cancelled":
+                        if any(booked[slot] + party > TOTAL_CAPACITY_PER_SLOT
+                               for slot in covered):
+                            continue
+                        if seating:
+                            table_ids = find_seating(seating, tables, mask,
+                                                     party)
+                            if table_ids is None:
+                                continue
+                            occupy(tables, table_ids, mask)
+                        for slot in covered:
+                            booked[slot] += party
+                    yield (users[index], date_value, start_value, end_value,
+                           party,
+                           rng.choice(SPECIAL_REQUESTS)
+                           if rng.random() < 0.05 else None,
+                           created, status[index])
+                    placed += 1
+                    if placed == wanted:
+                        break
+                total -= placed
+            day -= datetime.timedelta(days=1)
+
+    @staticmethod
+    def _booked(first, last):
+        """
+        Return date -> seats already booked in each slot (by index) over
+        a date range, from the SlotLedger.
+        """
+        booked = {}
+        for day, slot, guests in (SlotLedger.objects
+                                  .filter(date__range=(first, last))
+                                  .values_list('date', 'slot',
+                                               'booked_guests')):
+            index = (slot.hour * 60 + slot.minute) // SLOT_MINUTES
+            booked.setdefault(day, [0] * SLOTS_PER_DAY)[index] = guests
+        return booked
+
+    @staticmethod
+    def _columns():
+        meta = Reservation._meta
+        return (connection.ops.quote_name(meta.db_table),
+                ", ".join(connection.ops.quote_name(
+                    meta.get_field(name).column) for name in COLUMNS))
+
+    def _insert(self, rows):
+        """Write rows with one prepared INSERT run for the whole chunk."""
+        table, columns = self._columns()
+        placeholders = ", ".join(["%s"] * len(COLUMNS))
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {table} ({columns}) VALUES ({placeholders})",
+                rows)
+
+    def _copy(self, rows):
+        """Write rows with COPY FROM STDIN (PostgreSQL)."""
+        table, columns = self._columns()
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)  # None is written as NULL
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)",
+                buffer)
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.23 on 2026-10-18 07:25
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def populate_ledger(apps, schema_editor):
+    Reservation = apps.get_model('reservations', 'Reservation')
+    SlotLedger = apps.get_model('reservations', 'SlotLedger')
+    totals = (Reservation.objects.exclude(status='cancelled')
+              .order_by().values('date', 'time')
+              .annotate(total=Sum('guests')))
+    SlotLedger.objects.bulk_create(
+        SlotLedger(date=row['date'], slot=row['time'],
+                   booked_guests=row['total'])
+        for row in totals
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0004_alter_reservation_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotLedger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('slot', models.TimeField()),
+                ('booked_guests', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['date', 'slot'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='slotledger',
+            constraint=models.UniqueConstraint(fields=('date', 'slot'), name='unique_slot_ledger'),
+        ),
+        migrations.RunPython(populate_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.23 on 2026-10-18 08:02
+
+from itertools import groupby
+from django.db import migrations
+from reservations.capacity import slot_occupancy
+
+
+def rebuild_ledger(apps, schema_editor):
+    """Recount the ledger so reservations occupy every slot they overlap."""
+    Reservation = apps.get_model('reservations', 'Reservation')
+    SlotLedger = apps.get_model('reservations', 'SlotLedger')
+    SlotLedger.objects.all().delete()
+    rows = (Reservation.objects.exclude(status='cancelled')
+            .order_by('date')
+            .values_list('date', 'time', 'end_time', 'guests'))
+    ledger = []
+    for day, day_rows in groupby(rows, key=lambda row: row[0]):
+        for slot, seats in slot_occupancy(r[1:] for r in day_rows).items():
+            ledger.append(SlotLedger(date=day, slot=slot,
+                                     booked_guests=seats))
+    SlotLedger.objects.bulk_create(ledger, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0005_slotledger'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_ledger, migrations.RunPython.noop),
+    ]
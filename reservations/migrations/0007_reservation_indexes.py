@@ -0,0 +1,58 @@
+# Generated by Django 4.2.23 on 2026-10-18 07:30
+
+from django.db import migrations, models
+
+
+class AddIndexConcurrently(migrations.AddIndex):
+    """
+    Build the index with CREATE INDEX CONCURRENTLY on PostgreSQL so a
+    large live table keeps taking writes while it is built. Other
+    backends fall back to a plain CREATE INDEX.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return super().database_forwards(app_label, schema_editor,
+                                             from_state, to_state)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.add_index(model, self.index, concurrently=True)
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return super().database_backwards(app_label, schema_editor,
+                                              from_state, to_state)
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.remove_index(model, self.index, concurrently=True)
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('reservations', '0006_rebuild_slot_ledger_intervals'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='reservation',
+            index=models.Index(fields=['date', 'time'], name='res_date_time_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='reservation',
+            index=models.Index(fields=['user', 'date'], name='res_user_date_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='reservation',
+            index=models.Index(fields=['status', 'date', 'time'], name='res_status_date_time_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='reservation',
+            index=models.Index(condition=models.Q(('status', 'cancelled'), _negated=True), fields=['date', 'time'], name='res_active_date_time_idx'),
+        ),
+    ]
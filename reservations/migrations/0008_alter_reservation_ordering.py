@@ -0,0 +1,17 @@
+# Generated by Django 4.2.23 on 2026-10-18 07:33
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0007_reservation_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='reservation',
+            options={'ordering': ['date', 'time', 'id']},
+        ),
+    ]
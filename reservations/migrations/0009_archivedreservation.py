@@ -0,0 +1,35 @@
+# Generated by Django 4.2.23 on 2026-10-18 08:04
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('reservations', '0008_alter_reservation_ordering'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedReservation',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('guests', models.PositiveIntegerField()),
+                ('special_requests', models.TextField(blank=True, null=True)),
+                ('created_on', models.DateTimeField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('archived_on', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['date', 'time', 'id'],
+                'indexes': [models.Index(fields=['date', 'time'], name='archres_date_time_idx'), models.Index(fields=['user', 'date'], name='archres_user_date_idx'), models.Index(fields=['status', 'date', 'time'], name='archres_status_date_time_idx')],
+            },
+        ),
+    ]
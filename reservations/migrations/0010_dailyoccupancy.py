@@ -0,0 +1,33 @@
+# Generated by Django 4.2.23 on 2026-10-18 08:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0009_archivedreservation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('slot', models.TimeField()),
+                ('covers', models.PositiveIntegerField(default=0)),
+                ('pending', models.PositiveIntegerField(default=0)),
+                ('confirmed', models.PositiveIntegerField(default=0)),
+                ('cancelled', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'daily occupancy',
+                'ordering': ['date', 'slot'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailyoccupancy',
+            constraint=models.UniqueConstraint(fields=('date', 'slot'), name='unique_daily_occupancy'),
+        ),
+    ]
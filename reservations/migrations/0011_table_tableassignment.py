@@ -0,0 +1,40 @@
+# Generated by Django 4.2.23 on 2026-10-18 08:16
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0010_dailyoccupancy'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Table',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=20, unique=True)),
+                ('seats', models.PositiveIntegerField(validators=[django.core.validators.MinValueValidator(1)])),
+                ('combine_group', models.CharField(blank=True, max_length=20)),
+                ('is_active', models.BooleanField(default=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TableAssignment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reservation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='table_assignments', to='reservations.reservation')),
+                ('table', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='assignments', to='reservations.table')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='tableassignment',
+            constraint=models.UniqueConstraint(fields=('reservation', 'table'), name='unique_table_assignment'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.23 on 2026-10-18 08:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0012_waitlistentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OpeningHours',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')])),
+                ('first_seating', models.TimeField()),
+                ('last_seating', models.TimeField()),
+            ],
+            options={
+                'verbose_name_plural': 'opening hours',
+                'ordering': ['weekday', 'first_seating'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SpecialDate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('closed', models.BooleanField(default=False)),
+                ('first_seating', models.TimeField(blank=True, null=True)),
+                ('last_seating', models.TimeField(blank=True, null=True)),
+                ('note', models.CharField(blank=True, max_length=100)),
+            ],
+            options={
+                'ordering': ['date'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='specialdate',
+            constraint=models.CheckConstraint(check=models.Q(('closed', True), models.Q(('first_seating__isnull', False), ('last_seating__isnull', False)), _connector='OR'), name='special_date_open_has_seatings'),
+        ),
+    ]
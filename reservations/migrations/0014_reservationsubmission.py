@@ -0,0 +1,33 @@
+# Generated by Django 4.2.23 on 2026-10-18 08:57
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('reservations', '0013_openinghours_specialdate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReservationSubmission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.UUIDField()),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('reservation', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='reservations.reservation')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created'], name='submission_created_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='reservationsubmission',
+            constraint=models.UniqueConstraint(fields=('user', 'token'), name='unique_submission_token'),
+        ),
+    ]
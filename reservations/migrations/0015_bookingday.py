@@ -0,0 +1,23 @@
+# Generated by Django 4.2.23 on 2026-10-18 09:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0014_reservationsubmission'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+            ],
+            options={
+                'ordering': ['date'],
+            },
+        ),
+    ]
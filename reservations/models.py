@@ -2,13 +2,75 @@
 Models for the Reservations app.
 
 Defines the Reservation model which represents a table reservation
-made by a user, including date, time, number of guests, and status.
+made by a user, including date, time, number of guests, and status,
+the SlotLedger model which keeps a running total of seats in use
+per date and half-hour slot (with BookingDay, which serialises the
+bookings of a date), the ArchivedReservation model which
+holds past reservations moved out of the Reservation table, the
+DailyOccupancy model which summarises both for reporting, the
+Table and TableAssignment models which seat parties at real tables,
+the WaitlistEntry model for parties waiting for a full slot, the
+OpeningHours and SpecialDate models which decide the bookable slots,
+and the ReservationSubmission model which recognises a reservation
+form that is submitted twice.
 """
 
-from django.db import models
+import datetime
+import math
+from collections import defaultdict
+from itertools import groupby
+from django.core.cache import cache
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import F, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Greatest
+from django.db.models.lookups import GreaterThan, LessThanOrEqual
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
-from datetime import datetime, timedelta
+from django.utils import timezone
+from dons_table.caching import cache_seconds
+from .capacity import (SLOT_MINUTES, covered_slots, end_time_for,
+                       longest_duration, slot_occupancy, slot_range,
+                       slot_time)
+from .hours import build_grid
+from .tables import (assign_day, find_seating, occupy, seating_options,
+                     slot_mask)
+
+TOTAL_CAPACITY_PER_SLOT = 50
+
+# Most ledger rows touched by one batched UPDATE (keeps the statement
+# within database parameter and expression-depth limits)
+LEDGER_BATCH_SLOTS = 250
+
+# Seating options of the active tables; cleared by reservations.signals
+# whenever a table changes (see cache_seconds)
+TABLE_OPTIONS_CACHE_KEY = 'reservations:table-options'
+TABLE_OPTIONS_CACHE_SECONDS = 60 * 60
+
+# Slot grid of the opening hours; cleared by reservations.signals
+# whenever the hours or a special date change (see cache_seconds)
+SLOT_GRID_CACHE_KEY = 'reservations:slot-grid'
+SLOT_GRID_CACHE_SECONDS = 60 * 60
+
+WEEKDAY_CHOICES = [
+    (0, "Monday"),
+    (1, "Tuesday"),
+    (2, "Wednesday"),
+    (3, "Thursday"),
+    (4, "Friday"),
+    (5, "Saturday"),
+    (6, "Sunday"),
+]
+
+# Hours a reservation form's submission token is remembered for; older
+# ones are deleted by the purge_submissions command
+SUBMISSION_TOKEN_HOURS = 24
+
+# Waitlist entries read per start slot when seats are freed, and most
+# parties booked from the waitlist per cancellation
+WAITLIST_CANDIDATES_PER_SLOT = 10
+MAX_PROMOTIONS = 4
 
 STATUS_CHOICES = [
         ("pending", "Pending"),
@@ -17,6 +79,10 @@ STATUS_CHOICES = [
     ]
 
 
+class SlotFullError(Exception):
+    """Raised when a slot cannot take the requested number of guests."""
+
+
 class Reservation(models.Model):
     """
     Represents a table reservation made by a user.
@@ -26,7 +92,8 @@ class Reservation(models.Model):
         date (date): Date of the reservation.
         time (time): Start time of the reservation.
         end_time (time):
-        Automatically calculated end time (1 hour after start).
+        Automatically calculated end time (start plus the duration
+        configured for the party size).
         guests (int): Number of guests (1–14).
         special_requests (str): Optional notes or special requests.
         created_on (datetime): Timestamp when the reservation was created.
@@ -39,7 +106,10 @@ class Reservation(models.Model):
         __str__(): Returns a human-readable string representation.
 
     Meta:
-        ordering: Reservations are ordered by date, then time.
+        ordering: Reservations are ordered by date, then time, with id
+        as a tie-breaker so keyset pagination has a unique order.
+        indexes: Composite indexes for the slot, per-user and per-status
+        access paths, plus a partial index over non-cancelled rows.
     """
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     date = models.DateField()
@@ -58,15 +128,114 @@ class Reservation(models.Model):
 
     def save(self, *args, **kwargs):
         """
-        Override save to automatically set the end_time.
+        Override save to automatically set the end_time and keep the
+        SlotLedger in step with the reservation.
+
+        End time is the start time plus the duration configured for
+        the party size (see capacity.duration_for). The previous slots
+        (if any) are released and every slot the reservation now
+        overlaps is booked in the same transaction as the write, and
+        the party is seated at tables (see TableAssignment.seat) when
+        any are set up. The dates' BookingDay rows are locked before
+        any of this. Cancelling a reservation books waitlisted
+        parties into its seats (see WaitlistEntry.promote). The
+        DailyOccupancy of the affected dates is refreshed on commit.
 
-        End time is calculated as one hour after the start time.
+        Raises:
+            SlotFullError: If a slot does not have room for the guests,
+            or no tables are free for them. Nothing is written in that
+            case.
         """
         if self.time:
-            self.end_time = (
-                datetime.combine(self.date, self.time) + timedelta(hours=1)
-                ).time()
-        super().save(*args, **kwargs)
+            self.end_time = end_time_for(self.date, self.time, self.guests)
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = (
+                    Reservation.objects
+                    .select_for_update()
+                    .filter(pk=self.pk)
+                    .values_list('date', 'time', 'end_time', 'guests',
+                                 'status')
+                    .first()
+                )
+            BookingDay.lock({self.date, previous[0]} if previous
+                            else {self.date})
+            if previous:
+                SlotLedger.release(*previous)
+            SlotLedger.book(self.date, self.time, self.end_time,
+                            self.guests, self.status)
+            super().save(*args, **kwargs)
+            if self.status == "cancelled":
+                TableAssignment.objects.filter(reservation=self).delete()
+                if previous and previous[4] != "cancelled":
+                    WaitlistEntry.promote(previous[0], [previous[1:3]])
+            else:
+                TableAssignment.seat(self.date, [
+                    (self.pk, self.time, self.end_time, self.guests)])
+            DailyOccupancy.schedule_refresh(
+                {self.date, previous[0]} if previous else {self.date})
+
+    @classmethod
+    def set_status(cls, ids, status):
+        """
+        Move every reservation in ``ids`` to ``status`` in bulk.
+
+        Runs a single UPDATE for the reservations and batched ledger
+        UPDATEs (one per LEDGER_BATCH_SLOTS slots): guests are released
+        when reservations are cancelled and booked again when cancelled
+        ones are reinstated. Cancelled reservations give up their tables
+        and reinstated ones are seated again, one day at a time. The
+        seats freed by cancelling go to the waitlist, a day at a time.
+        Moving between pending and confirmed leaves the ledger and
+        tables alone. The reservations are locked in id order, then the
+        BookingDay rows of the dates whose seats change in date order,
+        so calls over overlapping sets cannot deadlock. The
+        DailyOccupancy of the affected dates is refreshed on commit.
+
+        Returns:
+            int: Number of reservations whose status changed.
+
+        Raises:
+            SlotFullError: If reinstated reservations do not fit. No
+            reservation is changed in that case.
+        """
+        with transaction.atomic():
+            rows = list(
+                cls.objects
+                .select_for_update()
+                .filter(pk__in=ids)
+                .exclude(status=status)
+                .order_by('pk')
+                .values_list('date', 'time', 'end_time', 'guests', 'status',
+                             'pk')
+            )
+            if not rows:
+                return 0
+            DailyOccupancy.schedule_refresh(row[0] for row in rows)
+            cancelling = status == "cancelled"
+            moved = [row for row in rows
+                     if (row[4] == "cancelled") != cancelling]
+            BookingDay.lock(row[0] for row in moved)
+            if cancelling:
+                SlotLedger.release_many(row[:4] for row in moved)
+                TableAssignment.objects.filter(
+                    reservation__in=[row[5] for row in moved]).delete()
+            else:
+                SlotLedger.reserve_many(row[:4] for row in moved)
+                moved.sort(key=lambda row: row[0])
+                for day, day_rows in groupby(moved, key=lambda row: row[0]):
+                    TableAssignment.seat(day, [(row[5], *row[1:4])
+                                               for row in day_rows])
+            updated = (cls.objects
+                       .filter(pk__in=ids)
+                       .exclude(status=status)
+                       .update(status=status))
+            if cancelling:
+                moved.sort(key=lambda row: row[0])
+                for day, day_rows in groupby(moved, key=lambda row: row[0]):
+                    WaitlistEntry.promote(day, [row[1:3] for row in day_rows])
+            return updated
 
     def __str__(self):
         """Return a string for the reservation."""
@@ -76,4 +245,1005 @@ class Reservation(models.Model):
         )
 
     class Meta:
-        ordering = ['date', 'time']
+        ordering = ['date', 'time', 'id']
+        indexes = [
+            # slot lookups and date-window listings
+            models.Index(fields=['date', 'time'],
+                         name='res_date_time_idx'),
+            # a user's upcoming reservations (reservation_dashboard)
+            models.Index(fields=['user', 'date'],
+                         name='res_user_date_idx'),
+            # staff listings grouped by status (superuser_reservations)
+            models.Index(fields=['status', 'date', 'time'],
+                         name='res_status_date_time_idx'),
+            # capacity queries only ever look at live reservations
+            models.Index(fields=['date', 'time'],
+                         condition=~models.Q(status='cancelled'),
+                         name='res_active_date_time_idx'),
+        ]
+
+
+class SlotLedger(models.Model):
+    """
+    Running total of seats in use during a single date and time slot.
+
+    A reservation counts towards every half-hour slot its interval
+    overlaps, so a 19:00 and a 19:30 party compete for the 19:30 slot.
+    Kept up to date by Reservation.save and the post_delete signal so
+    that capacity checks are a lookup of a few ledger rows instead of a
+    SUM over every reservation. Cancelled reservations do not count.
+    The ledger can be checked or rebuilt from the raw reservations with
+    ``manage.py rebuild_slot_ledger``.
+
+    Attributes:
+        date (date): Date of the slot.
+        slot (time): Start time of the slot.
+        booked_guests (int): Seats in use during the slot.
+    """
+    date = models.DateField()
+    slot = models.TimeField()
+    booked_guests = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        """Return a string for the ledger row."""
+        return f"{self.date} {self.slot}: {self.booked_guests} guests"
+
+    @classmethod
+    def booked(cls, date, slot):
+        """Return the number of guests booked into a slot."""
+        return (
+            cls.objects
+            .filter(date=date, slot=slot)
+            .values_list('booked_guests', flat=True)
+            .first()
+        ) or 0
+
+    @classmethod
+    def occupancy(cls, date, slots):
+        """Return a dict of slot -> booked guests for the given slots."""
+        return dict(
+            cls.objects
+            .filter(date=date, slot__in=slots)
+            .values_list('slot', 'booked_guests')
+        )
+
+    @classmethod
+    def reserve(cls, date, start, end, guests,
+                capacity=TOTAL_CAPACITY_PER_SLOT):
+        """
+        Atomically add ``guests`` to every slot from ``start`` to ``end``
+        if all of them have room.
+
+        The capacity check and the increment are one conditional
+        UPDATE, so the database serialises concurrent bookings on the
+        ledger rows and two writers can never both take the last seats.
+
+        Raises:
+            SlotFullError: If any slot cannot take the guests. No slot
+            is changed in that case.
+        """
+        slots = covered_slots(start, end)
+        if guests > capacity:
+            raise SlotFullError(f"Slot {date} {start} is full.")
+        with transaction.atomic():
+            cls.objects.bulk_create(
+                [cls(date=date, slot=slot) for slot in slots],
+                ignore_conflicts=True,
+            )
+            updated = (
+                cls.objects
+                .filter(date=date, slot__in=slots,
+                        booked_guests__lte=capacity - guests)
+                .update(booked_guests=F('booked_guests') + guests)
+            )
+            if updated != len(slots):
+                raise SlotFullError(f"Slot {date} {start} is full.")
+
+    @classmethod
+    def book(cls, date, start, end, guests, status):
+        """
+        Add a reservation's guests to its slots unless it is cancelled.
+
+        Raises:
+            SlotFullError: If the slots cannot take the guests.
+        """
+        if status != "cancelled":
+            cls.reserve(date, start, end, guests)
+
+    @classmethod
+    def release(cls, date, start, end, guests, status):
+        """Remove a reservation's guests from its slots."""
+        if status != "cancelled":
+            (cls.objects
+             .filter(date=date, slot__in=covered_slots(start, end))
+             .update(booked_guests=Greatest(F('booked_guests') - guests,
+                                            Value(0))))
+
+    @staticmethod
+    def _slot_batches(intervals):
+        """
+        Sum the guests of (date, start, end, guests) intervals per slot.
+
+        Returns:
+            list: Batches of at most LEDGER_BATCH_SLOTS slots, each a
+            dict of date -> {slot: guests}.
+        """
+        totals = defaultdict(lambda: defaultdict(int))
+        for date, start, end, guests in intervals:
+            for slot in covered_slots(start, end):
+                totals[date][slot] += guests
+        batches, batch, size = [], {}, 0
+        for date, slots in sorted(totals.items()):
+            for slot, guests in sorted(slots.items()):
+                if size == LEDGER_BATCH_SLOTS:
+                    batches.append(batch)
+                    batch, size = {}, 0
+                batch.setdefault(date, {})[slot] = guests
+                size += 1
+        if batch:
+            batches.append(batch)
+        return batches
+
+    @staticmethod
+    def _batch_amounts(batch):
+        """
+        Return a CASE giving each ledger row its amount in a batch (0
+        for rows outside it), nested by date so the database compares a
+        row against its own day's slots only.
+
+        Written as raw SQL: compiling thousands of When() expressions
+        through the ORM costs far more than running the UPDATE.
+        """
+        ops = connection.ops
+        dates, params = [], []
+        for date, slots in batch.items():
+            params.append(ops.adapt_datefield_value(date))
+            for slot, guests in slots.items():
+                params += [ops.adapt_timefield_value(slot), guests]
+            dates.append("WHEN %s THEN CASE {} {} ELSE 0 END".format(
+                ops.quote_name('slot'), " ".join(["WHEN %s THEN %s"]
+                                                 * len(slots))))
+        return RawSQL(
+            f"CASE {ops.quote_name('date')} {' '.join(dates)} ELSE 0 END",
+            params, output_field=models.PositiveIntegerField())
+
+    @classmethod
+    def _batch_rows(cls, batch, amount):
+        """Return the ledger rows of a batch."""
+        return cls.objects.filter(
+            GreaterThan(amount, 0),
+            date__in=list(batch),
+            slot__in={slot for slots in batch.values() for slot in slots},
+        )
+
+    @classmethod
+    def reserve_many(cls, intervals, capacity=TOTAL_CAPACITY_PER_SLOT):
+        """
+        Batched reserve: add the guests of many (date, start, end,
+        guests) intervals with one conditional UPDATE per
+        LEDGER_BATCH_SLOTS slots.
+
+        Raises:
+            SlotFullError: If any slot cannot take its guests. No slot
+            is changed in that case.
+        """
+        batches = cls._slot_batches(intervals)
+        if not batches:
+            return
+        with transaction.atomic():
+            for batch in batches:
+                cls.objects.bulk_create(
+                    [cls(date=date, slot=slot)
+                     for date, slots in batch.items() for slot in slots],
+                    ignore_conflicts=True,
+                )
+                amount = cls._batch_amounts(batch)
+                new_total = F('booked_guests') + amount
+                updated = (
+                    cls._batch_rows(batch, amount)
+                    .filter(LessThanOrEqual(new_total, capacity))
+                    .update(booked_guests=new_total)
+                )
+                if updated != sum(len(slots) for slots in batch.values()):
+                    raise SlotFullError("Not every slot has room.")
+
+    @classmethod
+    def release_many(cls, intervals):
+        """
+        Batched release: remove the guests of many (date, start, end,
+        guests) intervals with one UPDATE per LEDGER_BATCH_SLOTS slots.
+        """
+        for batch in cls._slot_batches(intervals):
+            amount = cls._batch_amounts(batch)
+            (cls._batch_rows(batch, amount)
+             .update(booked_guests=Greatest(F('booked_guests') - amount,
+                                            Value(0))))
+
+    class Meta:
+        ordering = ['date', 'slot']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'slot'],
+                                    name='unique_slot_ledger'),
+        ]
+
+
+class BookingDay(models.Model):
+    """
+    Lock row of a date's bookings.
+
+    Every write to a date's SlotLedger rows and tables locks the date's
+    row here first (see ``lock``), so bookings on the same day take
+    their turn before touching any ledger row. Without it, two
+    bookings at different times could each update their own slots and
+    then wait for the other's to seat the day, a deadlock.
+
+    Attributes:
+        date (date): The date.
+    """
+    date = models.DateField(unique=True)
+
+    def __str__(self):
+        """Return a string for the lock row."""
+        return str(self.date)
+
+    @classmethod
+    def lock(cls, dates):
+        """
+        Lock the rows of ``dates`` until the transaction ends, in date
+        order, creating any that do not exist yet.
+        """
+        dates = sorted(set(dates))
+        if not dates:
+            return
+        cls.objects.bulk_create([cls(date=date) for date in dates],
+                                ignore_conflicts=True)
+        if connection.features.has_select_for_update:
+            list(cls.objects.select_for_update()
+                 .filter(date__in=dates).order_by('date')
+                 .values_list('pk', flat=True))
+
+    class Meta:
+        ordering = ['date']
+
+
+class ArchivedReservation(models.Model):
+    """
+    A past reservation moved out of the Reservation table.
+
+    Keeps the fields and the id of the Reservation it was archived
+    from, so history and reporting can read both tables together
+    (see KeysetPaginator's ``union`` and reservations.export). Rows are
+    moved by ``manage.py archive_reservations`` and do not count
+    towards the SlotLedger.
+
+    Attributes:
+        archived_on (datetime): When the row was archived.
+        Other fields as on Reservation.
+    """
+    # Copied from Reservation when a row is archived
+    COPIED_FIELDS = ['id', 'user_id', 'date', 'time', 'end_time', 'guests',
+                     'special_requests', 'created_on', 'status']
+
+    is_archived = True
+
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    date = models.DateField()
+    time = models.TimeField()
+    end_time = models.TimeField()
+    guests = models.PositiveIntegerField()
+    special_requests = models.TextField(blank=True, null=True)
+    created_on = models.DateTimeField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    archived_on = models.DateTimeField(auto_now_add=True)
+
+    @classmethod
+    def from_reservation(cls, reservation):
+        """Return an unsaved archive copy of a Reservation."""
+        return cls(**{name: getattr(reservation, name)
+                      for name in cls.COPIED_FIELDS})
+
+    def __str__(self):
+        """Return a string for the archived reservation."""
+        return (
+            f"Archived reservation for {self.user.username} "
+            f"on {self.date} at {self.time}"
+        )
+
+    class Meta:
+        ordering = ['date', 'time', 'id']
+        indexes = [
+            models.Index(fields=['date', 'time'],
+                         name='archres_date_time_idx'),
+            models.Index(fields=['user', 'date'],
+                         name='archres_user_date_idx'),
+            models.Index(fields=['status', 'date', 'time'],
+                         name='archres_status_date_time_idx'),
+        ]
+
+
+class DailyOccupancy(models.Model):
+    """
+    Precomputed occupancy of one date and time slot, for reporting.
+
+    Summarises live and archived reservations so the staff heatmap reads
+    a few hundred small rows instead of grouping the reservation tables.
+    Days are recomputed whole by ``refresh_days``: after every
+    reservation write (on commit) and by ``manage.py
+    refresh_daily_occupancy``, which backfills days that have no summary
+    yet.
+
+    Attributes:
+        date (date): Date of the slot.
+        slot (time): Start time of the slot.
+        covers (int): Guests seated during the slot (not cancelled).
+        pending (int): Pending reservations starting in the slot.
+        confirmed (int): Confirmed reservations starting in the slot.
+        cancelled (int): Cancelled reservations starting in the slot.
+    """
+    COUNTED_STATUSES = [status for status, _ in STATUS_CHOICES]
+
+    date = models.DateField()
+    slot = models.TimeField()
+    covers = models.PositiveIntegerField(default=0)
+    pending = models.PositiveIntegerField(default=0)
+    confirmed = models.PositiveIntegerField(default=0)
+    cancelled = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        """Return a string for the summary row."""
+        return f"{self.date} {self.slot}: {self.covers} covers"
+
+    @classmethod
+    def summarise_day(cls, day, rows):
+        """
+        Return unsaved summary rows for one day.
+
+        Args:
+            day (date): The date summarised.
+            rows: Iterable of (start, end, guests, status) tuples.
+        """
+        rows = list(rows)
+        slots = {slot: cls(date=day, slot=slot, covers=covers)
+                 for slot, covers in slot_occupancy(
+                     (start, end, guests) for start, end, guests, status
+                     in rows if status != "cancelled").items()}
+        for start, end, _, status in rows:
+            slot = covered_slots(start, end)[0]
+            if slot not in slots:
+                slots[slot] = cls(date=day, slot=slot)
+            summary = slots[slot]
+            setattr(summary, status, getattr(summary, status) + 1)
+        return list(slots.values())
+
+    @classmethod
+    def refresh_days(cls, days):
+        """
+        Recompute the summary rows of the given dates from the live and
+        archived reservations (one query for all of them).
+        """
+        days = set(days)
+        if not days:
+            return
+        fields = ('date', 'time', 'end_time', 'guests', 'status')
+        rows = (Reservation.objects.filter(date__in=days)
+                .order_by().values_list(*fields)
+                .union(ArchivedReservation.objects.filter(date__in=days)
+                       .order_by().values_list(*fields), all=True)
+                .order_by('date'))
+        summaries = {day: [] for day in days}
+        for day, day_rows in groupby(rows, key=lambda row: row[0]):
+            summaries[day] = cls.summarise_day(
+                day, (row[1:] for row in day_rows))
+
+        stale = models.Q()
+        for day, day_summaries in summaries.items():
+            stale |= models.Q(date=day) & ~models.Q(
+                slot__in=[summary.slot for summary in day_summaries])
+        with transaction.atomic():
+            cls.objects.filter(stale).delete()
+            cls.objects.bulk_create(
+                [summary for day_summaries in summaries.values()
+                 for summary in day_summaries],
+                update_conflicts=True,
+                unique_fields=['date', 'slot'],
+                update_fields=['covers', *cls.COUNTED_STATUSES],
+            )
+
+    @classmethod
+    def schedule_refresh(cls, days):
+        """
+        Refresh the given dates once the current transaction commits.
+
+        A failed refresh is logged rather than raised, since the write
+        itself has already been committed; ``refresh_daily_occupancy
+        --rebuild`` repairs such days.
+        """
+        days = set(days)
+        transaction.on_commit(lambda: cls.refresh_days(days), robust=True)
+
+    class Meta:
+        ordering = ['date', 'slot']
+        verbose_name_plural = 'daily occupancy'
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'slot'],
+                                    name='unique_daily_occupancy'),
+        ]
+
+
+class Table(models.Model):
+    """
+    A table in the dining room.
+
+    Tables that share a combine group can be pushed together for a
+    larger party (up to tables.MAX_COMBINED_TABLES of them). While no
+    active tables exist, reservations are only checked against
+    TOTAL_CAPACITY_PER_SLOT.
+
+    Attributes:
+        name (str): Name or number shown to staff.
+        seats (int): Number of guests the table seats.
+        combine_group (str): Tables with the same group can be joined;
+        blank for a table that is never combined.
+        is_active (bool): Inactive tables are not assigned.
+    """
+    name = models.CharField(max_length=20, unique=True)
+    seats = models.PositiveIntegerField(validators=[MinValueValidator(1)])
+    combine_group = models.CharField(max_length=20, blank=True)
+    is_active = models.BooleanField(default=True)
+
+    def __str__(self):
+        """Return a string for the table."""
+        return f"{self.name} ({self.seats} seats)"
+
+    @classmethod
+    def seating_options(cls):
+        """
+        Return the seating options of the active tables (see
+        tables.seating_options), cached until a table changes (see
+        cache_seconds).
+        """
+        return cache.get_or_set(
+            TABLE_OPTIONS_CACHE_KEY,
+            lambda: seating_options(
+                cls.objects.filter(is_active=True)
+                .values_list('id', 'seats', 'combine_group')),
+            cache_seconds(TABLE_OPTIONS_CACHE_SECONDS),
+        )
+
+    class Meta:
+        ordering = ['name']
+
+
+class TableAssignment(models.Model):
+    """
+    A table a reservation is seated at; a party at combined tables has
+    one row per table.
+
+    Written by Reservation.save and Reservation.set_status through
+    ``seat``. Reservations without tables (made before any tables were
+    set up) are seated, where they still fit, by the next booking or
+    edit on their day.
+
+    Attributes:
+        reservation (Reservation): The party seated.
+        table (Table): The table they are seated at.
+    """
+    reservation = models.ForeignKey(Reservation, on_delete=models.CASCADE,
+                                    related_name='table_assignments')
+    table = models.ForeignKey(Table, on_delete=models.PROTECT,
+                              related_name='assignments')
+
+    def __str__(self):
+        """Return a string for the assignment."""
+        return f"{self.reservation} at {self.table}"
+
+    @classmethod
+    def plan(cls, date, parties):
+        """
+        Work out tables for parties on one date.
+
+        Each party is fitted around the day's existing assignments. If
+        one does not fit, the day's seated parties and the new ones are
+        planned again with the seated ones free to move tables; the
+        parties are rejected only if that leaves any of them unseated.
+        Reservations of the day that have no tables yet (imported,
+        seeded, or made before tables were set up) are then seated
+        where they still fit, best effort: one that does not fit never
+        blocks the new parties. A single query reads the day's
+        reservations.
+
+        Args:
+            date (date): Date of the parties.
+            parties: List of (key, start, end, guests) tuples. The key
+                is the reservation id, or None for a reservation not
+                saved yet; the reservations with these ids are left out
+                of the day's existing bookings.
+
+        Returns:
+            dict: key -> tuple of table ids, for every party whose
+            tables change ({} when no tables are set up), or None if the
+            parties cannot all be seated.
+        """
+        options = Table.seating_options()
+        if not options:
+            return {}
+        keys = [key for key, *_ in parties if key is not None]
+        rows = (Reservation.objects
+                .filter(date=date)
+                .exclude(status="cancelled")
+                .exclude(pk__in=keys)
+                .order_by()
+                .values_list('pk', 'time', 'end_time', 'guests',
+                             'table_assignments__table'))
+        seated, unassigned, busy = {}, {}, {}
+        for pk, start, end, guests, table_id in rows:
+            mask = slot_mask(start, end)
+            if table_id is None:
+                unassigned[pk] = (pk, mask, guests)
+            else:
+                seated[pk] = (pk, mask, guests)
+                occupy(busy, [table_id], mask)
+        new = [(key, slot_mask(start, end), guests)
+               for key, start, end, guests in parties]
+
+        seating, fitted = {}, True
+        for key, mask, guests in new:
+            table_ids = find_seating(options, busy, mask, guests)
+            if table_ids is None:
+                fitted = False
+                break
+            occupy(busy, table_ids, mask)
+            seating[key] = table_ids
+        if not fitted:
+            replan = [*seated.values(), *new]
+            seating, left_out = assign_day(options, replan)
+            if left_out:
+                return None
+            busy = {}
+            for key, mask, _ in replan:
+                occupy(busy, seating[key], mask)
+
+        for key, mask, guests in sorted(
+                unassigned.values(),
+                key=lambda party: (party[1] & -party[1], -party[2])):
+            table_ids = find_seating(options, busy, mask, guests)
+            if table_ids is not None:
+                occupy(busy, table_ids, mask)
+                seating[key] = table_ids
+        return seating
+
+    @classmethod
+    def busy_by_day(cls, first, last, exclude=None):
+        """
+        Return the booked slots of every table over a date range, from
+        one query.
+
+        Args:
+            first (date): First date, inclusive.
+            last (date): Last date, inclusive.
+            exclude (int): Id of a reservation whose tables are left
+                out, or None.
+
+        Returns:
+            dict: date -> {table id -> bitmask of booked slots}
+        """
+        busy = {}
+        rows = (cls.objects
+                .filter(reservation__date__range=(first, last))
+                .exclude(reservation__status="cancelled")
+                .exclude(reservation_id=exclude)
+                .values_list('reservation__date', 'table_id',
+                             'reservation__time', 'reservation__end_time'))
+        for day, table_id, start, end in rows:
+            occupy(busy.setdefault(day, {}), [table_id],
+                   slot_mask(start, end))
+        return busy
+
+    @classmethod
+    def seat(cls, date, parties):
+        """
+        Seat saved reservations on one date and store their tables,
+        along with those of any parties a re-plan moved. The caller
+        holds the date's BookingDay lock, so bookings for the same day
+        are seated one at a time.
+
+        Args:
+            date (date): Date of the reservations.
+            parties: List of (reservation id, start, end, guests).
+
+        Raises:
+            SlotFullError: If the tables cannot take every party.
+        """
+        seating = cls.plan(date, parties)
+        if seating is None:
+            raise SlotFullError(f"No tables free on {date}.")
+        if seating:
+            cls.objects.filter(reservation__in=list(seating)).delete()
+            cls.objects.bulk_create(
+                [cls(reservation_id=key, table_id=table_id)
+                 for key, table_ids in seating.items()
+                 for table_id in table_ids])
+
+    @classmethod
+    def plan_many(cls, reservations):
+        """
+        Work out tables for unsaved reservations written in bulk, day by
+        day around the tables already assigned (see tables.assign_day).
+        The caller holds the BookingDay locks of their dates. Cancelled
+        reservations get no tables.
+
+        Args:
+            reservations (list): Unsaved Reservations with end times.
+
+        Returns:
+            tuple: (dict of list index -> table ids, list of indexes
+            that cannot be seated); nothing is unseated when no tables
+            are set up.
+        """
+        options = Table.seating_options()
+        days = {}
+        for index, reservation in enumerate(reservations):
+            if reservation.status != "cancelled":
+                days.setdefault(reservation.date, []).append(
+                    (index, slot_mask(reservation.time,
+                                      reservation.end_time),
+                     reservation.guests))
+        if not options or not days:
+            return {}, []
+        busy = cls.busy_by_day(min(days), max(days))
+        seating, unseated = {}, []
+        for day, parties in days.items():
+            placed, left_out = assign_day(options, parties, busy.get(day))
+            seating.update(placed)
+            unseated += left_out
+        return seating, sorted(unseated)
+
+    @classmethod
+    def seat_unassigned(cls, first, last, batch_size=5000):
+        """
+        Seat the reservations over a date range that have no tables, in
+        the order they were made, around the tables already assigned.
+        For reservations written without Reservation.save, such as seed
+        data; the rows are streamed, so the range may be large.
+
+        Args:
+            first (date): First date, inclusive.
+            last (date): Last date, inclusive.
+            batch_size (int): Assignments written per INSERT.
+
+        Returns:
+            list: Ids of the reservations that could not be seated.
+        """
+        options = Table.seating_options()
+        if not options:
+            return []
+        busy = cls.busy_by_day(first, last)
+        rows = (Reservation.objects
+                .filter(date__range=(first, last),
+                        table_assignments__isnull=True)
+                .exclude(status="cancelled")
+                .order_by('date', 'pk')
+                .values_list('pk', 'date', 'time', 'end_time', 'guests'))
+        assignments, unseated = [], []
+        for pk, day, start, end, guests in rows.iterator(batch_size):
+            mask = slot_mask(start, end)
+            day_busy = busy.setdefault(day, {})
+            table_ids = find_seating(options, day_busy, mask, guests)
+            if table_ids is None:
+                unseated.append(pk)
+                continue
+            occupy(day_busy, table_ids, mask)
+            assignments += [cls(reservation_id=pk, table_id=table_id)
+                            for table_id in table_ids]
+            if len(assignments) >= batch_size:
+                cls.objects.bulk_create(assignments)
+                assignments = []
+        cls.objects.bulk_create(assignments)
+        return unseated
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['reservation', 'table'],
+                                    name='unique_table_assignment'),
+        ]
+
+
+class WaitlistEntry(models.Model):
+    """
+    A party waiting for a seat at a date and time slot that was full.
+
+    When a reservation is cancelled (deleted, or given the cancelled
+    status), ``promote`` books waitlisted parties into the freed seats
+    in the same transaction; the entry is deleted once its reservation
+    is made.
+
+    Attributes:
+        user (User): The user waiting.
+        date (date): Date wanted.
+        slot (time): Start time wanted.
+        guests (int): Party size (1–14).
+        special_requests (str): Copied to the reservation.
+        created (datetime): When the party joined the waitlist; earlier
+        entries win ties.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    date = models.DateField()
+    slot = models.TimeField()
+    guests = models.PositiveIntegerField(
+        validators=[MinValueValidator(1), MaxValueValidator(14)]
+    )
+    special_requests = models.TextField(blank=True, null=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        """Return a string for the waitlist entry."""
+        return (f"{self.user.username} waiting for {self.guests} "
+                f"on {self.date} at {self.slot}")
+
+    @classmethod
+    def promote(cls, date, freed):
+        """
+        Book waitlisted parties into seats freed on ``date``.
+
+        Only parties whose stay overlaps the freed slots can have been
+        waiting for them. The oldest WAITLIST_CANDIDATES_PER_SLOT
+        entries of each such start slot are read with one LIMIT query
+        per slot on the (date, slot, created) index, so the work per
+        cancellation does not grow with the length of the waitlist.
+        Candidates are tried largest party first (the best fit for the
+        freed seats), oldest first among equals, and at most
+        MAX_PROMOTIONS are booked.
+
+        Must run inside the cancelling transaction, after the seats
+        have been released.
+
+        Args:
+            date (date): Date of the cancelled reservations.
+            freed: Iterable of (start, end) intervals of the cancelled
+                reservations.
+
+        Returns:
+            list: The reservations made.
+        """
+        now = timezone.localtime()
+        if date < now.date():
+            return []
+        span = math.ceil(longest_duration() / datetime.timedelta(
+            minutes=SLOT_MINUTES))
+        starts = set()
+        for start, end in freed:
+            first, last = slot_range(start, end)
+            starts.update(range(max(first - span + 1, 0), last + 1))
+        candidates = []
+        for index in sorted(starts):
+            slot = slot_time(index)
+            if date == now.date() and slot < now.time():
+                continue
+            candidates += (cls.objects
+                           .filter(date=date, slot=slot)
+                           .order_by('created')
+                           [:WAITLIST_CANDIDATES_PER_SLOT])
+        if not candidates:
+            return []
+
+        candidates.sort(key=lambda entry: (-entry.guests, entry.created))
+        booked = SlotLedger.occupancy(date, {
+            slot for entry in candidates
+            for slot in covered_slots(
+                entry.slot, end_time_for(date, entry.slot, entry.guests))})
+        promoted = []
+        for entry in candidates:
+            slots = covered_slots(entry.slot, end_time_for(
+                date, entry.slot, entry.guests))
+            if any(booked.get(slot, 0) + entry.guests
+                   > TOTAL_CAPACITY_PER_SLOT for slot in slots):
+                continue
+            reservation = Reservation(
+                user_id=entry.user_id, date=date, time=entry.slot,
+                guests=entry.guests,
+                special_requests=entry.special_requests)
+            try:
+                reservation.save()
+            except SlotFullError:  # no table free for the party
+                continue
+            entry.delete()
+            for slot in slots:
+                booked[slot] = booked.get(slot, 0) + entry.guests
+            promoted.append(reservation)
+            if len(promoted) == MAX_PROMOTIONS:
+                break
+        return promoted
+
+    class Meta:
+        ordering = ['date', 'slot', 'created']
+        verbose_name_plural = 'waitlist entries'
+        indexes = [
+            models.Index(fields=['date', 'slot', 'created'],
+                         name='waitlist_date_slot_created_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date', 'slot'],
+                                    name='unique_waitlist_entry'),
+        ]
+
+
+class OpeningHours(models.Model):
+    """
+    A sitting on a day of the week, such as lunch on Tuesdays.
+
+    A weekday can have several sittings and is closed when it has none.
+    Until any opening hours are entered every day uses
+    hours.DEFAULT_SITTINGS (11:00 AM to 10:30 PM).
+
+    Attributes:
+        weekday (int): Day of the week, 0 being Monday.
+        first_seating (time): Earliest start time that can be booked.
+        last_seating (time): Latest start time that can be booked.
+    """
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAY_CHOICES)
+    first_seating = models.TimeField()
+    last_seating = models.TimeField()
+
+    def __str__(self):
+        """Return a string for the sitting."""
+        return (f"{self.get_weekday_display()} "
+                f"{self.first_seating:%H:%M}-{self.last_seating:%H:%M}")
+
+    def clean(self):
+        """Check the last seating is not before the first."""
+        if (self.first_seating and self.last_seating
+                and self.last_seating < self.first_seating):
+            raise ValidationError(
+                "The last seating cannot be before the first.")
+
+    @classmethod
+    def _grid_rows(cls):
+        return (cls.objects.order_by()
+                .values_list('weekday', 'first_seating', 'last_seating'),
+                SpecialDate.objects.order_by()
+                .values_list('date', 'closed', 'first_seating',
+                             'last_seating'))
+
+    @classmethod
+    def slot_grid(cls):
+        """
+        Return the bookable start times of every date (see
+        hours.SlotGrid), cached until the hours change (see
+        cache_seconds).
+        """
+        return cache.get_or_set(
+            SLOT_GRID_CACHE_KEY,
+            lambda: build_grid(*cls._grid_rows()),
+            cache_seconds(SLOT_GRID_CACHE_SECONDS),
+        )
+
+    @classmethod
+    async def aslot_grid(cls):
+        """Async version of slot_grid, for async views."""
+        grid = await cache.aget(SLOT_GRID_CACHE_KEY)
+        if grid is None:
+            weekly, special = cls._grid_rows()
+            grid = build_grid([row async for row in weekly],
+                              [row async for row in special])
+            await cache.aset(SLOT_GRID_CACHE_KEY, grid,
+                             cache_seconds(SLOT_GRID_CACHE_SECONDS))
+        return grid
+
+    class Meta:
+        ordering = ['weekday', 'first_seating']
+        verbose_name_plural = 'opening hours'
+
+
+class SpecialDate(models.Model):
+    """
+    A date whose hours differ from its weekday's, such as a holiday.
+
+    Attributes:
+        date (date): The date.
+        closed (bool): Closed all day; the seatings are ignored.
+        first_seating (time): Earliest start time that can be booked.
+        last_seating (time): Latest start time that can be booked.
+        note (str): Reason shown to staff, such as "Christmas Eve".
+    """
+    date = models.DateField(unique=True)
+    closed = models.BooleanField(default=False)
+    first_seating = models.TimeField(blank=True, null=True)
+    last_seating = models.TimeField(blank=True, null=True)
+    note = models.CharField(max_length=100, blank=True)
+
+    def __str__(self):
+        """Return a string for the special date."""
+        if self.closed:
+            return f"{self.date} closed"
+        return (f"{self.date} "
+                f"{self.first_seating:%H:%M}-{self.last_seating:%H:%M}")
+
+    def clean(self):
+        """Check an open special date has a valid range of seatings."""
+        if self.closed:
+            return
+        if self.first_seating is None or self.last_seating is None:
+            raise ValidationError(
+                "Give the first and last seating, or mark the date closed.")
+        if self.last_seating < self.first_seating:
+            raise ValidationError(
+                "The last seating cannot be before the first.")
+
+    class Meta:
+        ordering = ['date']
+        constraints = [
+            models.CheckConstraint(
+                check=(models.Q(closed=True)
+                       | models.Q(first_seating__isnull=False,
+                                  last_seating__isnull=False)),
+                name='special_date_open_has_seatings'),
+        ]
+
+
+class ReservationSubmission(models.Model):
+    """
+    The submission token of a reservation form, and what it booked.
+
+    make_reservation claims the token of each POST before validating
+    it, so a form submitted again (a double tap, or a browser retrying
+    the request) finds the token taken and is answered with the first
+    submission's reservation instead of booking a second one. A token
+    whose form turned out invalid is released with the rest of the
+    request's transaction, so the corrected form can be sent again.
+
+    Attributes:
+        user (User): The user who submitted the form.
+        token (UUID): Token of the form, from its hidden field.
+        reservation (Reservation): The reservation made, or None while
+        the first submission is still being handled.
+        created (datetime): When the token was claimed.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    token = models.UUIDField()
+    reservation = models.ForeignKey(Reservation, on_delete=models.SET_NULL,
+                                    blank=True, null=True,
+                                    related_name='+')
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        """Return a string for the submission."""
+        return f"{self.user.username} {self.token}"
+
+    @classmethod
+    def claim(cls, user, token):
+        """
+        Record the submission of ``token`` by ``user``.
+
+        Returns:
+            tuple: (submission, claimed). ``claimed`` is False when the
+            token was submitted before; ``submission`` is then the
+            earlier one, with its reservation.
+        """
+        try:
+            with transaction.atomic():
+                return cls.objects.create(user=user, token=token), True
+        except IntegrityError:
+            return (cls.objects.select_related('reservation')
+                    .get(user=user, token=token), False)
+
+    @classmethod
+    def purge(cls, hours=SUBMISSION_TOKEN_HOURS):
+        """
+        Delete the tokens claimed more than ``hours`` ago.
+
+        Returns:
+            int: Tokens deleted.
+        """
+        cutoff = timezone.now() - datetime.timedelta(hours=hours)
+        return cls.objects.filter(created__lt=cutoff).delete()[0]
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created'],
+                         name='submission_created_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'token'],
+                                    name='unique_submission_token'),
+        ]
@@ -0,0 +1,170 @@
+"""
+Keyset (cursor) pagination for the Reservations app.
+
+Pages are fetched with a WHERE clause on the last row of the previous
+page instead of an OFFSET, so the database seeks straight to the page
+through the (date, time) index and page N costs the same as page 1.
+No COUNT query is run.
+
+Cursors are opaque URL-safe tokens encoding the ordering values of the
+boundary row and the direction to page in.
+
+A paginator can also page through several tables with the same
+ordering fields as one list (e.g. live and archived reservations): each
+table is seeked separately and the pages are merged.
+"""
+
+import base64
+import heapq
+import json
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+DEFAULT_ORDERING = ('date', 'time', 'id')
+
+
+class KeysetPage:
+    """
+    A single page of results from a KeysetPaginator.
+
+    Attributes:
+        object_list (list): The rows on this page.
+        next_cursor (str): Token for the following page, or None.
+        previous_cursor (str): Token for the preceding page, or None.
+    """
+
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset by seeking past the last row seen.
+
+    Args:
+        queryset: The rows to paginate. Any existing ordering is
+            replaced by ``ordering``.
+        per_page (int): Rows per page.
+        ordering (tuple): Field names giving a unique, ascending order.
+            Defaults to (date, time, id), matching Reservation.Meta.
+        union (iterable): Further querysets, with the same ordering
+            fields, to page through together with ``queryset``.
+    """
+
+    def __init__(self, queryset, per_page, ordering=DEFAULT_ORDERING,
+                 union=()):
+        self.querysets = [queryset, *union]
+        self.per_page = per_page
+        self.ordering = ordering
+        self.fields = [queryset.model._meta.get_field(name)
+                       for name in ordering]
+
+    def _encode(self, direction, obj):
+        values = [field.value_to_string(obj) for field in self.fields]
+        raw = json.dumps([direction] + values).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def _decode(self, cursor):
+        """Return (direction, values), or None for a missing/bad cursor."""
+        if not cursor:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            direction, *values = json.loads(raw)
+            if direction not in ("next", "prev") or \
+                    len(values) != len(self.fields):
+                return None
+            return direction, [field.to_python(value) for field, value
+                               in zip(self.fields, values)]
+        except (ValueError, TypeError, ValidationError):
+            return None
+
+    def _seek(self, values, lookup):
+        """
+        Build the row-value comparison (a, b, c) > (x, y, z) as nested
+        ORs, which every backend can plan as an index range scan.
+        """
+        condition = Q()
+        for i, name in enumerate(self.ordering):
+            term = Q(**{f"{name}__{lookup}": values[i]})
+            for prior, value in zip(self.ordering[:i], values[:i]):
+                term &= Q(**{prior: value})
+            condition |= term
+        # Leading-column bound lets the planner start the scan there
+        first = self.ordering[0]
+        bound = "gte" if lookup == "gt" else "lte"
+        return Q(**{f"{first}__{bound}": values[0]}) & condition
+
+    def _page_query(self, queryset, decoded, direction):
+        """Return the query for one page of a single queryset."""
+        if direction == "next":
+            queryset = queryset.order_by(*self.ordering)
+            if decoded:
+                queryset = queryset.filter(self._seek(decoded[1], "gt"))
+        else:
+            queryset = (queryset
+                        .filter(self._seek(decoded[1], "lt"))
+                        .order_by(*[f"-{name}" for name in self.ordering]))
+        return queryset[:self.per_page + 1]
+
+    def _page_queries(self, cursor):
+        """Return (one query per queryset, decoded cursor, direction)."""
+        decoded = self._decode(cursor)
+        direction = decoded[0] if decoded else "next"
+        return ([self._page_query(queryset, decoded, direction)
+                 for queryset in self.querysets], decoded, direction)
+
+    def _merge(self, results, direction):
+        """Merge the per-queryset pages into one list in page order."""
+        if len(results) == 1:
+            return results[0]
+        attnames = [field.attname for field in self.fields]
+        merged = heapq.merge(
+            *results, reverse=direction == "prev",
+            key=lambda obj: tuple(getattr(obj, name) for name in attnames))
+        return list(merged)[:self.per_page + 1]
+
+    def _build_page(self, rows, decoded, direction):
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == "prev":
+            rows.reverse()
+            has_next, has_previous = True, more
+        else:
+            has_next, has_previous = more, decoded is not None
+
+        next_cursor = (self._encode("next", rows[-1])
+                       if has_next and rows else None)
+        previous_cursor = (self._encode("prev", rows[0])
+                           if has_previous and rows else None)
+        return KeysetPage(rows, next_cursor, previous_cursor)
+
+    def get_page(self, cursor=None):
+        """
+        Return the page the cursor points at (the first page if the
+        cursor is missing or invalid).
+        """
+        queries, decoded, direction = self._page_queries(cursor)
+        rows = self._merge([list(query) for query in queries], direction)
+        return self._build_page(rows, decoded, direction)
+
+    async def aget_page(self, cursor=None):
+        """Async version of get_page, using the async ORM."""
+        queries, decoded, direction = self._page_queries(cursor)
+        rows = self._merge([[row async for row in query]
+                            for query in queries], direction)
+        return self._build_page(rows, decoded, direction)
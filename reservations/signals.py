@@ -0,0 +1,76 @@
+"""
+Signal handlers for the Reservations app.
+
+Keeps the SlotLedger, waitlist and DailyOccupancy in step with
+reservations that are deleted, whether through Reservation.delete, a
+queryset delete or a cascade from the owning user, and clears the
+cached table layout whenever a Table is saved or deleted and the
+cached slot grid whenever the opening hours change.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import (BookingDay, DailyOccupancy, OpeningHours,
+                     Reservation, SLOT_GRID_CACHE_KEY, SlotLedger,
+                     SpecialDate, Table, TABLE_OPTIONS_CACHE_KEY,
+                     WaitlistEntry)
+
+_release_on_delete = ContextVar('release_on_delete', default=True)
+
+
+@contextmanager
+def ledger_release_disabled():
+    """
+    Skip the per-row ledger release, waitlist promotion and occupancy
+    refresh for deletes inside the block.
+
+    For bulk operations that settle the ledger themselves, such as
+    archiving past reservations (which DailyOccupancy keeps counting).
+    """
+    token = _release_on_delete.set(False)
+    try:
+        yield
+    finally:
+        _release_on_delete.reset(token)
+
+
+@receiver(post_delete, sender=Reservation)
+def release_deleted_reservation(sender, instance, origin=None, **kwargs):
+    """
+    Release the guests of a deleted reservation from its slots, book
+    waitlisted parties into them and refresh the day's occupancy
+    summary.
+
+    Runs inside the delete's transaction, so the promotions commit or
+    roll back with it. Cascades (such as deleting the user) only release
+    the seats: the user's own waitlist entries may not be deleted yet.
+    """
+    if not _release_on_delete.get():
+        return
+    BookingDay.lock([instance.date])
+    SlotLedger.release(instance.date, instance.time, instance.end_time,
+                       instance.guests, instance.status)
+    deleted = getattr(origin, 'model', type(origin))
+    if instance.status != "cancelled" and deleted is Reservation:
+        WaitlistEntry.promote(instance.date,
+                              [(instance.time, instance.end_time)])
+    DailyOccupancy.schedule_refresh([instance.date])
+
+
+@receiver(post_save, sender=Table)
+@receiver(post_delete, sender=Table)
+def clear_table_options(sender, **kwargs):
+    """Drop the cached seating options so the next check reloads them."""
+    cache.delete(TABLE_OPTIONS_CACHE_KEY)
+
+
+@receiver(post_save, sender=OpeningHours)
+@receiver(post_delete, sender=OpeningHours)
+@receiver(post_save, sender=SpecialDate)
+@receiver(post_delete, sender=SpecialDate)
+def clear_slot_grid(sender, **kwargs):
+    """Drop the cached slot grid so the next lookup rebuilds it."""
+    cache.delete(SLOT_GRID_CACHE_KEY)
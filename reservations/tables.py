@@ -0,0 +1,122 @@
+"""
+Table assignment engine for the Reservations app.
+
+Packs parties onto real tables instead of treating the dining room as
+one bucket of seats. A party sits at a single table or at up to
+MAX_COMBINED_TABLES tables pushed together, which is allowed for
+tables that share a combine group. Each table's bookings for a day are
+kept as a bitmask over the half-hour slots of capacity.slot_range, so
+checking whether a table is free for a party is a single AND.
+
+Works on plain tuples and makes no queries; TableAssignment loads the
+tables and a day's reservations and stores the result.
+"""
+
+from bisect import bisect_left
+from itertools import combinations
+from .capacity import slot_range
+
+# Most tables pushed together for one party
+MAX_COMBINED_TABLES = 3
+
+
+def slot_mask(start, end):
+    """Return a bitmask with a bit set for every slot an interval covers."""
+    first, last = slot_range(start, end)
+    return ((1 << (last - first + 1)) - 1) << first
+
+
+def seating_options(tables):
+    """
+    Return every way of seating a party at the given tables.
+
+    Args:
+        tables: Iterable of (table id, seats, combine group) tuples;
+            tables with a blank group are never combined.
+
+    Returns:
+        list: (seats, tuple of table ids) sorted by seats, then by the
+        number of tables, so the first free option that is big enough
+        is the snuggest fit.
+    """
+    options, groups = [], {}
+    for table_id, seats, group in tables:
+        options.append((seats, (table_id,)))
+        if group:
+            groups.setdefault(group, []).append((table_id, seats))
+    for members in groups.values():
+        for size in range(2, min(MAX_COMBINED_TABLES, len(members)) + 1):
+            for combo in combinations(sorted(members), size):
+                options.append((sum(seats for _, seats in combo),
+                                tuple(table_id for table_id, _ in combo)))
+    options.sort(key=lambda option: (option[0], len(option[1]), option[1]))
+    return options
+
+
+def find_seating(options, busy, mask, guests):
+    """
+    Return the table ids of the snuggest free option for a party.
+
+    Args:
+        options (list): Seating options from seating_options().
+        busy (dict): Table id -> bitmask of the slots it is booked for.
+        mask (int): Slots the party needs, from slot_mask().
+        guests (int): Party size.
+
+    Returns:
+        tuple: Table ids, or None if no option is free.
+    """
+    for index in range(bisect_left(options, (guests,)), len(options)):
+        table_ids = options[index][1]
+        if not any(busy.get(table_id, 0) & mask for table_id in table_ids):
+            return table_ids
+    return None
+
+
+def occupy(busy, table_ids, mask):
+    """Mark tables as booked for the slots in ``mask``."""
+    for table_id in table_ids:
+        busy[table_id] = busy.get(table_id, 0) | mask
+
+
+def _first_slot(mask):
+    return mask & -mask  # lowest set bit
+
+
+def assign_day(options, parties, busy=None):
+    """
+    Seat a whole day's parties, from scratch or around tables already
+    taken.
+
+    Greedy best fit in two orders, by start slot and then largest party
+    first; whichever seats more parties wins.
+
+    Args:
+        options (list): Seating options from seating_options().
+        parties: Iterable of (key, mask, guests) tuples.
+        busy (dict): Table id -> bitmask of slots already booked, which
+            is left unchanged; None when every table is free.
+
+    Returns:
+        tuple: (dict of key -> table ids, list of keys left unseated)
+    """
+    parties = list(parties)
+    orders = [
+        lambda party: (_first_slot(party[1]), -party[2]),
+        lambda party: (-party[2], _first_slot(party[1])),
+    ]
+    best = None
+    for order in orders:
+        taken, seating, unseated = dict(busy or {}), {}, []
+        for key, mask, guests in sorted(parties, key=order):
+            table_ids = find_seating(options, taken, mask, guests)
+            if table_ids is None:
+                unseated.append(key)
+            else:
+                occupy(taken, table_ids, mask)
+                seating[key] = table_ids
+        if best is None or len(unseated) < len(best[1]):
+            best = seating, unseated
+        if not unseated:
+            break
+    return best
@@ -0,0 +1,59 @@
+from datetime import date, time, timedelta
+from unittest import mock
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.test import TestCase
+from django.urls import reverse
+from .forms import SLOT_FULL_MESSAGE
+from .models import Reservation, SlotLedger, TOTAL_CAPACITY_PER_SLOT
+
+
+class TestReservationAdmin(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username="admin")
+        self.client.force_login(self.admin)
+        self.day = date.today() + timedelta(days=2)
+        for _ in range(TOTAL_CAPACITY_PER_SLOT // 10):
+            Reservation.objects.create(user=self.admin, date=self.day,
+                                       time=time(19, 0), guests=10)
+        self.reservation = Reservation.objects.create(
+            user=self.admin, date=self.day, time=time(12, 0), guests=4)
+        self.url = reverse("admin:reservations_reservation_change",
+                           args=[self.reservation.id])
+
+    def post(self, **changes):
+        data = {
+            "user": self.admin.id,
+            "date": self.day,
+            "time": "12:00:00",
+            "guests": 4,
+            "special_requests": "",
+            "status": "pending",
+            "table_assignments-TOTAL_FORMS": 0,
+            "table_assignments-INITIAL_FORMS": 0,
+        }
+        data.update(changes)
+        return self.client.post(self.url, data)
+
+    def test_moving_into_a_full_slot_is_a_form_error(self):
+        response = self.post(time="19:00:00")
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, SLOT_FULL_MESSAGE)
+        self.reservation.refresh_from_db()
+        self.assertEqual(self.reservation.time, time(12, 0))
+
+    def test_cancelled_reservation_is_not_checked(self):
+        response = self.post(time="19:00:00", status="cancelled")
+        self.assertEqual(response.status_code, 302)
+        self.reservation.refresh_from_db()
+        self.assertEqual(self.reservation.time, time(19, 0))
+
+    def test_slot_filled_after_the_check_sends_staff_back(self):
+        with mock.patch("reservations.admin.check_room"):
+            response = self.post(time="19:00:00")
+        self.assertRedirects(response, self.url)
+        self.assertEqual([str(message) for message in
+                          get_messages(response.wsgi_request)],
+                         [SLOT_FULL_MESSAGE])
+        self.assertEqual(SlotLedger.booked(self.day, time(12, 0)), 4)
@@ -0,0 +1,48 @@
+from django.test import SimpleTestCase, override_settings
+from datetime import date, time, timedelta
+from .capacity import (covered_slots, duration_for, end_time_for,
+                       longest_duration, peak_occupancy, slot_occupancy)
+
+
+class TestCapacityEngine(SimpleTestCase):
+
+    @override_settings(RESERVATION_DURATIONS=[(2, 60), (6, 90), (14, 120)])
+    def test_duration_depends_on_party_size(self):
+        self.assertEqual(duration_for(2), timedelta(minutes=60))
+        self.assertEqual(duration_for(5), timedelta(minutes=90))
+        self.assertEqual(duration_for(14), timedelta(minutes=120))
+        self.assertEqual(longest_duration(), timedelta(minutes=120))
+        self.assertEqual(end_time_for(date(2030, 1, 1), time(19, 0), 5),
+                         time(20, 30))
+
+    def test_covered_slots(self):
+        self.assertEqual(covered_slots(time(19, 0), time(20, 0)),
+                         [time(19, 0), time(19, 30)])
+        self.assertEqual(covered_slots(time(19, 15), time(20, 15)),
+                         [time(19, 0), time(19, 30), time(20, 0)])
+
+    def test_covered_slots_clipped_at_midnight(self):
+        self.assertEqual(covered_slots(time(23, 30), time(0, 30)),
+                         [time(23, 30)])
+
+    def test_slot_occupancy_counts_overlaps(self):
+        occupancy = slot_occupancy([
+            (time(19, 0), time(20, 0), 4),
+            (time(19, 30), time(20, 30), 6),
+            (time(21, 0), time(22, 0), 2),
+        ])
+        self.assertEqual(occupancy, {
+            time(19, 0): 4,
+            time(19, 30): 10,
+            time(20, 0): 6,
+            time(21, 0): 2,
+            time(21, 30): 2,
+        })
+
+    def test_peak_occupancy(self):
+        self.assertEqual(peak_occupancy([]), 0)
+        self.assertEqual(peak_occupancy([
+            (time(12, 0), time(13, 0), 8),
+            (time(12, 30), time(13, 30), 3),
+            (time(13, 0), time(14, 0), 9),
+        ]), 12)
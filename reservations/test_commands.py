@@ -0,0 +1,376 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from django.core.cache import cache
+from django.test import TestCase
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.contrib.auth.models import User
+from django.utils import timezone
+from datetime import date, time, timedelta
+from .capacity import end_time_for
+from .forms import NO_TABLE_MESSAGE, SLOT_FULL_MESSAGE
+from menu.models import MENU_CACHE_KEY, MenuItem
+from .models import (ArchivedReservation, DailyOccupancy, OpeningHours,
+                     Reservation, ReservationSubmission, SlotLedger, Table,
+                     TableAssignment, TOTAL_CAPACITY_PER_SLOT)
+
+
+class TestRebuildSlotLedgerCommand(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser",
+                                             password="testpass")
+        self.day = date.today() + timedelta(days=1)
+        Reservation.objects.create(user=self.user, date=self.day,
+                                   time=time(19, 0), guests=4)
+        Reservation.objects.create(user=self.user, date=self.day,
+                                   time=time(19, 0), guests=3,
+                                   status="cancelled")
+
+    def test_check_passes_when_in_sync(self):
+        out = StringIO()
+        call_command("rebuild_slot_ledger", "--check", stdout=out)
+        self.assertIn("in sync", out.getvalue())
+
+    def test_check_reports_drift(self):
+        SlotLedger.objects.update(booked_guests=10)
+        with self.assertRaises(CommandError):
+            call_command("rebuild_slot_ledger", "--check", stdout=StringIO())
+
+    def test_rebuild_restores_totals(self):
+        SlotLedger.objects.all().delete()
+        call_command("rebuild_slot_ledger", stdout=StringIO())
+        self.assertEqual(SlotLedger.booked(self.day, time(19, 0)), 4)
+
+
+class TestImportReservationsCommand(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="phone",
+                                             password="testpass")
+        self.day = date.today() + timedelta(days=3)
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def test_imports_csv_and_books_ledger(self):
+        path = self.write("in.csv", (
+            "user,date,time,guests,special_requests\n"
+            f"phone,{self.day},19:00,4,Window\n"
+            f"phone,{self.day},19:30,2,\n"))
+        out = StringIO()
+        call_command("import_reservations", path, stdout=out)
+        self.assertIn("Imported 2 reservation(s).", out.getvalue())
+        reservation = Reservation.objects.get(time=time(19, 0))
+        self.assertEqual(reservation.end_time, time(20, 0))
+        self.assertEqual(reservation.special_requests, "Window")
+        self.assertEqual(SlotLedger.booked(self.day, time(19, 30)), 6)
+        self.assertFalse(os.path.exists(
+            os.path.join(self.tmpdir, "in.rejects.csv")))
+
+    def test_rejected_rows_are_reported(self):
+        past = date.today() - timedelta(days=1)
+        path = self.write("in.jsonl", "\n".join([
+            json.dumps({"date": str(self.day), "time": "19:00",
+                        "guests": 14}),
+            json.dumps({"date": str(past), "time": "19:00", "guests": 2}),
+            json.dumps({"user": "nobody", "date": str(self.day),
+                        "time": "12:00", "guests": 2}),
+            json.dumps({"date": str(self.day), "time": "19:00",
+                        "guests": 20}),
+            json.dumps({"date": str(self.day), "time": "03:00",
+                        "guests": 2}),
+            "not json",
+        ] + [json.dumps({"date": str(self.day), "time": "19:00",
+                         "guests": 14})] * 3))
+        out = StringIO()
+        call_command("import_reservations", path, "--user", "phone",
+                     "--chunk-size", "4", stdout=out)
+        self.assertIn("Imported 3 reservation(s); 6 rejected",
+                      out.getvalue())
+        with open(os.path.join(self.tmpdir, "in.rejects.jsonl")) as f:
+            errors = {row["line"]: row["error"]
+                      for row in map(json.loads, f)}
+        self.assertIn("past", errors[2])
+        self.assertIn("Unknown user", errors[3])
+        self.assertIn("Guests", errors[4])
+        self.assertIn("bookable", errors[5])
+        self.assertEqual(errors[6], "Invalid JSON.")
+        # capacity is tracked across rows and chunks
+        self.assertEqual(errors[9], SLOT_FULL_MESSAGE)
+        self.assertEqual(SlotLedger.booked(self.day, time(19, 0)), 42)
+        call_command("rebuild_slot_ledger", "--check", stdout=StringIO())
+
+    def test_respects_existing_bookings(self):
+        Reservation.objects.create(user=self.user, date=self.day,
+                                   time=time(19, 0), guests=40)
+        path = self.write("in.csv", (
+            "user,date,time,guests\n"
+            f"phone,{self.day},19:00,12\n"
+            f"phone,{self.day},19:00,10\n"))
+        call_command("import_reservations", path, stdout=StringIO())
+        self.assertEqual(Reservation.objects.count(), 2)
+        self.assertEqual(SlotLedger.booked(self.day, time(19, 0)), 50)
+
+    def test_rows_are_seated_at_tables(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        Table.objects.create(name="T1", seats=4)
+        Table.objects.create(name="T2", seats=4)
+        Reservation.objects.create(user=self.user, date=self.day,
+                                   time=time(19, 0), guests=4)
+        path = self.write("in.csv", (
+            "user,date,time,guests\n"
+            f"phone,{self.day},19:00,3\n"
+            f"phone,{self.day},19:00,2\n"
+            f"phone,{self.day},12:00,2\n"))
+        out = StringIO()
+        call_command("import_reservations", path, stdout=out)
+        self.assertIn("Imported 2 reservation(s); 1 rejected",
+                      out.getvalue())
+        with open(os.path.join(self.tmpdir, "in.rejects.csv")) as f:
+            self.assertIn(NO_TABLE_MESSAGE, f.read())
+        self.assertFalse(Reservation.objects.filter(
+            table_assignments__isnull=True).exists())
+        self.assertEqual(SlotLedger.booked(self.day, time(19, 0)), 7)
+
+    def test_unknown_format(self):
+        path = self.write("in.txt", "")
+        with self.assertRaises(CommandError):
+            call_command("import_reservations", path, stdout=StringIO())
+
+
+class TestExportReservationsCommand(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser",
+                                             password="testpass")
+        self.day = date.today() + timedelta(days=1)
+        Reservation.objects.create(user=self.user, date=self.day,
+                                   time=time(19, 0), guests=4)
+        Reservation.objects.create(user=self.user, date=self.day,
+                                   time=time(12, 0), guests=3,
+                                   status="cancelled")
+
+    def test_exports_csv_to_stdout(self):
+        out = StringIO()
+        call_command("export_reservations", "--status", "pending",
+                     stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn("testuser", lines[1])
+
+    def test_export_can_be_imported_again(self):
+        path = os.path.join(tempfile.mkdtemp(), "out.csv")
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        call_command("export_reservations", "--output", path,
+                     stdout=StringIO())
+        Reservation.objects.all().delete()
+        call_command("import_reservations", path, stdout=StringIO())
+        self.assertEqual(
+            sorted(Reservation.objects.values_list("time", "status")),
+            [(time(12, 0), "cancelled"), (time(19, 0), "pending")])
+        self.assertEqual(SlotLedger.booked(self.day, time(19, 0)), 4)
+
+
+class TestArchiveReservationsCommand(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser",
+                                             password="testpass")
+        self.past = date.today() - timedelta(days=10)
+        self.old = [Reservation.objects.create(
+            user=self.user, date=self.past + timedelta(days=i),
+            time=time(19, 0), guests=2, special_requests=f"Old {i}",
+            status="cancelled" if i == 0 else "confirmed")
+            for i in range(5)]
+        self.upcoming = Reservation.objects.create(
+            user=self.user, date=date.today() + timedelta(days=1),
+            time=time(19, 0), guests=4)
+
+    def test_moves_old_rows_in_batches(self):
+        out = StringIO()
+        call_command("archive_reservations", "--before",
+                     str(date.today()), "--batch-size", "2", stdout=out)
+        self.assertIn("Archived 5 reservation(s) dated before",
+                      out.getvalue())
+        self.assertEqual(list(Reservation.objects.all()), [self.upcoming])
+        archived = ArchivedReservation.objects.get(pk=self.old[3].pk)
+        self.assertEqual(archived.special_requests, "Old 3")
+        self.assertEqual(archived.created_on, self.old[3].created_on)
+        self.assertEqual(archived.status, "confirmed")
+        self.assertFalse(SlotLedger.objects.filter(
+            date__lt=date.today()).exists())
+        self.assertEqual(SlotLedger.booked(self.upcoming.date, time(19, 0)),
+                         4)
+        call_command("rebuild_slot_ledger", "--check", stdout=StringIO())
+
+    def test_rerun_carries_on_without_duplicates(self):
+        cutoff = str(self.past + timedelta(days=2))
+        call_command("archive_reservations", "--before", cutoff,
+                     stdout=StringIO())
+        self.assertEqual(ArchivedReservation.objects.count(), 2)
+        call_command("archive_reservations", "--before", cutoff,
+                     stdout=StringIO())
+        call_command("archive_reservations", "--before", str(date.today()),
+                     stdout=StringIO())
+        self.assertEqual(ArchivedReservation.objects.count(), 5)
+        self.assertEqual(Reservation.objects.count(), 1)
+
+    def test_refuses_future_cutoff(self):
+        with self.assertRaises(CommandError):
+            call_command("archive_reservations", "--before",
+                         str(date.today() + timedelta(days=1)),
+                         stdout=StringIO())
+
+    def test_export_can_include_archive(self):
+        call_command("archive_reservations", "--before", str(date.today()),
+                     stdout=StringIO())
+        out = StringIO()
+        call_command("export_reservations", stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 2)
+        out = StringIO()
+        call_command("export_reservations", "--include-archived", stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 7)
+        self.assertIn("Old 0", lines[1])
+
+
+class TestRefreshDailyOccupancyCommand(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser",
+                                             password="testpass")
+        self.days = [date.today() - timedelta(days=30 * i) for i in range(4)]
+        # bulk_create skips the write hooks, like data from before the table
+        Reservation.objects.bulk_create(
+            Reservation(user=self.user, date=day, time=time(19, 0),
+                        end_time=time(20, 0), guests=2)
+            for day in self.days)
+
+    def test_backfills_only_missing_days(self):
+        out = StringIO()
+        call_command("refresh_daily_occupancy", "--batch-days", "2",
+                     stdout=out)
+        self.assertIn("4 day(s)", out.getvalue())
+        self.assertEqual(DailyOccupancy.objects.filter(
+            slot=time(19, 30)).count(), 4)
+
+        out = StringIO()
+        call_command("refresh_daily_occupancy", stdout=out)
+        self.assertIn("0 day(s)", out.getvalue())
+
+    def test_rebuild_repairs_stale_days(self):
+        call_command("refresh_daily_occupancy", stdout=StringIO())
+        DailyOccupancy.objects.update(covers=99)
+        call_command("refresh_daily_occupancy", "--rebuild",
+                     "--from", str(self.days[1]), stdout=StringIO())
+        self.assertEqual(
+            sorted(DailyOccupancy.objects.filter(slot=time(19, 0))
+                   .values_list("covers", flat=True)), [2, 2, 99, 99])
+
+
+class TestPurgeSubmissionsCommand(TestCase):
+
+    def test_deletes_expired_tokens_only(self):
+        user = User.objects.create_user(username="diner")
+        old, recent = (ReservationSubmission.objects.create(
+            user=user, token=f"00000000-0000-4000-8000-00000000000{i}")
+            for i in range(2))
+        ReservationSubmission.objects.filter(pk=old.pk).update(
+            created=timezone.now() - timedelta(hours=25))
+        out = StringIO()
+        call_command("purge_submissions", stdout=out)
+        self.assertIn("Deleted 1 submission token(s)", out.getvalue())
+        self.assertEqual(list(ReservationSubmission.objects.all()),
+                         [recent])
+        with self.assertRaises(CommandError):
+            call_command("purge_submissions", "--hours", "0")
+
+
+class TestSeedDataCommand(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def seed(self, *args):
+        out = StringIO()
+        call_command("seed_data", "--reservations", "600", "--users", "20",
+                     "--menu-items", "30", "--chunk-size", "250", *args,
+                     stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def rows(self):
+        return list(Reservation.objects.order_by("id").values_list(
+            "user__username", "date", "time", "end_time", "guests",
+            "status"))
+
+    def test_seeds_users_menu_and_reservations(self):
+        self.assertIn("Seeded 600 reservation(s)", self.seed())
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(MenuItem.objects.count(), 30)
+        self.assertEqual(Reservation.objects.count(), 600)
+        for _, day, start, end, guests, _ in self.rows()[:50]:
+            self.assertEqual(end, end_time_for(day, start, guests))
+        self.assertLessEqual(max(SlotLedger.objects.values_list(
+            "booked_guests", flat=True)), TOTAL_CAPACITY_PER_SLOT)
+        call_command("rebuild_slot_ledger", "--check", stdout=StringIO())
+
+    def test_same_seed_gives_same_rows(self):
+        self.seed("--seed", "3")
+        first = self.rows()
+        Reservation.objects.all().delete()
+        self.seed("--seed", "3")
+        self.assertEqual(self.rows(), first)
+        self.assertEqual(User.objects.count(), 20)  # users are reused
+
+    def test_anchor_date_fixes_the_dates(self):
+        anchor = date.today() - timedelta(days=400)
+        self.seed("--anchor-date", str(anchor), "--future-days", "10")
+        self.assertEqual(
+            max(Reservation.objects.values_list("date", flat=True)),
+            anchor + timedelta(days=10))
+
+    def test_second_run_respects_existing_bookings(self):
+        self.seed("--per-day", "300")
+        self.seed("--per-day", "300", "--seed", "2")
+        self.assertLessEqual(max(SlotLedger.objects.values_list(
+            "booked_guests", flat=True)), TOTAL_CAPACITY_PER_SLOT)
+        call_command("rebuild_slot_ledger", "--check", stdout=StringIO())
+
+    def test_seeded_rows_are_seated_at_tables(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        Table.objects.create(name="T1", seats=8, combine_group="hall")
+        Table.objects.create(name="T2", seats=8, combine_group="hall")
+        self.seed()
+        booked = Reservation.objects.exclude(status="cancelled")
+        self.assertTrue(booked.exists())
+        self.assertFalse(booked.filter(
+            table_assignments__isnull=True).exists())
+        self.assertFalse(TableAssignment.objects.filter(
+            reservation__status="cancelled").exists())
+
+    def test_clears_the_cached_menu(self):
+        cache.set(MENU_CACHE_KEY, "stale")
+        self.seed()
+        self.assertIsNone(cache.get(MENU_CACHE_KEY))
+
+    def test_follows_the_opening_hours(self):
+        OpeningHours.objects.create(weekday=4, first_seating=time(18, 0),
+                                    last_seating=time(21, 0))
+        self.seed("--per-day", "30")
+        days = {day.weekday() for day in
+                Reservation.objects.values_list("date", flat=True)}
+        self.assertEqual(days, {4})
+        self.assertFalse(Reservation.objects.filter(
+            time__lt=time(18, 0)).exists())
@@ -0,0 +1,128 @@
+import threading
+import time as clock
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time, timedelta
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import OperationalError, connection
+from django.test import TransactionTestCase
+from .models import (Reservation, SlotFullError, SlotLedger, Table,
+                     TableAssignment, TOTAL_CAPACITY_PER_SLOT)
+from .tables import slot_mask
+
+
+class TestConcurrentBookings(TransactionTestCase):
+    """
+    Stress test firing hundreds of concurrent bookings at one slot.
+
+    Every worker thread gets its own database connection, so the
+    capacity guard is exercised exactly as it is across gunicorn
+    workers: the total booked must never exceed the slot capacity.
+    """
+
+    BOOKINGS = 300
+    WORKERS = 16
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser",
+                                             password="testpass")
+        self.day = date.today() + timedelta(days=1)
+        self.slot = time(19, 0)
+
+    def _book(self, guests):
+        try:
+            while True:
+                try:
+                    Reservation(user_id=self.user.pk, date=self.day,
+                                time=self.slot, guests=guests).save()
+                    return True
+                except SlotFullError:
+                    return False
+                except OperationalError:
+                    # SQLite reports lock contention instead of waiting
+                    clock.sleep(0.001)
+        finally:
+            connection.close()
+
+    def test_slot_never_overbooked(self):
+        guests = [1 + i % 4 for i in range(self.BOOKINGS)]
+        barrier = threading.Barrier(self.WORKERS)
+
+        def worker(chunk):
+            barrier.wait()
+            return [self._book(g) for g in chunk]
+
+        chunks = [guests[i::self.WORKERS] for i in range(self.WORKERS)]
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+            results = list(pool.map(worker, chunks))
+
+        accepted = sum(
+            g for chunk, res in zip(chunks, results)
+            for g, ok in zip(chunk, res) if ok
+        )
+        booked = sum(Reservation.objects.filter(
+            date=self.day, time=self.slot).values_list('guests', flat=True))
+
+        self.assertLessEqual(booked, TOTAL_CAPACITY_PER_SLOT)
+        self.assertEqual(booked, accepted)
+        self.assertEqual(SlotLedger.booked(self.day, self.slot), booked)
+        # The slot fills up: losing the race is a clean rejection,
+        # not a lost booking.
+        self.assertGreater(booked, TOTAL_CAPACITY_PER_SLOT - 4)
+
+
+class TestSameDayBookings(TransactionTestCase):
+    """
+    Two bookings for the same day at different times, saved at once
+    while tables are set up.
+
+    Each books its own slots and then seats the whole day, so without
+    the day's BookingDay lock taken first they wait for each other's
+    ledger rows and PostgreSQL aborts one with a deadlock.
+    """
+
+    ROUNDS = 10
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(username="testuser")
+        self.day = date.today() + timedelta(days=1)
+        for i in range(6):
+            Table.objects.create(name=f"T{i}", seats=4)
+
+    def _book(self, start, barrier):
+        barrier.wait()
+        try:
+            while True:
+                try:
+                    Reservation(user_id=self.user.pk, date=self.day,
+                                time=start, guests=4).save()
+                    return
+                except OperationalError:
+                    if connection.vendor != 'sqlite':
+                        raise  # a deadlock, not lock contention
+                    clock.sleep(0.001)
+        finally:
+            connection.close()
+
+    def test_bookings_at_different_times_are_both_seated(self):
+        starts = [(time(12 + i % 9, 0), time(12 + i % 9, 30))
+                  for i in range(self.ROUNDS)]
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            for pair in starts:
+                barrier = threading.Barrier(2)
+                list(pool.map(self._book, pair, [barrier] * 2))
+
+        self.assertEqual(Reservation.objects.count(), 2 * self.ROUNDS)
+        busy = {}
+        for assignment in TableAssignment.objects.select_related(
+                'reservation'):
+            reservation = assignment.reservation
+            mask = slot_mask(reservation.time, reservation.end_time)
+            self.assertFalse(busy.get(assignment.table_id, 0) & mask)
+            busy[assignment.table_id] = busy.get(assignment.table_id,
+                                                 0) | mask
+        self.assertEqual(
+            TableAssignment.objects.values('reservation').distinct()
+            .count(), 2 * self.ROUNDS)
@@ -1,9 +1,12 @@
 from django.test import TestCase
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.utils import timezone
 from datetime import date, time, timedelta
-from .forms import ReservationForm
-from .models import Reservation
+from .forms import (CLOSED_MESSAGE, NO_TABLE_MESSAGE, ReservationForm,
+                    WaitlistForm)
+from .availability import nearest_slots
+from .models import OpeningHours, Reservation, SpecialDate, Table
 from django.db.models import Sum
 
 
@@ -67,6 +70,86 @@ class TestReservationForm(TestCase):
         self.assertFalse(form.is_valid(),
                          msg="Form is valid even though it exceeds capacity")
 
+    def test_full_slot_suggests_nearest_slots(self):
+        """
+        A full slot comes back with the closest slots that fit, from
+        one ledger query.
+        """
+        day = self.existing_reservation.date
+        Reservation.objects.create(user=self.user, date=day,
+                                   time=time(19, 0), guests=14)
+        Table.seating_options()  # warm the (empty) table layout cache
+        form = ReservationForm(data={'date': day, 'time': '19:00:00',
+                                     'guests': 7})
+        with self.assertNumQueries(2):  # capacity check, suggestions
+            self.assertFalse(form.is_valid())
+        self.assertEqual(form.suggestions, [
+            (day, time(18, 0)), (day, time(20, 0)), (day, time(17, 30)),
+            (day, time(20, 30)), (day, time(17, 0)),
+        ])
+
+    def test_suggestions_stop_at_the_last_representable_date(self):
+        self.assertEqual(nearest_slots(date.max, time(19, 0), 2)[:2],
+                         [(date.max, time(18, 30)), (date.max, time(19, 30))])
+
+    def test_valid_form_has_no_suggestions(self):
+        form = ReservationForm(data={
+            'date': self.existing_reservation.date,
+            'time': '12:00:00',
+            'guests': 2,
+        })
+        self.assertTrue(form.is_valid())
+        self.assertFalse(form.suggestions)
+
+    def test_form_invalid_overlapping_reservation(self):
+        """
+        A party starting half an hour into an existing reservation
+        competes for the same seats.
+        """
+        form_data = {
+            'date': self.existing_reservation.date,
+            'time': time(19, 30),
+            'guests': 25,
+        }
+        form = ReservationForm(data=form_data)
+        self.assertFalse(form.is_valid(),
+                         msg="Form ignores overlapping reservations")
+
+    def test_form_valid_after_existing_reservation_ends(self):
+        """
+        A party starting when an existing reservation ends does not
+        overlap it.
+        """
+        form_data = {
+            'date': self.existing_reservation.date,
+            'time': time(20, 0),
+            'guests': 14,
+        }
+        form = ReservationForm(data=form_data)
+        self.assertTrue(form.is_valid(),
+                        msg="Form counts a reservation that has ended")
+
+    def test_form_edit_does_not_count_itself(self):
+        """
+        Editing a reservation should not count its own guests
+        against the slot capacity.
+        """
+        Reservation.objects.create(
+            user=self.user,
+            date=self.existing_reservation.date,
+            time=self.existing_reservation.time,
+            guests=10
+        )
+        form_data = {
+            'date': self.existing_reservation.date,
+            'time': self.existing_reservation.time,
+            'guests': 14,
+        }
+        form = ReservationForm(data=form_data,
+                               instance=self.existing_reservation)
+        self.assertTrue(form.is_valid(),
+                        msg="Form counts the edited reservation twice")
+
     def test_form_invalid_missing_time(self):
         """
         The form should be invalid if the time is missing.
@@ -105,3 +188,110 @@ class TestReservationForm(TestCase):
         form = ReservationForm(data=form_data)
         self.assertFalse(form.is_valid(),
                          msg="Form is valid even though guests exceed 14")
+
+
+class TestReservationFormTables(TestCase):
+    """
+    Tests for the table check in ReservationForm.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(username="testuser")
+        self.day = date.today() + timedelta(days=1)
+        Table.objects.create(name="T1", seats=4)
+        Table.objects.create(name="T2", seats=4)
+
+    def form(self, guests, instance=None, start='19:00:00'):
+        return ReservationForm(data={
+            'date': self.day,
+            'time': start,
+            'guests': guests,
+        }, instance=instance)
+
+    def test_two_small_parties_cannot_share_a_table(self):
+        """Seats are left in the room, but not a free table"""
+        for _ in range(2):
+            Reservation.objects.create(user=self.user, date=self.day,
+                                       time=time(19, 0), guests=3)
+        form = self.form(2)
+        self.assertFalse(form.is_valid())
+        self.assertIn(NO_TABLE_MESSAGE, form.non_field_errors())
+
+    def test_suggestions_need_a_free_table(self):
+        for _ in range(2):
+            Reservation.objects.create(user=self.user, date=self.day,
+                                       time=time(19, 0), guests=3)
+        form = self.form(2)
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.suggestions[:2], [
+            (self.day, time(18, 0)), (self.day, time(20, 0))])
+
+    def test_party_larger_than_any_table(self):
+        form = self.form(5)
+        self.assertFalse(form.is_valid())
+        self.assertIn(NO_TABLE_MESSAGE, form.non_field_errors())
+
+    def test_edit_does_not_take_its_own_table(self):
+        reservation = Reservation.objects.create(
+            user=self.user, date=self.day, time=time(19, 0), guests=3)
+        Reservation.objects.create(user=self.user, date=self.day,
+                                   time=time(19, 0), guests=3)
+        self.assertTrue(self.form(4, instance=reservation).is_valid())
+
+    def test_unseatable_imported_party_does_not_block_the_day(self):
+        """A party of 10 without tables leaves noon free for 2"""
+        # bulk_create skips the write hooks, like an import does
+        Reservation.objects.bulk_create([Reservation(
+            user=self.user, date=self.day, time=time(19, 0),
+            end_time=time(20, 0), guests=10)])
+        self.assertTrue(self.form(2, start='12:00:00').is_valid())
+
+
+class TestReservationFormHours(TestCase):
+    """
+    Tests for the opening hours check in ReservationForm.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.day = date.today() + timedelta(days=7)
+        # dinner only on the test day's weekday, closed the rest
+        OpeningHours.objects.create(weekday=self.day.weekday(),
+                                    first_seating=time(18, 0),
+                                    last_seating=time(21, 0))
+
+    def form(self, day, start):
+        return ReservationForm(data={'date': day, 'time': start,
+                                     'guests': 2})
+
+    def test_choices_follow_the_hours(self):
+        choices = [value for value, _ in
+                   ReservationForm().fields['time'].choices]
+        self.assertEqual(choices[1], time(18, 0))
+        self.assertEqual(choices[-1], time(21, 0))
+
+    def test_closed_time_is_rejected_before_any_capacity_query(self):
+        form = self.form(self.day + timedelta(days=1), '18:00:00')
+        with self.assertNumQueries(0):
+            self.assertFalse(form.is_valid())
+        self.assertIn(CLOSED_MESSAGE, form.non_field_errors())
+        self.assertFalse(form.suggestions)
+
+    def test_open_time_is_accepted(self):
+        self.assertTrue(self.form(self.day, '19:00:00').is_valid())
+
+    def test_special_date_closes_the_day(self):
+        SpecialDate.objects.create(date=self.day, closed=True,
+                                   note="Private party")
+        form = self.form(self.day, '19:00:00')
+        self.assertFalse(form.is_valid())
+        self.assertIn(CLOSED_MESSAGE, form.non_field_errors())
+
+    def test_waitlist_checks_the_hours(self):
+        form = WaitlistForm(data={'date': self.day + timedelta(days=1),
+                                  'slot': '19:00:00', 'guests': 2})
+        self.assertFalse(form.is_valid())
+        self.assertIn(CLOSED_MESSAGE, form.non_field_errors())
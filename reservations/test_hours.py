@@ -0,0 +1,54 @@
+from django.test import SimpleTestCase
+from datetime import date, time, timedelta
+from .hours import build_grid
+
+MONDAY = date(2026, 1, 5)
+
+
+class TestSlotGrid(SimpleTestCase):
+
+    def test_default_hours_until_any_are_entered(self):
+        grid = build_grid([], [])
+        slots = grid.slots_for(MONDAY)
+        self.assertEqual((slots[0], slots[-1], len(slots)),
+                         (time(11, 0), time(22, 30), 24))
+        self.assertEqual(grid.weekdays, (slots,) * 7)
+
+    def test_sittings_and_closed_weekdays(self):
+        grid = build_grid([
+            (1, time(12, 0), time(13, 30)),  # Tuesday lunch
+            (1, time(18, 0), time(19, 0)),  # and dinner
+            (2, time(18, 0), time(18, 30)),
+        ], [])
+        self.assertEqual(grid.slots_for(MONDAY), ())
+        self.assertEqual(grid.slots_for(MONDAY + timedelta(days=1)), (
+            time(12, 0), time(12, 30), time(13, 0), time(13, 30),
+            time(18, 0), time(18, 30), time(19, 0)))
+        self.assertEqual(grid.slots_for(MONDAY + timedelta(days=2)),
+                         (time(18, 0), time(18, 30)))
+
+    def test_special_dates_override_their_weekday(self):
+        christmas, eve = date(2026, 12, 25), date(2026, 12, 24)
+        grid = build_grid([], [
+            (christmas, True, None, None),
+            (eve, False, time(12, 0), time(14, 0)),
+        ])
+        self.assertEqual(grid.slots_for(christmas), ())
+        self.assertEqual(grid.slots_for(eve)[-1], time(14, 0))
+        self.assertEqual(len(grid.slots_for(date(2026, 12, 23))), 24)
+        days = grid.days(eve, christmas)
+        self.assertEqual(list(days), [eve, christmas])
+        self.assertEqual(days[christmas], ())
+
+    def test_days_up_to_the_last_representable_date(self):
+        grid = build_grid([], [])
+        days = grid.days(date.max - timedelta(days=1), date.max)
+        self.assertEqual(list(days), [date.max - timedelta(days=1),
+                                      date.max])
+
+    def test_all_slots_is_the_union_of_every_day(self):
+        grid = build_grid(
+            [(0, time(18, 0), time(18, 30))],
+            [(MONDAY, False, time(9, 0), time(9, 0))])
+        self.assertEqual(grid.all_slots(),
+                         [time(9, 0), time(18, 0), time(18, 30)])
@@ -1,7 +1,18 @@
-from django.test import TestCase
+from unittest import mock
+from django.test import TestCase, override_settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from datetime import date, time, timedelta, datetime
-from .models import Reservation, STATUS_CHOICES
+from dons_table.caching import LOCAL_CACHE_SECONDS
+from .models import (ArchivedReservation, DailyOccupancy, OpeningHours,
+                     Reservation, SLOT_GRID_CACHE_SECONDS,
+                     SlotFullError, SlotLedger, SpecialDate, STATUS_CHOICES,
+                     Table, TABLE_OPTIONS_CACHE_SECONDS, TableAssignment,
+                     WaitlistEntry)
 
 
 class TestReservationModel(TestCase):
@@ -50,3 +61,433 @@ class TestReservationModel(TestCase):
         self.reservation.guests = 15
         with self.assertRaises(Exception):
             self.reservation.full_clean()
+
+
+class TestSlotLedger(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser",
+                                             password="testpass")
+        self.day = date.today() + timedelta(days=1)
+        self.reservation = Reservation.objects.create(
+            user=self.user,
+            date=self.day,
+            time=time(19, 0),
+            guests=4
+        )
+
+    def test_create_books_slot(self):
+        """Creating a reservation adds its guests to the slot"""
+        self.assertEqual(SlotLedger.booked(self.day, time(19, 0)), 4)
+
+    def test_edit_moves_guests_between_slots(self):
+        """Changing time and guests releases the old slot"""
+        self.reservation.time = time(20, 0)
+        self.reservation.guests = 6
+        self.reservation.save()
+        self.assertEqual(SlotLedger.booked(self.day, time(19, 0)), 0)
+        self.assertEqual(SlotLedger.booked(self.day, time(20, 0)), 6)
+
+    def test_cancelled_status_releases_slot(self):
+        """Cancelled reservations do not count, reinstating books again"""
+        self.reservation.status = "cancelled"
+        self.reservation.save()
+        self.assertEqual(SlotLedger.booked(self.day, time(19, 0)), 0)
+        self.reservation.status = "confirmed"
+        self.reservation.save()
+        self.assertEqual(SlotLedger.booked(self.day, time(19, 0)), 4)
+
+    def test_delete_releases_slot(self):
+        """Deleting a reservation, directly or by cascade, frees the slot"""
+        Reservation.objects.create(user=self.user, date=self.day,
+                                   time=time(19, 0), guests=2)
+        self.reservation.delete()
+        self.assertEqual(SlotLedger.booked(self.day, time(19, 0)), 2)
+        self.user.delete()
+        self.assertEqual(SlotLedger.booked(self.day, time(19, 0)), 0)
+
+    def test_set_status_batches_ledger_updates(self):
+        """Bulk cancel and reinstate adjust every slot in one UPDATE"""
+        others = [Reservation.objects.create(
+            user=self.user, date=self.day, time=time(19, 30), guests=3)
+            for _ in range(3)]
+        ids = [self.reservation.pk] + [r.pk for r in others]
+        with self.assertNumQueries(11):
+            # savepoint, lock rows, day lock, ledger UPDATE, table DELETE,
+            # status UPDATE, one waitlist read per start slot whose
+            # stay overlaps the freed seats (18:30 to 20:00), release
+            self.assertEqual(Reservation.set_status(ids, "cancelled"), 4)
+        self.assertEqual(SlotLedger.booked(self.day, time(19, 0)), 0)
+        self.assertEqual(SlotLedger.booked(self.day, time(19, 30)), 0)
+
+        Reservation.set_status(ids, "pending")
+        self.assertEqual(SlotLedger.booked(self.day, time(19, 0)), 4)
+        self.assertEqual(SlotLedger.booked(self.day, time(19, 30)), 13)
+        self.assertEqual(SlotLedger.booked(self.day, time(20, 0)), 9)
+
+    def test_set_status_locks_rows_in_id_order(self):
+        with CaptureQueriesContext(connection) as queries:
+            Reservation.set_status([self.reservation.pk], "cancelled")
+        lock = next(q['sql'] for q in queries.captured_queries
+                    if q['sql'].startswith('SELECT'))
+        self.assertTrue(lock.endswith('ORDER BY "reservations_reservation".'
+                                      '"id" ASC'), lock)
+
+    def test_set_status_between_active_statuses_skips_ledger(self):
+        """Confirming pending reservations leaves the ledger alone"""
+        with self.assertNumQueries(4):
+            Reservation.set_status([self.reservation.pk], "confirmed")
+        self.assertEqual(SlotLedger.booked(self.day, time(19, 0)), 4)
+
+    def test_set_status_full_reinstatement_changes_nothing(self):
+        """Reinstating more guests than fit fails as a whole"""
+        Reservation.set_status([self.reservation.pk], "cancelled")
+        SlotLedger.objects.filter(date=self.day, slot=time(19, 0)).update(
+            booked_guests=48)
+        with self.assertRaises(SlotFullError):
+            Reservation.set_status([self.reservation.pk], "confirmed")
+        self.reservation.refresh_from_db()
+        self.assertEqual(self.reservation.status, "cancelled")
+        self.assertEqual(SlotLedger.booked(self.day, time(19, 0)), 48)
+        self.assertEqual(SlotLedger.booked(self.day, time(19, 30)), 0)
+
+
+class TestDailyOccupancy(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser",
+                                             password="testpass")
+        self.day = date.today() + timedelta(days=1)
+
+    def summary(self, slot, day=None):
+        return DailyOccupancy.objects.filter(
+            date=day or self.day, slot=slot).values_list(
+                "covers", "pending", "confirmed", "cancelled").first()
+
+    def test_writes_refresh_the_day_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = Reservation.objects.create(
+                user=self.user, date=self.day, time=time(19, 0), guests=4)
+            Reservation.objects.create(
+                user=self.user, date=self.day, time=time(19, 30), guests=2,
+                status="confirmed")
+        self.assertEqual(self.summary(time(19, 0)), (4, 1, 0, 0))
+        self.assertEqual(self.summary(time(19, 30)), (6, 0, 1, 0))
+        self.assertEqual(self.summary(time(20, 0)), (2, 0, 0, 0))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Reservation.set_status([first.pk], "cancelled")
+        self.assertEqual(self.summary(time(19, 0)), (0, 0, 0, 1))
+
+        # moving a reservation refreshes the day it left as well
+        other_day = self.day + timedelta(days=1)
+        first.refresh_from_db()
+        with self.captureOnCommitCallbacks(execute=True):
+            first.date = other_day
+            first.save()
+        self.assertIsNone(self.summary(time(19, 0)))
+        self.assertEqual(self.summary(time(19, 0), other_day), (0, 0, 0, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertFalse(
+            DailyOccupancy.objects.filter(date=other_day).exists())
+
+    def test_refresh_counts_archived_reservations(self):
+        ArchivedReservation.objects.create(
+            id=500, user=self.user, date=self.day, time=time(12, 0),
+            end_time=time(13, 0), guests=3, created_on=timezone.now(),
+            status="confirmed")
+        DailyOccupancy.refresh_days([self.day])
+        self.assertEqual(self.summary(time(12, 30)), (3, 0, 0, 0))
+        self.assertEqual(self.summary(time(12, 0)), (3, 0, 1, 0))
+
+
+class TestTableAssignment(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(username="diner")
+        self.day = date.today() + timedelta(days=1)
+        self.two = Table.objects.create(name="T1", seats=2)
+        self.four_a = Table.objects.create(name="T2", seats=4,
+                                           combine_group="window")
+        self.four_b = Table.objects.create(name="T3", seats=4,
+                                           combine_group="window")
+        self.six = Table.objects.create(name="T4", seats=6)
+
+    def book(self, start, guests, **kwargs):
+        return Reservation.objects.create(user=self.user, date=self.day,
+                                          time=start, guests=guests,
+                                          **kwargs)
+
+    def tables(self, reservation):
+        return sorted(reservation.table_assignments
+                      .values_list('table__name', flat=True))
+
+    def test_party_gets_the_snuggest_table(self):
+        self.assertEqual(self.tables(self.book(time(19, 0), 2)), ["T1"])
+        self.assertEqual(self.tables(self.book(time(19, 0), 3)), ["T2"])
+        self.assertEqual(self.tables(self.book(time(19, 0), 5)), ["T4"])
+
+    def test_large_party_sits_at_combined_tables(self):
+        self.assertEqual(self.tables(self.book(time(19, 0), 7)),
+                         ["T2", "T3"])
+
+    def test_replan_moves_other_parties(self):
+        """A party of 4 on a window table moves so 8 can sit together"""
+        four = self.book(time(18, 30), 4)
+        self.assertEqual(self.tables(four), ["T2"])
+        big = self.book(time(19, 0), 8)
+        self.assertEqual(self.tables(big), ["T2", "T3"])
+        self.assertEqual(self.tables(four), ["T4"])
+
+    def test_no_free_table_writes_nothing(self):
+        self.book(time(19, 0), 7)
+        self.book(time(19, 0), 6)
+        with self.assertRaises(SlotFullError):
+            self.book(time(19, 30), 3)
+        self.assertEqual(Reservation.objects.count(), 2)
+        self.assertEqual(SlotLedger.booked(self.day, time(19, 30)), 13)
+        self.assertEqual(self.tables(self.book(time(19, 30), 2)), ["T1"])
+
+    def test_cancel_and_reinstate(self):
+        reservation = self.book(time(19, 0), 4)
+        Reservation.set_status([reservation.pk], "cancelled")
+        self.assertEqual(self.tables(reservation), [])
+        Reservation.set_status([reservation.pk], "confirmed")
+        self.assertEqual(self.tables(reservation), ["T2"])
+        reservation.refresh_from_db()
+        reservation.status = "cancelled"
+        reservation.save()
+        self.assertEqual(self.tables(reservation), [])
+
+    def test_unseated_reservations_are_seated_by_the_next_booking(self):
+        """Bookings made before tables existed are seated on the next one"""
+        Table.objects.update(is_active=False)
+        cache.clear()
+        old = self.book(time(19, 0), 4)
+        self.assertEqual(self.tables(old), [])
+        Table.objects.update(is_active=True)
+        cache.clear()
+        new = self.book(time(19, 0), 4)
+        self.assertEqual(self.tables(new), ["T2"])
+        self.assertEqual(self.tables(old), ["T3"])
+
+    def test_unseatable_reservation_does_not_block_bookings(self):
+        """A party too big for any table is left unseated, not a veto"""
+        Reservation.objects.bulk_create([Reservation(
+            user=self.user, date=self.day, time=time(19, 0),
+            end_time=time(20, 0), guests=20)])
+        self.assertEqual(self.tables(self.book(time(19, 0), 2)), ["T1"])
+        self.assertEqual(TableAssignment.objects.count(), 1)
+
+    def test_table_changes_clear_the_cached_layout(self):
+        self.book(time(19, 0), 7)
+        self.book(time(19, 0), 6)
+        Table.objects.create(name="T5", seats=4)
+        self.assertEqual(self.tables(self.book(time(19, 0), 3)), ["T5"])
+
+    def test_layout_is_kept_briefly_without_a_shared_cache(self):
+        for shared, seconds in [(False, LOCAL_CACHE_SECONDS),
+                                (True, TABLE_OPTIONS_CACHE_SECONDS)]:
+            with override_settings(CACHE_SHARED=shared), \
+                    mock.patch.object(cache, "get_or_set") as get_or_set:
+                Table.seating_options()
+            self.assertEqual(get_or_set.call_args.args[2], seconds)
+
+    def test_booking_without_tables_skips_assignment(self):
+        Table.objects.all().delete()
+        reservation = self.book(time(19, 0), 12)
+        self.assertFalse(TableAssignment.objects.exists())
+        self.assertEqual(SlotLedger.booked(self.day, time(19, 0)), 12)
+        self.assertEqual(reservation.status, "pending")
+
+
+class TestWaitlist(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="diner")
+        self.day = date.today() + timedelta(days=1)
+        # 19:00 is full: 44 + 6 guests
+        Reservation.objects.create(user=self.user, date=self.day,
+                                   time=time(19, 0), guests=14)
+        for _ in range(3):
+            Reservation.objects.create(user=self.user, date=self.day,
+                                       time=time(19, 0), guests=10)
+        self.cancelled = Reservation.objects.create(
+            user=self.user, date=self.day, time=time(19, 0), guests=6)
+
+    def wait(self, guests, slot=time(19, 0), username=None):
+        user = (User.objects.create_user(username=username)
+                if username else self.user)
+        return WaitlistEntry.objects.create(user=user, date=self.day,
+                                            slot=slot, guests=guests)
+
+    def test_delete_promotes_the_best_fitting_party(self):
+        """The freed 6 seats go to the party of 6, not the older pair"""
+        self.wait(2, username="pair")
+        six = self.wait(6, slot=time(18, 30), username="six")
+        self.cancelled.delete()
+        promoted = Reservation.objects.get(user=six.user)
+        self.assertEqual((promoted.time, promoted.guests, promoted.status),
+                         (time(18, 30), 6, "pending"))
+        self.assertFalse(WaitlistEntry.objects.filter(pk=six.pk).exists())
+        self.assertTrue(WaitlistEntry.objects.filter(guests=2).exists())
+        self.assertEqual(SlotLedger.booked(self.day, time(19, 0)), 50)
+
+    def test_oldest_party_wins_between_equals(self):
+        first = self.wait(3, username="first")
+        self.wait(4, slot=time(20, 30), username="later")  # no overlap
+        second = self.wait(3, slot=time(19, 30), username="second")
+        Reservation.set_status([self.cancelled.pk], "cancelled")
+        self.assertTrue(Reservation.objects.filter(user=first.user).exists())
+        self.assertTrue(
+            Reservation.objects.filter(user=second.user).exists())
+        self.assertEqual(WaitlistEntry.objects.count(), 1)
+
+    def test_status_change_to_cancelled_promotes(self):
+        entry = self.wait(5, username="five")
+        self.cancelled.status = "cancelled"
+        self.cancelled.save()
+        self.assertTrue(Reservation.objects.filter(user=entry.user).exists())
+
+    def test_parties_that_do_not_fit_stay_waiting(self):
+        self.wait(8, username="eight")
+        self.cancelled.delete()
+        self.assertEqual(WaitlistEntry.objects.count(), 1)
+        self.assertEqual(SlotLedger.booked(self.day, time(19, 0)), 44)
+
+    def test_work_does_not_grow_with_the_waitlist(self):
+        for _ in range(3):
+            Reservation.objects.create(user=self.user, date=self.day,
+                                       time=time(12, 0), guests=14)
+        users = User.objects.bulk_create(
+            User(username=f"waiting{i}") for i in range(300))
+
+        def cancel_with_waiting(count):
+            reservation = Reservation.objects.create(
+                user=self.user, date=self.day, time=time(12, 0), guests=2)
+            WaitlistEntry.objects.bulk_create(
+                WaitlistEntry(user=user, date=self.day, slot=time(12, 0),
+                              guests=9)
+                for user in users[:count])
+            with CaptureQueriesContext(connection) as queries:
+                reservation.delete()
+            WaitlistEntry.objects.all().delete()
+            return len(queries)
+
+        self.assertEqual(cancel_with_waiting(5), cancel_with_waiting(300))
+
+    def test_user_cascade_does_not_promote(self):
+        other = self.wait(6, username="other")
+        self.user.delete()
+        self.assertFalse(Reservation.objects.exists())
+        self.assertTrue(WaitlistEntry.objects.filter(pk=other.pk).exists())
+
+
+class TestOpeningHours(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.day = date.today() + timedelta(days=7)
+
+    def test_slot_grid_is_cached(self):
+        OpeningHours.slot_grid()
+        with self.assertNumQueries(0):
+            self.assertEqual(len(OpeningHours.slot_grid()
+                                 .slots_for(self.day)), 24)
+
+    def test_grid_is_kept_briefly_without_a_shared_cache(self):
+        # Other workers' edits cannot clear a process-local cache
+        for shared, seconds in [(False, LOCAL_CACHE_SECONDS),
+                                (True, SLOT_GRID_CACHE_SECONDS)]:
+            with override_settings(CACHE_SHARED=shared), \
+                    mock.patch.object(cache, "get_or_set") as get_or_set:
+                OpeningHours.slot_grid()
+            self.assertEqual(get_or_set.call_args.args[2], seconds)
+
+    def test_changing_the_hours_clears_the_grid(self):
+        OpeningHours.slot_grid()
+        hours = OpeningHours.objects.create(
+            weekday=self.day.weekday(), first_seating=time(18, 0),
+            last_seating=time(21, 0))
+        self.assertEqual(OpeningHours.slot_grid().slots_for(self.day)[0],
+                         time(18, 0))
+        special = SpecialDate.objects.create(date=self.day, closed=True)
+        self.assertEqual(OpeningHours.slot_grid().slots_for(self.day), ())
+        special.delete()
+        hours.delete()
+        self.assertEqual(len(OpeningHours.slot_grid()
+                             .slots_for(self.day)), 24)
+
+    def test_open_special_date_needs_seatings(self):
+        with self.assertRaises(ValidationError):
+            SpecialDate(date=self.day).clean()
+        with self.assertRaises(ValidationError):
+            OpeningHours(weekday=0, first_seating=time(20, 0),
+                         last_seating=time(19, 0)).clean()
+
+
+class TestReservationIndexes(TestCase):
+    """
+    Check that the hot reservation queries are planned against the
+    composite and partial indexes on a seeded table.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        users = User.objects.bulk_create(
+            User(username=f"user{i}") for i in range(50))
+        start = date.today()
+        statuses = [choice for choice, label in STATUS_CHOICES]
+        Reservation.objects.bulk_create(
+            Reservation(
+                user=users[i % len(users)],
+                date=start + timedelta(days=i % 120),
+                time=time(11 + i % 12, 30 * (i % 2)),
+                end_time=time(12 + i % 12, 30 * (i % 2)),
+                guests=1 + i % 6,
+                status=statuses[i % len(statuses)],
+            )
+            for i in range(5000)
+        )
+        cls.user = users[0]
+        cls.day = start + timedelta(days=7)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def assertUsesIndex(self, queryset, *index_names):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute("SET enable_seqscan = off")
+        plan = queryset.explain()
+        self.assertTrue(
+            any(name in plan for name in index_names),
+            msg=f"Expected one of {index_names} in plan:\n{plan}")
+
+    def test_slot_lookup_uses_date_time_index(self):
+        self.assertUsesIndex(
+            Reservation.objects.filter(date=self.day, time=time(19, 0)),
+            'res_date_time_idx', 'res_active_date_time_idx')
+
+    def test_active_slot_lookup_uses_partial_index(self):
+        self.assertUsesIndex(
+            Reservation.objects.filter(date=self.day, time=time(19, 0))
+            .exclude(status='cancelled'),
+            'res_active_date_time_idx')
+
+    def test_user_dashboard_uses_user_date_index(self):
+        self.assertUsesIndex(
+            Reservation.objects.filter(user=self.user,
+                                       date__gte=self.day),
+            'res_user_date_idx')
+
+    def test_status_listing_uses_status_index(self):
+        self.assertUsesIndex(
+            Reservation.objects.filter(status='pending',
+                                       date__gte=self.day)
+            .order_by('date', 'time'),
+            'res_status_date_time_idx')
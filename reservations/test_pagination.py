@@ -0,0 +1,102 @@
+import base64
+import json
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+from datetime import date, time, timedelta
+from .models import ArchivedReservation, Reservation
+from .pagination import KeysetPaginator
+
+
+class TestKeysetPaginator(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username="testuser",
+                                        password="testpass")
+        start = date.today() + timedelta(days=1)
+        # Several rows share a date and time so the id tie-breaker matters
+        Reservation.objects.bulk_create(
+            Reservation(user=user, date=start + timedelta(days=i // 6),
+                        time=time(12 + i % 3, 0), end_time=time(13, 0),
+                        guests=2)
+            for i in range(47))
+        cls.ordered = list(Reservation.objects.order_by('date', 'time', 'id'))
+
+    def walk_forward(self, per_page):
+        paginator = KeysetPaginator(Reservation.objects.all(), per_page)
+        pages, cursor = [], None
+        while True:
+            page = paginator.get_page(cursor)
+            pages.append(page)
+            if not page.has_next():
+                return pages
+            cursor = page.next_cursor
+
+    def test_pages_cover_every_row_once_in_order(self):
+        pages = self.walk_forward(10)
+        self.assertEqual([len(page) for page in pages], [10, 10, 10, 10, 7])
+        rows = [row for page in pages for row in page]
+        self.assertEqual(rows, self.ordered)
+        self.assertFalse(pages[0].has_previous())
+        self.assertTrue(pages[-1].has_previous())
+
+    def test_previous_cursor_returns_preceding_page(self):
+        pages = self.walk_forward(10)
+        paginator = KeysetPaginator(Reservation.objects.all(), 10)
+        back = paginator.get_page(pages[3].previous_cursor)
+        self.assertEqual(list(back), list(pages[2]))
+        self.assertTrue(back.has_next())
+        first = paginator.get_page(pages[1].previous_cursor)
+        self.assertEqual(list(first), list(pages[0]))
+        self.assertFalse(first.has_previous())
+
+    def test_deep_page_costs_one_query(self):
+        pages = self.walk_forward(5)
+        paginator = KeysetPaginator(Reservation.objects.all(), 5)
+        with self.assertNumQueries(1):
+            list(paginator.get_page(pages[-2].next_cursor))
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        paginator = KeysetPaginator(Reservation.objects.all(), 10)
+        page = paginator.get_page("not-a-cursor")
+        self.assertEqual(list(page), self.ordered[:10])
+
+    def test_tampered_cursor_values_fall_back_to_first_page(self):
+        cursor = base64.urlsafe_b64encode(json.dumps(
+            ["next", "2025-13-45", "25:00:00", 1]).encode()).decode()
+        paginator = KeysetPaginator(Reservation.objects.all(), 10)
+        self.assertEqual(list(paginator.get_page(cursor)),
+                         self.ordered[:10])
+        self.client.force_login(User.objects.get(username="testuser"))
+        response = self.client.get(reverse("reservation_dashboard"),
+                                   {"cursor": cursor})
+        self.assertEqual(response.status_code, 200)
+
+    def test_union_pages_through_archive_and_live_rows(self):
+        """Archived rows interleave with live ones in one ordering"""
+        archived = ArchivedReservation.objects.bulk_create(
+            ArchivedReservation(
+                id=1000 + i, user=self.ordered[0].user,
+                date=self.ordered[i * 9].date, time=time(12, 30),
+                end_time=time(13, 30), guests=2,
+                created_on=timezone.now(), status="pending")
+            for i in range(5))
+        expected = sorted(self.ordered + archived,
+                          key=lambda r: (r.date, r.time, r.id))
+        paginator = KeysetPaginator(Reservation.objects.all(), 10,
+                                    union=[ArchivedReservation.objects.all()])
+        rows, cursor = [], None
+        while True:
+            with self.assertNumQueries(2):
+                page = paginator.get_page(cursor)
+            rows.extend(page)
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        self.assertEqual([(type(r), r.pk) for r in rows],
+                         [(type(r), r.pk) for r in expected])
+        back = paginator.get_page(page.previous_cursor)
+        self.assertEqual([r.pk for r in back],
+                         [r.pk for r in expected[-12:-2]])
@@ -0,0 +1,66 @@
+from django.test import SimpleTestCase
+from datetime import time
+from .tables import assign_day, find_seating, seating_options, slot_mask
+
+
+class TestTableEngine(SimpleTestCase):
+
+    def setUp(self):
+        # id, seats, combine group
+        self.options = seating_options([
+            (1, 2, ''), (2, 4, 'window'), (3, 4, 'window'), (4, 6, ''),
+        ])
+
+    def test_slot_mask_covers_the_interval(self):
+        self.assertEqual(slot_mask(time(0, 0), time(1, 0)), 0b11)
+        self.assertEqual(slot_mask(time(19, 0), time(20, 0)),
+                         0b11 << 38)
+
+    def test_options_combine_tables_in_the_same_group(self):
+        self.assertEqual(self.options, [
+            (2, (1,)), (4, (2,)), (4, (3,)), (6, (4,)), (8, (2, 3)),
+        ])
+
+    def test_snuggest_free_table_is_chosen(self):
+        mask = slot_mask(time(19, 0), time(20, 0))
+        self.assertEqual(find_seating(self.options, {}, mask, 2), (1,))
+        self.assertEqual(find_seating(self.options, {}, mask, 3), (2,))
+        self.assertEqual(find_seating(self.options, {}, mask, 7), (2, 3))
+        self.assertIsNone(find_seating(self.options, {}, mask, 9))
+
+    def test_busy_tables_are_skipped(self):
+        mask = slot_mask(time(19, 0), time(20, 0))
+        busy = {2: mask, 4: slot_mask(time(19, 30), time(20, 30))}
+        self.assertEqual(find_seating(self.options, busy, mask, 3), (3,))
+        self.assertIsNone(find_seating(self.options, busy, mask, 5))
+        later = slot_mask(time(20, 0), time(21, 0))
+        self.assertEqual(find_seating(self.options, busy, later, 3), (2,))
+
+    def test_parties_cannot_share_a_table(self):
+        """Two parties of three need two tables, not one 6-top's seats"""
+        mask = slot_mask(time(19, 0), time(20, 0))
+        seating, unseated = assign_day(
+            seating_options([(1, 6, '')]), [('a', mask, 3), ('b', mask, 3)])
+        self.assertEqual(len(seating), 1)
+        self.assertEqual(len(unseated), 1)
+
+    def test_assign_day_repacks_around_large_parties(self):
+        """Seating large parties first fits a day the start order misses"""
+        early = slot_mask(time(18, 0), time(19, 0))
+        late = slot_mask(time(18, 30), time(19, 30))
+        seating, unseated = assign_day(self.options, [
+            ('a', early, 2), ('b', early, 4), ('big', late, 8),
+        ])
+        self.assertEqual(unseated, [])
+        self.assertEqual(seating['big'], (2, 3))
+        self.assertEqual(seating['b'], (4,))
+
+    def test_assign_day_works_around_taken_tables(self):
+        mask = slot_mask(time(19, 0), time(20, 0))
+        busy = {2: mask}
+        seating, unseated = assign_day(self.options,
+                                       [('a', mask, 3), ('b', mask, 4)],
+                                       busy)
+        self.assertEqual(seating, {'a': (4,), 'b': (3,)})
+        self.assertEqual(unseated, [])
+        self.assertEqual(busy, {2: mask})
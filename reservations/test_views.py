@@ -1,9 +1,22 @@
-from django.test import TestCase, Client
-from django.urls import reverse
-from django.contrib.auth.models import User
+import json
+import warnings
+from asgiref.sync import sync_to_async
+from django.test import AsyncRequestFactory, TestCase, Client
+from django.urls import resolve, reverse
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.db import connection
+from django.contrib.messages import get_messages
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from datetime import date, time, timedelta
-from .models import Reservation
-from .forms import ReservationForm
+from .models import (ArchivedReservation, DailyOccupancy, OpeningHours,
+                     Reservation, ReservationSubmission, SpecialDate,
+                     WaitlistEntry)
+from .forms import ReservationForm, generate_time_choices
+from .views import (STAFF_PAGE_SIZE, aavailability, areservation_dashboard,
+                    availability, reservation_dashboard)
+from menu.views import amy_menu, my_menu
 
 
 class TestReservationViews(TestCase):
@@ -58,6 +71,52 @@ class TestReservationViews(TestCase):
         self.assertRedirects(response, reverse("reservation_dashboard"))
         self.assertEqual(Reservation.objects.filter(user=self.user).count(), 2)
 
+    def test_make_reservation_repeated_submission_books_once(self):
+        self.client.login(username="regular_user", password="password123")
+        response = self.client.get(reverse("make_reservation"))
+        token = str(response.context["submission_token"])
+        self.assertContains(response, f'value="{token}"')
+        data = {
+            "date": date.today() + timedelta(days=2),
+            "time": time(19, 0),
+            "guests": 3,
+            "submission_token": token,
+        }
+        self.client.post(reverse("make_reservation"), data)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse("make_reservation"),
+                                        dict(data, guests=5))
+        self.assertRedirects(response, reverse("reservation_dashboard"),
+                             fetch_redirect_response=False)
+        writes = [query["sql"] for query in queries.captured_queries
+                  if query["sql"].startswith(("INSERT", "UPDATE"))]
+        self.assertEqual(len(writes), 1)  # the refused token claim
+        self.assertIn("reservations_reservationsubmission", writes[0])
+        booked = Reservation.objects.get(user=self.user, guests=3)
+        self.assertFalse(Reservation.objects.filter(guests=5).exists())
+        self.assertIn("has already been submitted",
+                      str(list(get_messages(response.wsgi_request))[-1]))
+        self.assertEqual(ReservationSubmission.objects.get().reservation,
+                         booked)
+
+    def test_make_reservation_invalid_submission_releases_token(self):
+        self.client.login(username="regular_user", password="password123")
+        token = "0b9c6c7e-1f0a-4b7e-9a55-3d2f7d0c1a11"
+        data = {
+            "date": date.today() - timedelta(days=1),
+            "time": time(19, 0),
+            "guests": 3,
+            "submission_token": token,
+        }
+        response = self.client.post(reverse("make_reservation"), data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(str(response.context["submission_token"]), token)
+        self.assertFalse(ReservationSubmission.objects.exists())
+        data["date"] = date.today() + timedelta(days=2)
+        response = self.client.post(reverse("make_reservation"), data)
+        self.assertRedirects(response, reverse("reservation_dashboard"))
+        self.assertEqual(Reservation.objects.filter(user=self.user).count(), 2)
+
     # Tests for edit_reservation
     def test_edit_reservation_get_request(self):
         self.client.login(username="regular_user", password="password123")
@@ -91,6 +150,56 @@ class TestReservationViews(TestCase):
             Reservation.objects.filter(id=self.reservation.id).exists()
             )
 
+    # Tests for the waitlist
+    def test_full_slot_offers_the_waitlist(self):
+        for _ in range(3):
+            Reservation.objects.create(user=self.superuser,
+                                       date=self.reservation.date,
+                                       time=time(18, 0), guests=14)
+        self.client.login(username="regular_user", password="password123")
+        response = self.client.post(reverse("make_reservation"), {
+            "date": self.reservation.date, "time": "18:00:00",
+            "guests": 6, "special_requests": "Window"})
+        self.assertTrue(response.context["offer_waitlist"])
+        # nearest slots that fit, each a one-click booking
+        self.assertContains(response, 'name="time" value="17:00:00"')
+        self.assertContains(response, 'name="time" value="19:00:00"')
+        self.assertContains(response, reverse("join_waitlist"))
+
+        response = self.client.post(reverse("join_waitlist"), {
+            "date": self.reservation.date, "slot": "18:00:00",
+            "guests": 6, "special_requests": "Window"}, follow=True)
+        self.assertRedirects(response, reverse("reservation_dashboard"))
+        entry = WaitlistEntry.objects.get(user=self.user)
+        self.assertEqual((entry.slot, entry.guests), (time(18, 0), 6))
+        self.assertContains(response, "Waiting for a table")
+
+        self.client.post(reverse("leave_waitlist", args=[entry.id]))
+        self.assertFalse(WaitlistEntry.objects.exists())
+
+    def test_cancel_reservation_promotes_waitlist(self):
+        entry = WaitlistEntry.objects.create(
+            user=self.superuser, date=self.reservation.date,
+            slot=time(18, 30), guests=4)
+        for _ in range(3):
+            Reservation.objects.create(user=self.superuser,
+                                       date=self.reservation.date,
+                                       time=time(18, 0), guests=14)
+        self.client.login(username="regular_user", password="password123")
+        self.client.post(reverse("cancel_reservation",
+                                 args=[self.reservation.id]))
+        self.assertTrue(Reservation.objects.filter(
+            user=self.superuser, time=time(18, 30), guests=4).exists())
+        self.assertFalse(WaitlistEntry.objects.filter(pk=entry.pk).exists())
+
+    def test_join_waitlist_rejects_past_slots(self):
+        self.client.login(username="regular_user", password="password123")
+        response = self.client.post(reverse("join_waitlist"), {
+            "date": date.today() - timedelta(days=1), "slot": "18:00:00",
+            "guests": 2})
+        self.assertRedirects(response, reverse("make_reservation"))
+        self.assertFalse(WaitlistEntry.objects.exists())
+
     # Tests for superuser_reservations
     def test_superuser_reservations_accessible_for_superuser(self):
         self.client.login(username="admin_user", password="adminpass")
@@ -107,3 +216,292 @@ class TestReservationViews(TestCase):
         updated = Reservation.objects.get(id=self.reservation.id)
         self.assertEqual(updated.status, "confirmed")
         self.assertRedirects(response, reverse("superuser_reservations"))
+
+    def test_superuser_bulk_status_change(self):
+        others = Reservation.objects.bulk_create(
+            Reservation(user=self.user,
+                        date=date.today() + timedelta(days=2 + i),
+                        time=time(12, 0), end_time=time(13, 0), guests=2)
+            for i in range(5))
+        ids = [self.reservation.id] + [r.id for r in others]
+        self.client.login(username="admin_user", password="adminpass")
+        response = self.client.post(reverse("superuser_reservations"), {
+            "reservation_ids": ids, "status": "confirmed"}, follow=True)
+        self.assertContains(response, "6 reservations updated to confirmed.")
+        self.assertEqual(
+            Reservation.objects.filter(status="confirmed").count(), 6)
+        self.assertEqual(len(response.redirect_chain), 1)
+
+    def test_superuser_bulk_status_change_rejects_bad_input(self):
+        self.client.login(username="admin_user", password="adminpass")
+        for data in ({"reservation_ids": [self.reservation.id],
+                      "status": "lost"},
+                     {"reservation_ids": ["x"], "status": "confirmed"},
+                     {"status": "confirmed"}):
+            response = self.client.post(reverse("superuser_reservations"),
+                                        data)
+            self.assertRedirects(response, reverse("superuser_reservations"))
+        self.reservation.refresh_from_db()
+        self.assertEqual(self.reservation.status, "pending")
+
+    def test_export_streams_csv_with_filters(self):
+        Reservation.objects.create(
+            user=self.user, date=date.today() + timedelta(days=5),
+            time=time(12, 0), guests=2, status="confirmed")
+        url = reverse("export_reservations")
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.login(username="admin_user", password="adminpass")
+        response = self.client.get(url)
+        self.assertTrue(response.streaming)
+        self.assertIn("attachment", response["Content-Disposition"])
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(",")[:3], ["id", "user", "date"])
+        self.assertEqual(len(lines), 3)
+        self.assertIn("Test request", lines[1])
+
+        response = self.client.get(url, {"status": "confirmed",
+                                         "format": "jsonl"})
+        rows = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(json.loads(rows[0])["time"], "12:00:00")
+        response = self.client.get(url, {"to": date.today().isoformat()})
+        self.assertEqual(len(b"".join(response.streaming_content)
+                             .decode().splitlines()), 1)
+
+    def test_export_rejects_bad_parameters(self):
+        self.client.login(username="admin_user", password="adminpass")
+        url = reverse("export_reservations")
+        self.assertEqual(self.client.get(url, {"format": "xls"}).status_code,
+                         400)
+        self.assertEqual(self.client.get(url, {"status": "x"}).status_code,
+                         400)
+        for params in ({"from": "2025-13-01"}, {"to": "yesterday"}):
+            self.assertEqual(self.client.get(url, params).status_code, 400)
+
+    def test_superuser_reservations_can_include_archive(self):
+        ArchivedReservation.objects.create(
+            id=999, user=self.user, date=date.today() + timedelta(days=1),
+            time=time(17, 0), end_time=time(18, 0), guests=2,
+            special_requests="Archived request", created_on=timezone.now(),
+            status="pending")
+        self.client.login(username="admin_user", password="adminpass")
+        url = reverse("superuser_reservations")
+        self.assertNotContains(self.client.get(url), "Archived request")
+        response = self.client.get(url, {"archived": "1"})
+        self.assertContains(response, "Archived request")
+        self.assertEqual([r.pk for r in response.context["pending"]],
+                         [999, self.reservation.pk])
+        self.assertNotContains(
+            response, reverse("edit_reservation", args=[999]))
+
+    def test_occupancy_heatmap_reads_summary_table(self):
+        url = reverse("occupancy_heatmap")
+        self.assertEqual(self.client.get(url).status_code, 302)
+        DailyOccupancy.objects.create(date=date.today(), slot=time(19, 0),
+                                      covers=30, pending=2, confirmed=5)
+        self.client.login(username="admin_user", password="adminpass")
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        tables = " ".join(query["sql"] for query in queries)
+        self.assertNotIn("reservations_reservation", tables)
+        self.assertEqual(len(response.context["days"]), 365)
+        day, bookings, cells = response.context["days"][-1]
+        self.assertEqual((day, bookings), (date.today(), 7))
+        self.assertIn((3, 30), cells)
+        self.assertContains(response, '<td class="heat-3">30</td>')
+
+        response = self.client.get(url, {
+            "from": (date.today() - timedelta(days=6)).isoformat()})
+        self.assertEqual(len(response.context["days"]), 7)
+
+    def test_superuser_reservations_hides_past_by_default(self):
+        Reservation.objects.create(
+            user=self.user, date=date.today() - timedelta(days=3),
+            time=time(18, 0), guests=2, special_requests="Old booking")
+        self.client.login(username="admin_user", password="adminpass")
+        response = self.client.get(reverse("superuser_reservations"))
+        self.assertNotContains(response, "Old booking")
+        response = self.client.get(reverse("superuser_reservations"), {
+            "from": (date.today() - timedelta(days=7)).isoformat()})
+        self.assertContains(response, "Old booking")
+
+    def test_superuser_reservations_paginates_each_status(self):
+        Reservation.objects.bulk_create(
+            Reservation(user=self.user,
+                        date=date.today() + timedelta(days=2 + i),
+                        time=time(12, 0), end_time=time(13, 0), guests=2)
+            for i in range(STAFF_PAGE_SIZE + 5))
+        self.client.login(username="admin_user", password="adminpass")
+        response = self.client.get(reverse("superuser_reservations"))
+        self.assertEqual(len(response.context["pending"]), STAFF_PAGE_SIZE)
+        response = self.client.get(reverse("superuser_reservations"), {
+            "pending_cursor": response.context["pending"].next_cursor})
+        self.assertEqual(len(response.context["pending"]), 6)
+
+    def test_superuser_reservations_query_count_is_flat(self):
+        """
+        The number of queries must not grow with the number of rows
+        (no per-row user lookups).
+        """
+        self.client.login(username="admin_user", password="adminpass")
+        url = reverse("superuser_reservations")
+
+        def query_count():
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url)
+            return len(queries)
+
+        users = User.objects.bulk_create(
+            User(username=f"guest{i}") for i in range(20))
+        statuses = ["pending", "confirmed", "cancelled"]
+
+        def seed(count):
+            Reservation.objects.bulk_create(
+                Reservation(user=users[i % len(users)],
+                            date=date.today() + timedelta(days=1 + i % 30),
+                            time=time(12, 0), end_time=time(13, 0),
+                            guests=2, status=statuses[i % 3])
+                for i in range(count))
+
+        seed(3)
+        baseline = query_count()
+        seed(300)
+        self.assertEqual(query_count(), baseline)
+
+
+class TestAvailabilityView(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(
+            username="regular_user", password="password123")
+        self.day = date.today() + timedelta(days=1)
+        Reservation.objects.create(user=self.user, date=self.day,
+                                   time=time(19, 0), guests=30)
+
+    def test_returns_remaining_seats_for_every_slot(self):
+        response = self.client.get(reverse("availability"), {
+            "start": self.day.isoformat(),
+            "end": (self.day + timedelta(days=1)).isoformat(),
+            "guests": 2,
+        })
+        self.assertEqual(response.status_code, 200)
+        dates = response.json()["dates"]
+        self.assertEqual(len(dates), 2)
+        slots = dates[self.day.isoformat()]
+        self.assertEqual(len(slots), len(generate_time_choices()))
+        self.assertEqual(slots["18:00:00"], 50)
+        # 18:30 overlaps the 19:00 party for its second half hour
+        self.assertEqual(slots["18:30:00"], 20)
+        self.assertEqual(slots["19:00:00"], 20)
+        self.assertEqual(slots["20:00:00"], 50)
+
+    def test_range_is_one_query_and_cached(self):
+        params = {"start": self.day.isoformat(),
+                  "end": (self.day + timedelta(days=13)).isoformat()}
+        OpeningHours.slot_grid()  # cached until the hours change
+        with self.assertNumQueries(1):
+            self.client.get(reverse("availability"), params)
+        with self.assertNumQueries(0):
+            self.client.get(reverse("availability"), params)
+
+    def test_closed_slots_are_left_out(self):
+        OpeningHours.objects.create(weekday=self.day.weekday(),
+                                    first_seating=time(18, 0),
+                                    last_seating=time(20, 0))
+        SpecialDate.objects.create(date=self.day + timedelta(days=7),
+                                   closed=True)
+        response = self.client.get(reverse("availability"), {
+            "start": self.day.isoformat(),
+            "end": (self.day + timedelta(days=7)).isoformat(),
+        })
+        dates = response.json()["dates"]
+        self.assertEqual(list(dates[self.day.isoformat()]), [
+            "18:00:00", "18:30:00", "19:00:00", "19:30:00", "20:00:00"])
+        self.assertEqual(dates[(self.day + timedelta(days=1)).isoformat()],
+                         {})
+        self.assertEqual(dates[(self.day + timedelta(days=7)).isoformat()],
+                         {})
+
+    def test_invalid_parameters(self):
+        url = reverse("availability")
+        self.assertEqual(
+            self.client.get(url, {"start": "not-a-date"}).status_code, 400)
+        self.assertEqual(
+            self.client.get(url, {"guests": 20}).status_code, 400)
+        self.assertEqual(self.client.get(url, {
+            "start": self.day.isoformat(),
+            "end": (self.day + timedelta(days=60)).isoformat(),
+        }).status_code, 400)
+        for start in ("9999-12-31", "9999-12-20"):
+            response = self.client.get(url, {"start": start})
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(),
+                             {"error": "Dates are out of range."})
+
+
+class TestAsyncViewsUnderAsgi(TestCase):
+    """
+    Exercise the async views served under ASGI (settings.ASYNC_VIEWS)
+    on the event loop, where any ORM call made on it raises
+    SynchronousOnlyOperation.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="regular_user", password="password123")
+        Reservation.objects.create(
+            user=self.user, date=date.today() + timedelta(days=1),
+            time=time(18, 0), guests=4, special_requests="Async request")
+
+    def request(self, name, user=None, method="get", **headers):
+        request = getattr(AsyncRequestFactory(), method)(
+            reverse(name), headers=headers)
+        request.user = user or AnonymousUser()
+        return request
+
+    def test_sync_views_are_served_under_wsgi(self):
+        for name, view in [("reservation_dashboard", reservation_dashboard),
+                           ("availability", availability),
+                           ("menu", my_menu)]:
+            self.assertIs(resolve(reverse(name)).func, view)
+
+    async def test_dashboard(self):
+        response = await areservation_dashboard(
+            self.request("reservation_dashboard"))
+        self.assertEqual(response.status_code, 302)
+        response = await areservation_dashboard(
+            self.request("reservation_dashboard", self.user))
+        self.assertContains(response, "Async request")
+
+    async def test_availability(self):
+        response = await aavailability(self.request("availability"))
+        self.assertEqual(response.status_code, 200)
+        response = await aavailability(
+            self.request("availability", method="post"))
+        self.assertEqual(response.status_code, 405)
+
+    async def test_export_streams_asynchronously(self):
+        await sync_to_async(User.objects.create_superuser)(
+            username="admin_user", password="adminpass")
+        await sync_to_async(self.client.login)(
+            username="admin_user", password="adminpass")
+        self.async_client.cookies = self.client.cookies
+        with warnings.catch_warnings():
+            # a sync iterator would be collected into a list, with a warning
+            warnings.simplefilter("error")
+            response = await self.async_client.get(
+                reverse("export_reservations"))
+            content = b"".join([chunk async for chunk in
+                                response.streaming_content])
+        self.assertIn(b"Async request", content)
+
+    async def test_menu(self):
+        response = await amy_menu(self.request("menu"))
+        self.assertEqual(response.status_code, 200)
+        response = await amy_menu(
+            self.request("menu", If_None_Match=response["ETag"]))
+        self.assertEqual(response.status_code, 304)
@@ -6,14 +6,20 @@ Defines URL patterns for managing reservations:
 - Make a new reservation
 - Edit an existing reservation
 - Cancel a reservation
+- Join or leave the waitlist of a full slot
 - Superuser view to manage all reservations
+- Staff CSV/JSONL export
+- Staff occupancy heatmap
+- JSON availability lookup for a date range
 """
 
+from django.conf import settings
 from django.urls import path
 from . import views
 
 urlpatterns = [
-    path('dashboard/', views.reservation_dashboard,
+    path('dashboard/', (views.areservation_dashboard if settings.ASYNC_VIEWS
+                        else views.reservation_dashboard),
          name='reservation_dashboard'),
     path('form/', views.make_reservation,
          name='make_reservation'),
@@ -21,6 +27,17 @@ urlpatterns = [
          name="edit_reservation"),
     path("<int:reservation_id>/cancel/", views.cancel_reservation,
          name="cancel_reservation"),
+    path("waitlist/", views.join_waitlist,
+         name="join_waitlist"),
+    path("waitlist/<int:entry_id>/leave/", views.leave_waitlist,
+         name="leave_waitlist"),
     path("superuser/", views.superuser_reservations,
          name="superuser_reservations"),
+    path("export/", views.export_reservations,
+         name="export_reservations"),
+    path("occupancy/", views.occupancy_heatmap,
+         name="occupancy_heatmap"),
+    path("availability/", (views.aavailability if settings.ASYNC_VIEWS
+                           else views.availability),
+         name="availability"),
 ]
@@ -6,37 +6,93 @@ Provides functionality for users to:
 - Make a new reservation
 - Edit an existing reservation
 - Cancel a reservation
+- Join or leave the waitlist of a full slot
+- Manage and export all reservations (staff)
+- View an occupancy heatmap (staff)
 
-All views require the user to be logged in.
+All views except the availability lookup require the user to be
+logged in.
 """
 
+import datetime
+import uuid
+from django.db import transaction
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import (HttpResponse, HttpResponseBadRequest,
+                         HttpResponseNotAllowed, JsonResponse,
+                         StreamingHttpResponse)
 from django.contrib.auth.decorators import login_required
 from django.utils.timezone import localdate
-from .models import Reservation
-from .forms import ReservationForm
+from django.template.defaultfilters import pluralize
+from dons_table.asyncviews import async_login_required
+from .models import (ArchivedReservation, DailyOccupancy, Reservation,
+                     ReservationSubmission, SlotFullError, STATUS_CHOICES,
+                     TOTAL_CAPACITY_PER_SLOT, WaitlistEntry)
+from .forms import (NO_TABLE_MESSAGE, ReservationForm, SLOT_FULL_MESSAGE,
+                    WaitlistForm, generate_time_choices)
+from .availability import (MAX_AVAILABILITY_DAYS, aslot_availability,
+                           slot_availability)
+from .export import (EXPORT_FORMATS, aexport_lines, export_lines,
+                     export_rows)
+from .pagination import KeysetPaginator
 from django.contrib import messages
 from django.contrib.admin.views.decorators import staff_member_required
 
+STAFF_PAGE_SIZE = 25
+DASHBOARD_PAGE_SIZE = 10
+HEATMAP_DAYS = 365
+HEATMAP_MAX_DAYS = 366
+
 
 @login_required
 def reservation_dashboard(request):
     """
     Display the reservation dashboard for the logged-in user.
 
-    Shows all upcoming reservations for the user, ordered by date and time.
+    Shows the user's upcoming reservations, ordered by date and time,
+    keyset-paginated with the ``cursor`` query parameter, and the slots
+    they are waitlisted for. Served as areservation_dashboard instead
+    when settings.ASYNC_VIEWS is on.
 
     Template:
         reservation_dashboard.html
     """
+    paginator, waitlist = _dashboard_queries(request)
+    page = paginator.get_page(request.GET.get('cursor'))
+    return render(request, 'reservation_dashboard.html',
+                  {'reservations': page,
+                   'waitlist': list(waitlist),
+                   'page_links': _page_links(request, 'cursor', page)})
+
+
+@async_login_required
+async def areservation_dashboard(request):
+    """
+    Async version of reservation_dashboard, served under ASGI
+    (settings.ASYNC_VIEWS): the page is read with the async ORM.
+    """
+    paginator, waitlist = _dashboard_queries(request)
+    page = await paginator.aget_page(request.GET.get('cursor'))
+    return render(request, 'reservation_dashboard.html',
+                  {'reservations': page,
+                   'waitlist': [entry async for entry in waitlist],
+                   'page_links': _page_links(request, 'cursor', page)})
+
+
+def _dashboard_queries(request):
+    """
+    Return the paginator of the user's upcoming reservations and the
+    queryset of their waitlist entries, unevaluated.
+    """
     today = localdate()
     user_reservations = Reservation.objects.filter(
         user=request.user,
         date__gte=today
-    ).order_by('date', 'time')
-    return render(request, 'reservation_dashboard.html',
-                  {'reservations': user_reservations})
+    )
+    return (KeysetPaginator(user_reservations, DASHBOARD_PAGE_SIZE),
+            WaitlistEntry.objects.filter(user=request.user,
+                                         date__gte=today))
 
 
 @login_required
@@ -46,33 +102,88 @@ def make_reservation(request):
 
     If the request is POST and the form is valid:
         - Associate the reservation with the logged-in user
-        - Save the reservation
+        - Save the reservation, booking its seats atomically
         - Show a success message
         - Redirect to reservation dashboard
 
+    If another booking takes the last seats between validation and
+    saving, the form is shown again with the "slot full" error.
+
+    The form carries a submission token. A POST whose token was
+    already submitted (a double tap on "Submit", or a retried request)
+    is not validated or saved again: it is redirected to the dashboard
+    like the first one (see ReservationSubmission).
+
     If the request is GET or the form is invalid:
         - Display the reservation form
+        - When the slot or its tables are full, offer to join the
+          waitlist (see join_waitlist)
 
     Template:
         reservation_form.html
     """
+    offer_waitlist = False
     if request.method == 'POST':
-        form = ReservationForm(request.POST)
-        if form.is_valid():
-            reservation = form.save(commit=False)
-            reservation.user = request.user
-            reservation.save()
-            messages.success(
-                request,
-                (
-                    "Your reservation has been "
-                    "submitted and is pending confirmation."
-                )
-            )
-            return redirect('reservation_dashboard')
+        token = _submission_token(request.POST)
+        with transaction.atomic():
+            submission = None
+            if token is not None:
+                submission, claimed = ReservationSubmission.claim(
+                    request.user, token)
+                if not claimed:
+                    return _repeated_submission(request, submission)
+            form = ReservationForm(request.POST)
+            if form.is_valid():
+                reservation = form.save(commit=False)
+                reservation.user = request.user
+                try:
+                    reservation.save()
+                except SlotFullError:
+                    form.add_error(None, SLOT_FULL_MESSAGE)
+                else:
+                    if submission is not None:
+                        submission.reservation = reservation
+                        submission.save(update_fields=['reservation'])
+                    messages.success(
+                        request,
+                        (
+                            "Your reservation has been "
+                            "submitted and is pending confirmation."
+                        )
+                    )
+                    return redirect('reservation_dashboard')
+            # Release the token so the corrected form can be sent
+            transaction.set_rollback(True)
+        offer_waitlist = any(error in (SLOT_FULL_MESSAGE, NO_TABLE_MESSAGE)
+                             for error in form.non_field_errors())
     else:
         form = ReservationForm()
-    return render(request, 'reservation_form.html', {'form': form})
+        token = None
+    return render(request, 'reservation_form.html',
+                  {'form': form, 'offer_waitlist': offer_waitlist,
+                   'submission_token': token or uuid.uuid4()})
+
+
+def _submission_token(data):
+    """Return the form's submission token as a UUID, or None."""
+    try:
+        return uuid.UUID(data.get('submission_token', ''))
+    except ValueError:
+        return None
+
+
+def _repeated_submission(request, submission):
+    """Answer a reservation form submitted again with its first result."""
+    reservation = submission.reservation
+    if reservation is None:
+        messages.info(request,
+                      "This reservation form has already been submitted.")
+    else:
+        messages.info(
+            request,
+            f"Your reservation for {reservation.date:%d %b %Y} at "
+            f"{reservation.time:%H:%M} has already been submitted.")
+    return redirect('reservation_dashboard')
 
 
 @login_required
@@ -98,20 +209,24 @@ def edit_reservation(request, reservation_id):
     if request.method == 'POST':
         form = ReservationForm(request.POST, instance=reservation)
         if form.is_valid():
-            if form.has_changed():  # Only reset status if something changed
-                updated = form.save(commit=False)
-                updated.status = "pending"
-                updated.save()
-                messages.success(
-                    request,
-                    (
-                        "Your reservation has been updated and is "
-                        "pending confirmation."
-                    ),
-                )
+            try:
+                if form.has_changed():  # Only reset status if changed
+                    updated = form.save(commit=False)
+                    updated.status = "pending"
+                    updated.save()
+                    messages.success(
+                        request,
+                        (
+                            "Your reservation has been updated and is "
+                            "pending confirmation."
+                        ),
+                    )
+                else:
+                    form.save()  # No changes -> save without resetting
+            except SlotFullError:
+                form.add_error(None, SLOT_FULL_MESSAGE)
             else:
-                form.save()  # No changes -> just save without resetting status
-            return redirect("reservation_dashboard")
+                return redirect("reservation_dashboard")
     else:
         form = ReservationForm(instance=reservation)
     return render(request, 'reservation_form.html', {'form': form})
@@ -140,6 +255,82 @@ def cancel_reservation(request, reservation_id):
     return redirect('reservation_dashboard')
 
 
+@login_required
+def join_waitlist(request):
+    """
+    Put the logged-in user on the waitlist for a full slot.
+
+    Expects a POST from the reservation form with the date, slot,
+    guests and special requests of the booking that did not fit. The
+    party is booked automatically if seats free up (see
+    WaitlistEntry.promote); joining the same slot again updates the
+    party size.
+
+    Redirects:
+        reservation_dashboard, or make_reservation if the details are
+        invalid
+    """
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+    form = WaitlistForm(request.POST)
+    if not form.is_valid():
+        messages.error(request, "Could not join the waitlist: "
+                       + " ".join(error for errors in form.errors.values()
+                                  for error in errors))
+        return redirect('make_reservation')
+    entry = form.cleaned_data
+    WaitlistEntry.objects.update_or_create(
+        user=request.user, date=entry['date'], slot=entry['slot'],
+        defaults={'guests': entry['guests'],
+                  'special_requests': entry['special_requests']})
+    messages.success(
+        request,
+        f"You're on the waitlist for {entry['date']:%d %b} at "
+        f"{entry['slot']:%H:%M}. We'll book your table if seats free up.")
+    return redirect('reservation_dashboard')
+
+
+@login_required
+def leave_waitlist(request, entry_id):
+    """
+    Remove one of the logged-in user's waitlist entries.
+
+    Note:
+        This view expects a POST request for deletion.
+
+    Redirects:
+        reservation_dashboard
+    """
+    entry = get_object_or_404(WaitlistEntry, id=entry_id, user=request.user)
+    if request.method == "POST":
+        entry.delete()
+        messages.success(request, "You have left the waitlist.")
+    return redirect('reservation_dashboard')
+
+
+def _parse_date(value, default=None):
+    """Parse a YYYY-MM-DD query parameter, falling back to ``default``."""
+    try:
+        return datetime.date.fromisoformat(value) if value else default
+    except ValueError:
+        return default
+
+
+def _page_links(request, param, page):
+    """
+    Build the query strings for the previous and next pages of one
+    keyset-paginated section, keeping every other query parameter.
+    """
+    links = {}
+    for name, cursor in (("previous", page.previous_cursor),
+                         ("next", page.next_cursor)):
+        if cursor:
+            query = request.GET.copy()
+            query[param] = cursor
+            links[name] = query.urlencode()
+    return links
+
+
 @staff_member_required
 def superuser_reservations(request):
     """
@@ -148,40 +339,237 @@ def superuser_reservations(request):
     Displays reservations grouped by status (pending, confirmed, cancelled)
     in chronological order. Superusers can change the status of reservations
     and see special requests.
-    """
-    reservations_pending = (
-        Reservation.objects
-        .filter(status="pending")
-        .order_by("date", "time")
-    )
-    reservations_confirmed = (
-        Reservation.objects
-        .filter(status="confirmed")
-        .order_by("date", "time")
-    )
-    reservations_cancelled = (
-        Reservation.objects
-        .filter(status="cancelled")
-        .order_by("date", "time")
-    )
 
+    A POST changes the status of every reservation in
+    ``reservation_ids`` at once (see Reservation.set_status), so
+    selected rows are triaged in one UPDATE and one redirect.
+
+    Only reservations inside a date window are listed (``from`` defaults
+    to today, ``to`` is open-ended) and each status is keyset-paginated
+    separately with a ``<status>_cursor``, so the page cost stays flat no
+    matter how much history the table holds or how deep staff page.
+    With ``archived=1`` archived reservations are listed alongside
+    (read-only).
+
+    Template:
+        superuser_reservations.html
+    """
     if request.method == "POST":
-        res_id = request.POST.get("reservation_id")
+        ids = (request.POST.getlist("reservation_ids")
+               or request.POST.getlist("reservation_id"))
         new_status = request.POST.get("status")
-        reservation = Reservation.objects.get(id=res_id)
-        if reservation:
-            reservation.status = new_status
-            reservation.save()
-            messages.success(request,
-                             f"Reservation status updated to {new_status}.")
-            return redirect("superuser_reservations")
-
-    return render(
-        request,
-        "superuser_reservations.html",
-        {
-            "pending": reservations_pending,
-            "confirmed": reservations_confirmed,
-            "cancelled": reservations_cancelled,
+        if new_status not in dict(STATUS_CHOICES) or not ids:
+            messages.error(request, "Select reservations and a status.")
+        else:
+            try:
+                updated = Reservation.set_status(ids, new_status)
+            except SlotFullError:
+                messages.error(request, SLOT_FULL_MESSAGE)
+            except ValueError:
+                messages.error(request, "Invalid reservation selection.")
+            else:
+                messages.success(
+                    request,
+                    f"{updated} reservation{pluralize(updated)} "
+                    f"updated to {new_status}.")
+        return redirect(request.get_full_path())
+
+    date_from = _parse_date(request.GET.get("from"), localdate())
+    date_to = _parse_date(request.GET.get("to"))
+    include_archived = request.GET.get("archived") == "1"
+    window = {"date__gte": date_from}
+    if date_to:
+        window["date__lte"] = date_to
+    reservations = Reservation.objects.select_related("user").filter(**window)
+    archived = (ArchivedReservation.objects.select_related("user")
+                .filter(**window))
+
+    context = {"date_from": date_from, "date_to": date_to,
+               "include_archived": include_archived}
+    for status in ("pending", "confirmed", "cancelled"):
+        param = f"{status}_cursor"
+        union = [archived.filter(status=status)] if include_archived else []
+        page = KeysetPaginator(reservations.filter(status=status),
+                               STAFF_PAGE_SIZE, union=union).get_page(
+                                   request.GET.get(param))
+        context[status] = page
+        context[f"{status}_links"] = _page_links(request, param, page)
+
+    return render(request, "superuser_reservations.html", context)
+
+
+@staff_member_required
+def export_reservations(request):
+    """
+    Stream reservations as a CSV or JSONL download for staff.
+
+    Rows are streamed in chunks straight from the database (see
+    reservations.export), so memory use does not grow with the number
+    of reservations.
+
+    Query parameters:
+        from: First date (YYYY-MM-DD), optional.
+        to: Last date (YYYY-MM-DD), optional.
+        status: Status to include; repeat for several. All by default.
+        archived: 1 to include archived reservations.
+        format: csv (default) or jsonl.
+
+    A malformed date is rejected rather than ignored, so a typo cannot
+    turn a one-day export into the whole table.
+
+    Returns:
+        StreamingHttpResponse: The export as an attachment.
+    """
+    fmt = request.GET.get("format") or "csv"
+    statuses = request.GET.getlist("status")
+    if fmt not in EXPORT_FORMATS:
+        return HttpResponseBadRequest("Unknown export format.")
+    if not set(statuses) <= dict(STATUS_CHOICES).keys():
+        return HttpResponseBadRequest("Unknown reservation status.")
+    try:
+        date_from, date_to = (
+            datetime.date.fromisoformat(value) if value else None
+            for value in (request.GET.get("from"), request.GET.get("to")))
+    except ValueError:
+        return HttpResponseBadRequest("Invalid from or to date.")
+
+    rows = export_rows(date_from, date_to, statuses,
+                       include_archived=request.GET.get("archived") == "1")
+    lines = (aexport_lines(rows, fmt) if isinstance(request, ASGIRequest)
+             else export_lines(rows, fmt))
+    response = StreamingHttpResponse(lines,
+                                     content_type=EXPORT_FORMATS[fmt])
+    response["Content-Disposition"] = (
+        f'attachment; filename="reservations.{fmt}"')
+    return response
+
+
+@staff_member_required
+def occupancy_heatmap(request):
+    """
+    Show seats in use per date and time slot as a heatmap for staff.
+
+    Reads only the precomputed DailyOccupancy table, in one query, so
+    a year of history renders without touching the reservation tables.
+    Defaults to the year up to today; ``from`` and ``to`` pick another
+    window of up to HEATMAP_MAX_DAYS days.
+
+    Template:
+        occupancy_heatmap.html
+    """
+    date_to = _parse_date(request.GET.get("to"), localdate())
+    date_from = _parse_date(request.GET.get("from"))
+    if (not date_from or date_from > date_to
+            or (date_to - date_from).days >= HEATMAP_MAX_DAYS):
+        date_from = date_to - datetime.timedelta(days=HEATMAP_DAYS - 1)
+
+    covers, bookings = {}, {}
+    slots = {t for t, _ in generate_time_choices()}
+    for day, slot, seats, pending, confirmed in (
+            DailyOccupancy.objects
+            .filter(date__range=(date_from, date_to))
+            .values_list("date", "slot", "covers", "pending", "confirmed")):
+        covers[day, slot] = seats
+        bookings[day] = bookings.get(day, 0) + pending + confirmed
+        slots.add(slot)
+    slots = sorted(slots)
+
+    days = []
+    for offset in range((date_to - date_from).days + 1):
+        day = date_from + datetime.timedelta(days=offset)
+        cells = []
+        for slot in slots:
+            seats = covers.get((day, slot), 0)
+            # 0 (empty) to 4 (full), rounding up so any booking shows
+            level = min(4, -(-seats * 4 // TOTAL_CAPACITY_PER_SLOT))
+            cells.append((level, seats))
+        days.append((day, bookings.get(day, 0), cells))
+
+    return render(request, "occupancy_heatmap.html", {
+        "date_from": date_from,
+        "date_to": date_to,
+        "slots": slots,
+        "days": days,
+        "capacity": TOTAL_CAPACITY_PER_SLOT,
+    })
+
+
+def availability(request):
+    """
+    Return the remaining seats for every time slot over a date range.
+
+    Used by the reservation form to grey out full slots before the user
+    submits. Computed from the slot ledger in one query and cached
+    briefly. Served as aavailability instead when settings.ASYNC_VIEWS
+    is on.
+
+    Query parameters:
+        start: First date (YYYY-MM-DD), defaults to today.
+        end: Last date (YYYY-MM-DD), defaults to start. At most
+            MAX_AVAILABILITY_DAYS days after start, and that many days
+            short of the last date Python can represent.
+        guests: Party size (1–14), defaults to 1.
+
+    Returns:
+        JsonResponse: {"capacity", "guests", "dates": {date: {time: seats}}}
+    """
+    params = _availability_params(request)
+    if isinstance(params, HttpResponse):
+        return params
+    return _availability_response(*params, slot_availability(*params))
+
+
+async def aavailability(request):
+    """
+    Async version of availability, served under ASGI
+    (settings.ASYNC_VIEWS): the ledger is read with the async ORM.
+    """
+    params = _availability_params(request)
+    if isinstance(params, HttpResponse):
+        return params
+    return _availability_response(*params,
+                                  await aslot_availability(*params))
+
+
+def _availability_params(request):
+    """
+    Return the (start, end, guests) of an availability request, or the
+    405 or 400 response when the request is not valid.
+    """
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+    try:
+        start = (datetime.date.fromisoformat(request.GET["start"])
+                 if request.GET.get("start") else localdate())
+        end = (datetime.date.fromisoformat(request.GET["end"])
+               if request.GET.get("end") else start)
+        guests = int(request.GET.get("guests") or 1)
+    except ValueError:
+        return JsonResponse({"error": "Invalid start, end or guests."},
+                            status=400)
+    if end < start or (end - start).days >= MAX_AVAILABILITY_DAYS:
+        return JsonResponse(
+            {"error": f"Date range must cover 1 to "
+                      f"{MAX_AVAILABILITY_DAYS} days."}, status=400)
+    if end > datetime.date.max - datetime.timedelta(
+            days=MAX_AVAILABILITY_DAYS):
+        return JsonResponse({"error": "Dates are out of range."},
+                            status=400)
+    if not 1 <= guests <= 14:
+        return JsonResponse({"error": "Guests must be between 1 and 14."},
+                            status=400)
+    return start, end, guests
+
+
+def _availability_response(start, end, guests, availability):
+    """Return the JSON response of an availability request."""
+    return JsonResponse({
+        "capacity": TOTAL_CAPACITY_PER_SLOT,
+        "guests": guests,
+        "dates": {
+            day.isoformat(): {
+                slot.isoformat(): seats for slot, seats in slots.items()
+            }
+            for day, slots in availability.items()
         },
-    )
+    })
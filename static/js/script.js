@@ -87,4 +87,77 @@ document.addEventListener("DOMContentLoaded", () => {
             activeForm = null;
         }
     });
-});
\ No newline at end of file
+});
+// Grey out full time slots on the reservation form
+document.addEventListener("DOMContentLoaded", () => {
+    const form = document.querySelector(".reservation-booking-form");
+    if (!form) return;
+
+    const dateInput = form.querySelector("input[name='date']");
+    const guestsInput = form.querySelector("input[name='guests']");
+    const timeSelect = form.querySelector("select[name='time']");
+    const url = form.dataset.availabilityUrl;
+    const RANGE_DAYS = 31;
+    const cache = {};
+
+    /**
+     * Fetch availability for the next RANGE_DAYS days for a party size.
+     * Each party size is fetched once and kept for the page's lifetime.
+     */
+    function fetchAvailability(guests) {
+        if (!cache[guests]) {
+            const start = new Date();
+            const end = new Date();
+            end.setDate(start.getDate() + RANGE_DAYS - 1);
+            const iso = (d) => d.toISOString().slice(0, 10);
+            const params = new URLSearchParams({
+                start: iso(start), end: iso(end), guests: guests
+            });
+            cache[guests] = fetch(`${url}?${params}`)
+                .then(response => response.ok ? response.json() : null)
+                .catch(() => null);
+        }
+        return cache[guests];
+    }
+
+    /**
+     * Disable every time option that can't seat the party on the
+     * selected date, including times outside that date's opening
+     * hours. Unknown dates leave all options enabled.
+     */
+    function updateSlots() {
+        const guests = parseInt(guestsInput.value, 10) || 1;
+        if (guests < 1 || guests > 14) return;
+        fetchAvailability(guests).then(data => {
+            const slots = data && data.dates[dateInput.value];
+            timeSelect.querySelectorAll("option").forEach(option => {
+                if (!option.value) return;
+                if (!slots) {
+                    option.disabled = false;
+                    return;
+                }
+                const seats = slots[option.value];
+                option.disabled = seats === undefined || seats < guests;
+            });
+        });
+    }
+
+    dateInput.addEventListener("change", updateSlots);
+    guestsInput.addEventListener("change", updateSlots);
+    updateSlots();
+});
+
+// Select or clear every reservation row of a staff bulk-action form
+document.addEventListener('DOMContentLoaded', function () {
+    document.querySelectorAll('.select-all').forEach(toggle => {
+        /**
+         * Ticks or unticks every row checkbox attached to the same
+         * bulk-action form as the header checkbox.
+         */
+        toggle.addEventListener('change', function () {
+            const boxes = document.querySelectorAll(
+                `input[name='reservation_ids'][form='${toggle.dataset.form}']`);
+            boxes.forEach(box => { box.checked = toggle.checked; });
+        });
+    });
+});